@@ -0,0 +1,218 @@
+"""
+异步 MySQL 数据层
+供 FastAPI 的只读接口使用：安装了 aiomysql 时使用异步连接池，查询期间不阻塞事件循环；
+未安装 aiomysql 或异步连接池未初始化时，退化为在线程池中调用同步的 MySQLPool
+查询语句、分页游标和格式化函数与 MySQLPool 共用，返回值格式一致
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from crawl_metrics import track_db
+from mysql_pool import MySQLPool
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+
+class AsyncMySQLPool:
+    """异步 MySQL 连接池类（只读查询）"""
+
+    _pool = None  # aiomysql 连接池单例
+
+    @classmethod
+    async def initialize(cls, host='localhost', port=3306, user='root', password='123456',
+                         database='dangdang_books', minsize=1, maxsize=10) -> bool:
+        """
+        初始化异步连接池（需在事件循环中调用，只需调用一次；库表由 MySQLPool.initialize 创建）
+        :param host: MySQL 服务器地址
+        :param port: MySQL 端口
+        :param user: 用户名
+        :param password: 密码
+        :param database: 数据库名
+        :param minsize: 连接池中保持的最小连接数
+        :param maxsize: 连接池允许的最大连接数
+        :return: 是否启用了异步连接池（未安装 aiomysql 时为 False，查询在线程池中走 MySQLPool）
+        """
+        if aiomysql is None:
+            return False
+        if cls._pool is None:
+            cls._pool = await aiomysql.create_pool(
+                host=host,
+                port=port,
+                user=user,
+                password=password,
+                db=database,
+                minsize=minsize,
+                maxsize=maxsize,
+                charset='utf8mb4',
+                cursorclass=aiomysql.DictCursor,
+                autocommit=True  # 只读查询：不持有事务快照，也省掉 COMMIT/ROLLBACK 往返
+            )
+        return True
+
+    @classmethod
+    async def close_pool(cls):
+        """关闭异步连接池"""
+        if cls._pool is not None:
+            pool, cls._pool = cls._pool, None
+            pool.close()
+            await pool.wait_closed()
+
+    @classmethod
+    def pool_stats(cls) -> Dict:
+        """
+        异步连接池快照
+        :return: 统计字典（未启用时 enabled 为 False，查询走同步连接池）
+        """
+        pool = cls._pool
+        if pool is None:
+            return {'enabled': False, 'aiomysql_installed': aiomysql is not None}
+        return {
+            'enabled': True,
+            'size': pool.size,
+            'in_use': pool.size - pool.freesize,
+            'idle': pool.freesize,
+            'minsize': pool.minsize,
+            'maxsize': pool.maxsize
+        }
+
+    @classmethod
+    async def _fetchall(cls, sql: str, params=None) -> List[Dict]:
+        async with cls._pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return list(await cursor.fetchall())
+
+    @classmethod
+    async def _fetchone(cls, sql: str, params=None) -> Optional[Dict]:
+        async with cls._pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchone()
+
+    @classmethod
+    async def _fetch_page(cls, sql: str, params: tuple, limit: int, cursor_of, formatter) -> Dict:
+        """
+        执行游标分页查询（参数同 MySQLPool._fetch_page）
+        :return: {'books': 数据列表, 'next_cursor': 下一页游标}
+        """
+        rows = await cls._fetchall(sql, params + (limit + 1,))
+        return MySQLPool._build_page(rows, limit, cursor_of, formatter)
+
+    @classmethod
+    @track_db
+    async def get_books_page(cls, keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取图书（参数和返回值同 MySQLPool.get_books_page）
+        :raises ValueError: 游标格式不正确
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_books_page, keyword, limit, cursor)
+        return await cls._fetch_page(*MySQLPool._books_page_query(keyword, limit, cursor))
+
+    @classmethod
+    @track_db
+    async def get_fanqie_books_page(cls, keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取番茄小说（参数和返回值同 MySQLPool.get_fanqie_books_page）
+        :raises ValueError: 游标格式不正确
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_fanqie_books_page, keyword, limit, cursor)
+        return await cls._fetch_page(*MySQLPool._fanqie_books_page_query(keyword, limit, cursor))
+
+    @classmethod
+    @track_db
+    async def get_fanqie_recommend_page(cls, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取推荐书籍列表（参数和返回值同 MySQLPool.get_fanqie_recommend_page）
+        :raises ValueError: 游标格式不正确
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_fanqie_recommend_page, limit, cursor)
+        return await cls._fetch_page(*MySQLPool._fanqie_recommend_page_query(limit, cursor))
+
+    @classmethod
+    @track_db
+    async def search_books(cls, query: str, source: str = 'all', limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        站内搜索（参数和返回值同 MySQLPool.search_books；各表的查询并发执行）
+        :raises ValueError: 游标格式不正确
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.search_books, query, source, limit, cursor)
+        offset, size, queries = MySQLPool._search_plan(query, source, limit, cursor)
+        rows = await asyncio.gather(*(cls._fetchall(sql, params) for sql, params, _, _ in queries))
+        results = [(table_rows, formatter, label) for table_rows, (_, _, formatter, label) in zip(rows, queries)]
+        return MySQLPool._merge_search(results, offset, size)
+
+    @classmethod
+    @track_db
+    async def get_fanqie_book_detail(cls, book_id: str) -> Optional[Dict]:
+        """
+        根据书籍ID获取详情（同 MySQLPool.get_fanqie_book_detail，查询失败时返回 None）
+        :param book_id: 书籍ID
+        :return: 书籍详情
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_fanqie_book_detail, book_id)
+        try:
+            result = await cls._fetchone(MySQLPool._FANQIE_DETAIL_SQL, (book_id,))
+            return MySQLPool._format_fanqie_detail(result) if result else None
+        except Exception as e:
+            return None
+
+    @classmethod
+    @track_db
+    async def get_fanqie_author_books(cls, author_name: str) -> List[Dict]:
+        """
+        获取作者的所有书籍（同 MySQLPool.get_fanqie_author_books，查询失败时返回空列表）
+        :param author_name: 作者名
+        :return: 书籍列表
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_fanqie_author_books, author_name)
+        try:
+            rows = await cls._fetchall(MySQLPool._AUTHOR_BOOKS_SQL, (author_name,))
+            return [MySQLPool._format_author_book(row) for row in rows]
+        except Exception as e:
+            return []
+
+    @classmethod
+    @track_db
+    async def get_book_count(cls) -> int:
+        """
+        获取图书总数（查询失败时返回 0）
+        :return: 图书数量
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_book_count)
+        try:
+            result = await cls._fetchone(MySQLPool._BOOK_COUNT_SQL)
+            return result['count'] if result else 0
+        except Exception as e:
+            return 0
+
+    @classmethod
+    @track_db
+    async def get_statistics(cls) -> Dict:
+        """
+        获取统计信息（同 MySQLPool.get_statistics；两条查询并发执行）
+        :return: 统计数据字典
+        """
+        if cls._pool is None:
+            return await asyncio.to_thread(MySQLPool.get_statistics)
+        try:
+            result, keywords = await asyncio.gather(
+                cls._fetchone(MySQLPool._BOOK_COUNT_SQL),
+                cls._fetchall(MySQLPool._KEYWORD_STATS_SQL)
+            )
+            return {
+                'total_books': result['count'] if result else 0,
+                'keywords': keywords
+            }
+        except Exception as e:
+            return {'total_books': 0, 'keywords': []}
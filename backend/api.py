@@ -6,15 +6,16 @@ FastAPI 后端 API
 # 标准库导入
 import sys
 import os
+import json
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import List, Dict, Literal, Optional
 
 # 检查并导入第三方库
 try:
     from fastapi import FastAPI, HTTPException, status
     from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.responses import JSONResponse
+    from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
     from pydantic import BaseModel, Field
     import uvicorn
 except ImportError as e:
@@ -53,7 +54,7 @@ def find_available_port(start_port=8000, max_attempts=10):
 
 # 导入爬虫模块
 try:
-    from dangdang import run_spider, DangDangSpider
+    from dangdang import run_spider, run_spider_batch, DangDangSpider, DETAIL_EXTRACTOR
     from fanqie import (
         run_recommend_spider, 
         run_detail_spider, 
@@ -62,8 +63,17 @@ try:
         FanQieDetailSpider,
         FanQieAuthorSpider
     )
-    from db_config import MYSQL_CONFIG, USE_MYSQL
+    from db_config import (
+        MYSQL_CONFIG, USE_MYSQL, CRAWL_JOB_CONFIG, RESULT_CACHE_CONFIG, POOL_CONFIG, ASYNC_POOL_CONFIG,
+        API_SERVER_CONFIG
+    )
     from mysql_pool import MySQLPool
+    from async_mysql_pool import AsyncMySQLPool
+    from backend.jobs import JobManager, JobQueueFull, JobSnapshot
+    from backend.job_store import MySQLJobStore
+    from backend.cache import ResultCache
+    from book_index import get_seen_registry
+    import crawl_metrics
 except ImportError as e:
     # print("="*60)
     pass
@@ -78,14 +88,12 @@ except ImportError as e:
     sys.exit(1)
 
 
-app = FastAPI(
-    title="当当网图书爬虫 API",
-    description="提供图书搜索和数据爬取功能",
-    version="1.0.0"
-)
-
-# 初始化 MySQL 连接池（如果启用）
-if USE_MYSQL:
+def init_mysql_pool() -> bool:
+    """
+    初始化 MySQL 连接池（在 worker 进程启动时调用，每个进程各自建立连接），失败时禁用数据库存储
+    :return: 是否启用数据库存储
+    """
+    global USE_MYSQL
     try:
         MySQLPool.initialize(
             host=MYSQL_CONFIG.get('host', 'localhost'),
@@ -93,15 +101,50 @@ if USE_MYSQL:
             user=MYSQL_CONFIG.get('user', 'root'),
             password=MYSQL_CONFIG.get('password', ''),
             database=MYSQL_CONFIG.get('database', 'dangdang_books'),
-            mincached=2,
-            maxcached=10,
-            maxconnections=20
+            mincached=POOL_CONFIG.get('mincached', 2),
+            maxcached=POOL_CONFIG.get('maxcached', 10),
+            maxconnections=POOL_CONFIG.get('maxconnections', 20)
         )
     except Exception as e:
         # print(f"⚠️ MySQL 连接池初始化失败: {e}")
         pass
         # print("⚠️ 将禁用数据库存储功能")
         USE_MYSQL = False
+    return USE_MYSQL
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时在当前 worker 进程中初始化连接池、把爬取任务状态接入 crawl_jobs 表，
+    退出时停止任务并关闭连接池
+    """
+    if USE_MYSQL and await asyncio.to_thread(init_mysql_pool):
+        job_manager.attach_store(MySQLJobStore())
+        try:
+            await AsyncMySQLPool.initialize(
+                host=MYSQL_CONFIG.get('host', 'localhost'),
+                port=MYSQL_CONFIG.get('port', 3306),
+                user=MYSQL_CONFIG.get('user', 'root'),
+                password=MYSQL_CONFIG.get('password', ''),
+                database=MYSQL_CONFIG.get('database', 'dangdang_books'),
+                minsize=ASYNC_POOL_CONFIG.get('minsize', 1),
+                maxsize=ASYNC_POOL_CONFIG.get('maxsize', 10)
+            )
+        except Exception as e:
+            # print(f"⚠️ 异步连接池初始化失败，只读接口将在线程池中使用同步连接池: {e}")
+            pass
+    yield
+    await asyncio.to_thread(cleanup)
+    await AsyncMySQLPool.close_pool()
+
+
+app = FastAPI(
+    title="当当网图书爬虫 API",
+    description="提供图书搜索和数据爬取功能",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 # 配置 CORS - 允许前端跨域访问
 app.add_middleware(
@@ -130,6 +173,22 @@ class SearchRequest(BaseModel):
     }
 
 
+class BatchCrawlRequest(BaseModel):
+    """批量爬取请求模型"""
+    keywords: List[str] = Field(..., min_length=1, max_length=500, description="关键词列表")
+    max_books: int = Field(default=20, ge=0, le=500, description="每个关键词的最大爬取数量（0表示爬取所有）")
+    proxy: Optional[str] = Field(default=None, description="代理地址（格式：http://ip:port）")
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "keywords": ["Python", "机器学习", "数据分析"],
+                "max_books": 20
+            }
+        }
+    }
+
+
 class BookInfo(BaseModel):
     """图书信息模型"""
     标题: str = ""
@@ -155,7 +214,10 @@ class SearchResponse(BaseModel):
     total_crawled: int = 0  # 爬取总数
     total_saved: int = 0  # 保存总数
     total_duplicates: int = 0  # 去重总数
+    total_known_skipped: int = 0  # 因已入库而跳过详情页的数量
+    total_shared_skipped: int = 0  # 因已被其他关键词/爬虫请求而跳过详情页的数量
     dedup_key: str = ""  # 去重关键词
+    next_cursor: Optional[str] = None  # 下一页游标（游标分页接口使用，没有下一页时为空）
     
     model_config = {
         "json_schema_extra": {
@@ -180,8 +242,181 @@ class SearchResponse(BaseModel):
     }
 
 
-# 线程池执行器，用于异步执行爬虫任务
-executor = ThreadPoolExecutor(max_workers=3)
+class JobRequest(BaseModel):
+    """爬取任务提交模型"""
+    kind: Literal["dangdang", "dangdang_batch", "fanqie_recommend", "fanqie_detail", "fanqie_author"] = Field(
+        default="dangdang", description="任务类型"
+    )
+    keyword: Optional[str] = Field(default=None, max_length=50, description="搜索关键词（dangdang）")
+    keywords: Optional[List[str]] = Field(default=None, max_length=500, description="关键词列表（dangdang_batch）")
+    max_books: int = Field(default=20, ge=0, le=500, description="最大爬取数量（0表示爬取所有）")
+    proxy: Optional[str] = Field(default=None, description="代理地址（格式：http://ip:port）")
+    book_name: Optional[str] = Field(default=None, description="书名（fanqie_detail）")
+    book_id: Optional[str] = Field(default=None, description="书籍ID（fanqie_detail）")
+    author_name: Optional[str] = Field(default=None, description="作者名（fanqie_author）")
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "kind": "dangdang",
+                "keyword": "Python",
+                "max_books": 20
+            }
+        }
+    }
+
+
+# 爬取任务管理器：所有爬虫都在其线程池中排队执行
+job_manager = JobManager(
+    max_workers=CRAWL_JOB_CONFIG.get('max_workers', 3),
+    max_pending=CRAWL_JOB_CONFIG.get('max_pending', 500),
+    max_finished=CRAWL_JOB_CONFIG.get('max_finished', 1000),
+    sync_interval=CRAWL_JOB_CONFIG.get('sync_interval', 2),
+    stale_after=CRAWL_JOB_CONFIG.get('stale_after', 300)
+)
+
+
+# worker 进程数：多个进程之间通过 crawl_jobs 表共享任务状态，未启用 MySQL 时只能单进程运行
+API_WORKERS = API_SERVER_CONFIG.get('workers', 1) if USE_MYSQL else 1
+
+
+# 查询结果缓存：键为 (接口名, 关键词, limit, cursor)，爬取新增数据后按关键词失效
+# 缓存和失效都在进程内，爬取任务只能使执行它的进程的缓存失效，多进程部署时禁用缓存，避免其他进程返回过期数据
+books_cache = ResultCache(
+    maxsize=RESULT_CACHE_CONFIG.get('maxsize', 512),
+    ttl=RESULT_CACHE_CONFIG.get('ttl', 60),
+    enabled=API_WORKERS <= 1
+)
+
+
+def build_job(request: JobRequest):
+    """
+    根据任务请求构造任务函数
+    :param request: 任务请求
+    :return: (任务函数, 任务参数)
+    """
+    proxy = request.proxy.strip() if request.proxy else None
+    
+    if request.kind == "dangdang":
+        keyword = (request.keyword or "").strip()
+        if not keyword:
+            raise HTTPException(status_code=400, detail="关键词不能为空")
+        
+        def run(job):
+            results = run_spider(
+                keyword=keyword,
+                thread_count=3,
+                use_mysql=USE_MYSQL,
+                mysql_config=MYSQL_CONFIG,
+                max_books=request.max_books,
+                proxy=proxy,
+                on_spider=job.attach_spider,
+                on_result=job.publish_book
+            )
+            # 有新增数据或新的关键词关联（重复/已入库/已被其他爬虫请求的图书也会关联到该关键词）时使该关键词的查询缓存失效，
+            # 有新增数据时还要使搜索缓存失效
+            if results and (results.get('total_saved') or results.get('total_duplicates')
+                            or results.get('total_known_skipped') or results.get('total_shared_skipped')):
+                books_cache.invalidate('books', keyword)
+            if results and results.get('total_saved'):
+                books_cache.invalidate('search')
+            return results
+        return run, {"keyword": keyword, "max_books": request.max_books}
+    
+    if request.kind == "dangdang_batch":
+        keywords = list(dict.fromkeys(kw.strip() for kw in request.keywords or [] if kw and kw.strip()))
+        if not keywords:
+            raise HTTPException(status_code=400, detail="关键词列表不能为空")
+        if any(len(kw) > 50 for kw in keywords):
+            raise HTTPException(status_code=400, detail="关键词过长，请输入50字以内")
+        
+        def run(job):
+            results = run_spider_batch(
+                keywords=keywords,
+                use_mysql=USE_MYSQL,
+                mysql_config=MYSQL_CONFIG,
+                max_books=request.max_books,
+                proxy=proxy,
+                on_spider=job.attach_spider,
+                on_result=job.publish_book
+            )
+            # 只使有新增数据或新的关键词关联的关键词的查询缓存失效
+            for kw, stats in results['keywords'].items():
+                if stats['saved'] or stats['duplicates'] or stats['known_skipped'] or stats['shared_skipped']:
+                    books_cache.invalidate('books', kw)
+            if results.get('total_saved'):
+                books_cache.invalidate('search')
+            # 图书明细已通过任务事件流推送，任务结果只保留统计，避免大批量任务占用内存
+            results.pop('books', None)
+            return results
+        return run, {"keywords": keywords, "max_books": request.max_books}
+    
+    if request.kind == "fanqie_recommend":
+        def run(job):
+            return run_recommend_spider(
+                use_mysql=USE_MYSQL,
+                max_books=request.max_books or 50,
+                proxy=proxy,
+                on_spider=job.attach_spider
+            )
+        return run, {"max_books": request.max_books or 50}
+    
+    if request.kind == "fanqie_detail":
+        if not request.book_name and not request.book_id:
+            raise HTTPException(status_code=400, detail="请提供书名或书籍ID")
+        
+        def run(job):
+            result = run_detail_spider(
+                book_name=request.book_name,
+                book_id=request.book_id,
+                use_mysql=USE_MYSQL,
+                proxy=proxy,
+                on_spider=job.attach_spider
+            )
+            # 详情写入 fanqie_books，使番茄小说列表缓存失效
+            if result and result.get('success'):
+                books_cache.invalidate('books_fanqie')
+                books_cache.invalidate('search')
+            return result
+        return run, {"book_name": request.book_name, "book_id": request.book_id}
+    
+    # fanqie_author
+    if not request.author_name:
+        raise HTTPException(status_code=400, detail="请提供作者名")
+    
+    def run(job):
+        return run_author_spider(
+            author_name=request.author_name,
+            use_mysql=USE_MYSQL,
+            max_books=request.max_books or 50,
+            proxy=proxy,
+            on_spider=job.attach_spider
+        )
+    return run, {"author_name": request.author_name, "max_books": request.max_books or 50}
+
+
+def submit_job(request: JobRequest):
+    """
+    提交爬取任务（队列已满时返回 503）
+    :param request: 任务请求
+    :return: 任务
+    """
+    func, params = build_job(request)
+    try:
+        return job_manager.submit(request.kind, func, params)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def run_job(request: JobRequest, timeout: float):
+    """
+    提交任务并等待结果（供同步返回结果的旧接口使用）
+    :param request: 任务请求
+    :param timeout: 等待超时（秒），超时抛出 asyncio.TimeoutError，任务本身继续执行
+    :return: 任务结果
+    """
+    job = submit_job(request)
+    return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout=timeout)
 
 
 @app.get("/")
@@ -192,10 +427,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "crawl": "/api/crawl",
+            "crawl_batch": "/api/crawl/batch",
+            "jobs": "/api/jobs",
             "books": "/api/books",
             "stats": "/api/stats",
+            "pool": "/api/pool",
             "docs": "/docs",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
@@ -206,6 +445,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 指标（下载/解析/写库/取连接耗时直方图，页面、图书、去重、跳过、错误计数）"""
+    return PlainTextResponse(crawl_metrics.render(), media_type=crawl_metrics.CONTENT_TYPE)
+
+
 @app.post("/api/crawl/fanqie/recommend")
 async def crawl_fanqie_recommend():
     """
@@ -215,20 +460,12 @@ async def crawl_fanqie_recommend():
         推荐书籍列表
     """
     try:
-        loop = asyncio.get_event_loop()
-        
         try:
-            results = await asyncio.wait_for(
-                loop.run_in_executor(
-                    executor,
-                    lambda: run_recommend_spider(
-                        use_mysql=USE_MYSQL,
-                        max_books=50
-                    )
-                ),
-                timeout=60.0
-            )
+            results = await run_job(JobRequest(kind="fanqie_recommend", max_books=50), timeout=60.0)
         except asyncio.TimeoutError:
+            results = None
+        
+        if results is None:
             results = {'books': [], 'total_crawled': 0}
         
         books = results.get('books', [])
@@ -240,6 +477,9 @@ async def crawl_fanqie_recommend():
             "total_crawled": results.get('total_crawled', 0)
         }
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -266,21 +506,15 @@ async def crawl_fanqie_detail(book_name: Optional[str] = None, book_id: Optional
         raise HTTPException(status_code=400, detail="请提供书名或书籍ID")
     
     try:
-        loop = asyncio.get_event_loop()
-        
         try:
-            result = await asyncio.wait_for(
-                loop.run_in_executor(
-                    executor,
-                    lambda: run_detail_spider(
-                        book_name=book_name,
-                        book_id=book_id,
-                        use_mysql=USE_MYSQL
-                    )
-                ),
+            result = await run_job(
+                JobRequest(kind="fanqie_detail", book_name=book_name, book_id=book_id),
                 timeout=60.0
             )
         except asyncio.TimeoutError:
+            result = None
+        
+        if result is None:
             result = {'book': None, 'success': False}
         
         if result['success']:
@@ -318,21 +552,15 @@ async def crawl_fanqie_author(author_name: str):
         raise HTTPException(status_code=400, detail="请提供作者名")
     
     try:
-        loop = asyncio.get_event_loop()
-        
         try:
-            results = await asyncio.wait_for(
-                loop.run_in_executor(
-                    executor,
-                    lambda: run_author_spider(
-                        author_name=author_name,
-                        use_mysql=USE_MYSQL,
-                        max_books=50
-                    )
-                ),
+            results = await run_job(
+                JobRequest(kind="fanqie_author", author_name=author_name, max_books=50),
                 timeout=60.0
             )
         except asyncio.TimeoutError:
+            results = None
+        
+        if results is None:
             results = {'books': [], 'total_crawled': 0, 'author': author_name}
         
         books = results.get('books', [])
@@ -345,6 +573,9 @@ async def crawl_fanqie_author(author_name: str):
             "total_crawled": results.get('total_crawled', 0)
         }
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -356,25 +587,30 @@ async def crawl_fanqie_author(author_name: str):
 
 
 @app.get("/api/fanqie/recommend")
-async def get_fanqie_recommend(limit: int = 100):
+async def get_fanqie_recommend(limit: int = 100, cursor: Optional[str] = None):
     """
-    从数据库获取推荐书籍列表
+    从数据库获取推荐书籍列表（游标分页）
     
     参数:
-        limit: 返回数量限制
+        limit: 每页数量（最多 100）
+        cursor: 上一页返回的 next_cursor（为空表示第一页）
     
     返回:
-        推荐书籍列表
+        推荐书籍列表和下一页游标
     """
     try:
-        books = MySQLPool.get_fanqie_recommend_list(limit=limit)
+        page = await AsyncMySQLPool.get_fanqie_recommend_page(limit=limit, cursor=cursor)
+        books = page['books']
         
         return {
             "success": True,
             "count": len(books),
-            "books": books
+            "books": books,
+            "next_cursor": page['next_cursor']
         }
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -394,7 +630,7 @@ async def get_fanqie_detail(book_id: str):
         书籍详情
     """
     try:
-        book = MySQLPool.get_fanqie_book_detail(book_id)
+        book = await AsyncMySQLPool.get_fanqie_book_detail(book_id)
         
         if book:
             return {
@@ -425,7 +661,7 @@ async def get_fanqie_author_books(author_name: str):
         作者的书籍列表
     """
     try:
-        books = MySQLPool.get_fanqie_author_books(author_name)
+        books = await AsyncMySQLPool.get_fanqie_author_books(author_name)
         
         return {
             "success": True,
@@ -466,28 +702,35 @@ async def crawl_fanqie_books(request: SearchRequest):
         raise HTTPException(status_code=400, detail="爬取数量必须在 0-500 之间（0表示爬取所有）")
     
     try:
-        # 在线程池中异步运行爬虫，避免阻塞主线程
-        loop = asyncio.get_event_loop()
+        # 在任务线程池中运行爬虫，避免阻塞主线程
+        try:
+            def run(job):
+                results = run_fanqie_spider(
+                    keyword=keyword,
+                    thread_count=3,
+                    use_mysql=USE_MYSQL,
+                    mysql_config=MYSQL_CONFIG,
+                    max_books=max_books,
+                    proxy=proxy
+                )
+                if results and results.get('total_saved'):
+                    books_cache.invalidate('books_fanqie', keyword)
+                    books_cache.invalidate('search')
+                return results
+            
+            job = job_manager.submit("fanqie", run, {"keyword": keyword, "max_books": max_books})
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
         # 使用 asyncio.wait_for 添加超时保护
         try:
             results = await asyncio.wait_for(
-                loop.run_in_executor(
-                    executor,
-                    lambda: run_fanqie_spider(
-                        keyword=keyword,
-                        thread_count=3,
-                        use_mysql=USE_MYSQL,
-                        mysql_config=MYSQL_CONFIG,
-                        max_books=max_books,
-                        proxy=proxy
-                    )
-                ),
+                asyncio.shield(asyncio.wrap_future(job.future)),
                 timeout=90.0  # 90秒超时
             )
         except asyncio.TimeoutError:
             # 超时后返回空结果
-            results = []
+            results = None
         
         # 确保 results 不为 None
         if results is None:
@@ -514,6 +757,9 @@ async def crawl_fanqie_books(request: SearchRequest):
         
         return response_data
     
+    except HTTPException:
+        raise
+    
     except asyncio.TimeoutError:
         raise HTTPException(
             status_code=504,
@@ -532,31 +778,36 @@ async def crawl_fanqie_books(request: SearchRequest):
 
 
 @app.get("/api/books/fanqie", response_model=SearchResponse)
-async def get_fanqie_books_from_db(keyword: Optional[str] = None, limit: int = 100):
+async def get_fanqie_books_from_db(keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
     """
-    从数据库获取番茄小说数据
+    从数据库获取番茄小说数据（游标分页，结果带缓存）
     
     参数:
         keyword: 搜索关键词（可选）
-        limit: 返回数量限制
+        limit: 每页数量（最多 100）
+        cursor: 上一页返回的 next_cursor（为空表示第一页）
     
     返回:
-        包含小说列表的响应
+        包含小说列表和下一页游标的响应
     """
     try:
-        # 根据关键词获取数据
-        if keyword:
-            books = MySQLPool.get_fanqie_books_by_keyword(keyword.strip())
-        else:
-            books = MySQLPool.get_all_fanqie_books(limit=limit)
+        keyword = keyword.strip() if keyword else None
+        page = await books_cache.get_or_load_async(
+            ('books_fanqie', keyword, limit, cursor),
+            lambda: AsyncMySQLPool.get_fanqie_books_page(keyword=keyword, limit=limit, cursor=cursor)
+        )
+        books = page['books']
         
         return SearchResponse(
             success=True,
             keyword=keyword or "全部",
             count=len(books),
-            books=books
+            books=books,
+            next_cursor=page['next_cursor']
         )
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -606,32 +857,20 @@ async def crawl_books(request: SearchRequest):
         # print(f"{'='*60}\n")
     
     try:
-        # 在线程池中异步运行爬虫，避免阻塞主线程
-        loop = asyncio.get_event_loop()
-        
+        # 在任务线程池中运行爬虫，避免阻塞主线程
         # print("🔄 开始执行爬虫任务...")
         
         # 使用 asyncio.wait_for 添加超时保护
         try:
-            results = await asyncio.wait_for(
-                loop.run_in_executor(
-                    executor,
-                    lambda: run_spider(
-                        keyword=keyword,
-                        thread_count=3,
-                        use_mysql=USE_MYSQL,
-                        mysql_config=MYSQL_CONFIG,
-                        max_books=max_books,
-                        proxy=proxy
-                    )
-                ),
+            results = await run_job(
+                JobRequest(kind="dangdang", keyword=keyword, max_books=max_books, proxy=proxy),
                 timeout=90.0  # 90秒超时（从180秒减少）
             )
         except asyncio.TimeoutError:
             # print("⚠️ 爬虫任务超时，强制返回")
             pass
             # 超时后返回空结果
-            results = []
+            results = None
         
         # print(f"🔄 爬虫任务执行完毕，返回 {len(results) if results else 0} 条结果")
         
@@ -663,12 +902,17 @@ async def crawl_books(request: SearchRequest):
             total_crawled=results.get('total_crawled', 0),
             total_saved=results.get('total_saved', 0),
             total_duplicates=results.get('total_duplicates', 0),
+            total_known_skipped=results.get('total_known_skipped', 0),
+            total_shared_skipped=results.get('total_shared_skipped', 0),
             dedup_key=results.get('dedup_key', '标题 + 作者')
         )
         
         # print(f"📤 准备返回响应: success={response_data.success}, count={response_data.count}, saved={response_data.total_saved}")
         return response_data
     
+    except HTTPException:
+        raise
+    
     except asyncio.TimeoutError:
         # print(f"\n{'='*60}")
         pass
@@ -693,32 +937,248 @@ async def crawl_books(request: SearchRequest):
         )
 
 
+@app.post("/api/crawl/batch", status_code=202)
+async def crawl_books_batch(request: BatchCrawlRequest):
+    """
+    批量爬取多个关键词（所有关键词共用一个爬虫，立即返回任务ID）
+    
+    参数:
+        request: 关键词列表和每个关键词的爬取数量
+    
+    返回:
+        任务信息（通过 /api/jobs/{job_id} 查询进度，任务结束后 result.keywords 为每个关键词的统计）
+    """
+    job = submit_job(JobRequest(
+        kind="dangdang_batch",
+        keywords=request.keywords,
+        max_books=request.max_books,
+        proxy=request.proxy
+    ))
+    return {
+        "success": True,
+        **job.to_dict(include_result=False)
+    }
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """
+    提交爬取任务（立即返回任务ID，不等待爬取完成）
+    
+    参数:
+        request: 任务类型及参数
+    
+    返回:
+        任务信息（通过 /api/jobs/{job_id} 查询进度和结果）
+    """
+    job = submit_job(request)
+    return {
+        "success": True,
+        **job.to_dict(include_result=False)
+    }
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """
+    列出爬取任务（不含结果）
+    
+    返回:
+        任务列表和各状态数量
+    """
+    # 多进程部署时需要查询 crawl_jobs 表，放到线程池中执行
+    stats, jobs = await asyncio.gather(
+        asyncio.to_thread(job_manager.stats),
+        asyncio.to_thread(job_manager.list)
+    )
+    return {
+        "success": True,
+        "stats": stats,
+        "jobs": [job.to_dict(include_result=False) for job in jobs]
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    查询爬取任务的状态、实时进度和结果
+    
+    参数:
+        job_id: 任务ID
+    
+    返回:
+        任务信息（任务结束后包含 result）
+    """
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return {
+        "success": True,
+        **job.to_dict()
+    }
+
+
+def format_sse(event: str, data) -> str:
+    """
+    格式化一条 Server-Sent Events 消息
+    :param event: 事件名
+    :param data: 事件数据（序列化为 JSON）
+    :return: SSE 文本
+    """
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def job_event_stream(job, progress_interval: float = 1.0):
+    """
+    任务事件流：先回放已解析出的数据，之后每解析出一条推送一条 book 事件，
+    每隔 progress_interval 秒推送一次 progress 事件，任务结束时推送 done 事件
+    :param job: 爬取任务
+    :param progress_interval: 进度推送间隔（秒）
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    
+    def listener(event, data):
+        # 在爬虫线程中被调用，切换到事件循环线程
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+    
+    history, done = job.subscribe(listener)
+    try:
+        yield format_sse("job", {"job_id": job.id, "kind": job.kind, "params": job.params})
+        for book in history:
+            yield format_sse("book", book)
+        
+        if done:
+            yield format_sse("done", job.to_dict(include_result=False))
+            return
+        
+        last_progress = 0.0
+        while True:
+            timeout = max(0.0, last_progress + progress_interval - loop.time())
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                event, data = None, None
+            
+            if event is not None:
+                yield format_sse(event, data)
+                if event == "done":
+                    return
+            
+            if loop.time() - last_progress >= progress_interval:
+                last_progress = loop.time()
+                yield format_sse("progress", {"status": job.status, **job.progress()})
+    finally:
+        job.unsubscribe(listener)
+
+
+async def snapshot_event_stream(job: JobSnapshot, poll_interval: float = 2.0):
+    """
+    其他 worker 进程中任务的事件流：轮询 crawl_jobs 表推送 progress 事件，任务结束时推送 done 事件
+    （逐条的 book 事件只在执行任务的进程中可用）
+    :param job: 任务快照
+    :param poll_interval: 轮询间隔（秒）
+    """
+    yield format_sse("job", {"job_id": job.id, "kind": job.kind, "params": job.params})
+    while not job.done:
+        yield format_sse("progress", {"status": job.status, **job.progress()})
+        await asyncio.sleep(poll_interval)
+        latest = await asyncio.to_thread(job_manager.get, job.id)
+        if latest is None:
+            return
+        job = latest
+    yield format_sse("done", job.to_dict(include_result=False))
+
+
+def sse_response(job) -> StreamingResponse:
+    """
+    构造任务事件流响应
+    :param job: 爬取任务（CrawlJob 或其他进程中任务的 JobSnapshot）
+    :return: text/event-stream 响应
+    """
+    stream = snapshot_event_stream(job) if isinstance(job, JobSnapshot) else job_event_stream(job)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 关闭反向代理缓冲，保证实时推送
+        }
+    )
+
+
+@app.get("/api/crawl/stream")
+async def crawl_books_stream(keyword: str, max_books: int = 20, proxy: Optional[str] = None):
+    """
+    流式爬取图书（Server-Sent Events）
+    每解析出一本图书立即推送 book 事件，并定期推送 progress 事件，结束时推送 done 事件
+    
+    参数:
+        keyword: 搜索关键词
+        max_books: 最大爬取数量（0表示爬取所有）
+        proxy: 代理地址
+    
+    返回:
+        text/event-stream 事件流
+    """
+    if max_books < 0 or max_books > 500:
+        raise HTTPException(status_code=400, detail="爬取数量必须在 0-500 之间（0表示爬取所有）")
+    
+    job = submit_job(JobRequest(kind="dangdang", keyword=keyword[:50], max_books=max_books, proxy=proxy))
+    return sse_response(job)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """
+    订阅任务事件流（Server-Sent Events），可在任务运行中或结束后订阅
+    
+    参数:
+        job_id: 任务ID
+    
+    返回:
+        text/event-stream 事件流
+    """
+    job = await asyncio.to_thread(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return sse_response(job)
+
+
 @app.get("/api/books", response_model=SearchResponse)
-async def get_books_from_db(keyword: Optional[str] = None, limit: int = 100):
+async def get_books_from_db(keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
     """
-    从数据库获取图书数据
+    从数据库获取图书数据（按价格升序的游标分页，结果带缓存）
     
     参数:
         keyword: 搜索关键词（可选）
-        limit: 返回数量限制
+        limit: 每页数量（最多 100）
+        cursor: 上一页返回的 next_cursor（为空表示第一页）
     
     返回:
-        包含图书列表的响应
+        包含图书列表和下一页游标的响应
     """
     try:
-        # 根据关键词获取数据
-        if keyword:
-            books = MySQLPool.get_books_by_keyword(keyword.strip())
-        else:
-            books = MySQLPool.get_all_books(limit=limit)
+        keyword = keyword.strip() if keyword else None
+        page = await books_cache.get_or_load_async(
+            ('books', keyword, limit, cursor),
+            lambda: AsyncMySQLPool.get_books_page(keyword=keyword, limit=limit, cursor=cursor)
+        )
+        books = page['books']
         
         return SearchResponse(
             success=True,
             keyword=keyword or "全部",
             count=len(books),
-            books=books
+            books=books,
+            next_cursor=page['next_cursor']
         )
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # print(f"数据库查询错误: {str(e)}")
         raise HTTPException(
@@ -727,11 +1187,104 @@ async def get_books_from_db(keyword: Optional[str] = None, limit: int = 100):
         )
 
 
+@app.get("/api/search", response_model=SearchResponse)
+async def search_books(
+    q: str,
+    source: Literal["all", "dangdang", "fanqie"] = "all",
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    """
+    在已入库的图书中搜索标题、作者、简介（走全文索引，不访问网站）
+    
+    参数:
+        q: 搜索词
+        source: 数据来源（all: 全部, dangdang: 当当图书, fanqie: 番茄小说）
+        limit: 每页数量（最多 100）
+        cursor: 上一页返回的 next_cursor（为空表示第一页）
+    
+    返回:
+        按相关度排序的结果列表和下一页游标
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="搜索词不能为空")
+    
+    try:
+        page = await books_cache.get_or_load_async(
+            ('search', None, q, source, limit, cursor),
+            lambda: AsyncMySQLPool.search_books(q, source=source, limit=limit, cursor=cursor)
+        )
+        books = page['books']
+        
+        return SearchResponse(
+            success=True,
+            keyword=q,
+            count=len(books),
+            books=books,
+            next_cursor=page['next_cursor']
+        )
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"搜索失败: {str(e)}"
+        )
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """获取查询结果缓存的命中统计"""
+    return {
+        "success": True,
+        **books_cache.stats()
+    }
+
+
+@app.get("/api/dedup/stats")
+async def get_dedup_stats():
+    """获取详情页去重登记表的统计（登记数量、因已请求过而跳过的次数）"""
+    return {
+        "success": True,
+        **get_seen_registry().stats()
+    }
+
+
+@app.get("/api/pool")
+async def get_pool_stats():
+    """
+    获取 MySQL 连接池快照（借出/空闲/等待中的连接数、新建/关闭次数、取连接等待时间分布）
+    async_pool 为只读接口使用的异步连接池
+    """
+    return {
+        "success": True,
+        **MySQLPool.pool_stats(),
+        "async_pool": AsyncMySQLPool.pool_stats()
+    }
+
+
+@app.get("/api/parser/stats")
+async def get_parser_stats():
+    """
+    获取当当详情页字段提取规则的命中统计
+    每个字段列出各条 XPath 的命中次数和命中率，dead_xpaths 为从未命中过的备选表达式
+    """
+    return {
+        "success": True,
+        **DETAIL_EXTRACTOR.stats(),
+        "dead_xpaths": [
+            {"field": field, "xpath": xpath} for field, xpath in DETAIL_EXTRACTOR.dead_xpaths()
+        ]
+    }
+
+
 @app.get("/api/stats")
 async def get_stats():
     """获取统计信息"""
     try:
-        stats = MySQLPool.get_statistics()
+        stats = await AsyncMySQLPool.get_statistics()
         
         return {
             "success": True,
@@ -753,6 +1306,8 @@ async def get_stats():
 async def global_exception_handler(request, exc):
     """全局异常处理"""
     # print(f"全局异常: {str(exc)}")
+    # 按路由模板计数（不用实际路径，避免 /api/jobs/{job_id} 之类的路径产生大量标签值）
+    crawl_metrics.ERRORS.labels("api", getattr(request.scope.get("route"), "path", "unknown")).inc()
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -766,9 +1321,9 @@ def cleanup():
     """清理资源"""
     # print("\n🧹 正在清理资源...")
     
-    # 关闭线程池
+    # 关闭任务线程池
     try:
-        executor.shutdown(wait=False, cancel_futures=True)
+        job_manager.shutdown()
         # print("✅ 线程池已关闭")
     except Exception as e:
         # print(f"⚠️ 关闭线程池失败: {e}")
@@ -776,13 +1331,7 @@ def cleanup():
     
     # 关闭数据库连接池
     if USE_MYSQL:
-        try:
-            if MySQLPool._pool:
-                MySQLPool._pool.close()
-                # print("✅ 数据库连接池已关闭")
-        except Exception as e:
-            # print(f"⚠️ 关闭数据库连接池失败: {e}")
-            pass
+        MySQLPool.close_pool()
 
 
 if __name__ == "__main__":
@@ -846,14 +1395,28 @@ if __name__ == "__main__":
     # print("="*60)
     # print()
     
+    workers = API_WORKERS
+    
     try:
-        uvicorn.run(
-            app,
-            host="0.0.0.0",
-            port=port,
-            log_level="info",
-            access_log=True
-        )
+        if workers > 1:
+            # 多进程模式下 uvicorn 需要以导入路径加载应用，各 worker 在 lifespan 中各自初始化连接池
+            uvicorn.run(
+                "backend.api:app",
+                app_dir=parent_dir,
+                host="0.0.0.0",
+                port=port,
+                workers=workers,
+                log_level="info",
+                access_log=True
+            )
+        else:
+            uvicorn.run(
+                app,
+                host="0.0.0.0",
+                port=port,
+                log_level="info",
+                access_log=True
+            )
     except KeyboardInterrupt:
         # print("\n")
         pass
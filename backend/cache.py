@@ -0,0 +1,159 @@
+"""
+查询结果缓存模块
+进程内 LRU + TTL 缓存，用于 /api/books 等频繁轮询的只读接口，
+爬取任务新增数据后按关键词失效；失效时加载中的结果不会写回缓存
+失效只作用于当前进程，多进程部署时应禁用缓存（enabled=False）
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResultCache:
+    """LRU + TTL 结果缓存（线程安全）"""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 60, enabled: bool = True):
+        """
+        初始化缓存
+        :param maxsize: 最大条目数（超过后淘汰最久未使用的条目）
+        :param ttl: 条目有效期（秒）
+        :param enabled: 是否启用；禁用时 get 总是未命中、set 不写入，get_or_load 每次都调用 loader
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._data: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 失效代数：每次失效加一，加载开始时记录代数，写入时代数已变化则丢弃（加载期间发生了失效）
+        self._endpoint_generations: Dict[Hashable, int] = {}
+        self._keyword_generations: Dict[Tuple[Hashable, Optional[str]], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """
+        读取缓存
+        :param key: 缓存键（第一个元素为接口名，第二个元素为关键词，其余为分页参数）
+        :return: (是否命中, 缓存值)
+        """
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def generation(self, key: Tuple) -> Tuple[int, int]:
+        """
+        缓存键当前的失效代数（加载前读取，写入时传给 set）
+        :param key: 缓存键
+        :return: (接口代数, 关键词代数)
+        """
+        with self._lock:
+            return self._generation(key)
+
+    def _generation(self, key: Tuple) -> Tuple[int, int]:
+        return (
+            self._endpoint_generations.get(key[0], 0),
+            self._keyword_generations.get((key[0], key[1]), 0)
+        )
+
+    def set(self, key: Tuple, value: Any, generation: Optional[Tuple[int, int]] = None):
+        """
+        写入缓存
+        :param key: 缓存键
+        :param value: 缓存值
+        :param generation: 加载开始时的失效代数（见 generation），之后发生过失效则不写入
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation(key):
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并写入缓存
+        :param key: 缓存键
+        :param loader: 加载函数
+        :return: 缓存值
+        """
+        hit, value = self.get(key)
+        if hit:
+            return value
+        generation = self.generation(key)
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    async def get_or_load_async(self, key: Tuple, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        get_or_load 的协程版本（用于异步数据层）
+        :param key: 缓存键
+        :param loader: 返回可等待对象的加载函数
+        :return: 缓存值
+        """
+        hit, value = self.get(key)
+        if hit:
+            return value
+        generation = self.generation(key)
+        value = await loader()
+        self.set(key, value, generation)
+        return value
+
+    def invalidate(self, endpoint: Hashable, keyword: Optional[str] = None) -> int:
+        """
+        使缓存失效
+        :param endpoint: 接口名
+        :param keyword: 关键词；传入时失效该关键词及不带关键词的全量列表，不传时失效该接口全部条目
+        :return: 失效的条目数
+        """
+        with self._lock:
+            if keyword is None:
+                self._endpoint_generations[endpoint] = self._endpoint_generations.get(endpoint, 0) + 1
+                keys = [key for key in self._data if key[0] == endpoint]
+            else:
+                for kw in (keyword, None):
+                    self._keyword_generations[(endpoint, kw)] = self._keyword_generations.get((endpoint, kw), 0) + 1
+                keys = [key for key in self._data if key[0] == endpoint and key[1] in (keyword, None)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """
+        缓存统计
+        :return: 命中/未命中次数、命中率、条目数等
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,154 @@
+"""
+爬取任务共享存储
+把任务状态、进度和结果写入 MySQL crawl_jobs 表，后端以多个 worker 进程运行时，
+任一进程都能查询其他进程中任务的状态（任务本身只在提交它的进程中执行）
+"""
+
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+
+from mysql_pool import MySQLPool
+
+
+class MySQLJobStore:
+    """基于 crawl_jobs 表的任务存储（表由 MySQLPool.initialize 创建）"""
+
+    # 列表/统计不读取 result 列（可能很大）
+    _SUMMARY_COLUMNS = "job_id, kind, params, status, progress, error, worker, created_at, started_at, finished_at"
+
+    def __init__(self, worker: Optional[str] = None):
+        """
+        初始化
+        :param worker: 当前进程标识（默认 主机名:进程号）
+        """
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _dumps(value) -> Optional[str]:
+        if value is None:
+            return None
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    def _params(self, data: Dict, now: float) -> tuple:
+        return (
+            data['job_id'], data['kind'], self._dumps(data.get('params')), data['status'],
+            self._dumps(data.get('progress')), self._dumps(data.get('result')), data.get('error'),
+            self.worker, data['created_at'], data.get('started_at'), data.get('finished_at'), now
+        )
+
+    def save(self, jobs: List[Dict]):
+        """
+        写入任务（不存在则插入，存在则更新状态、进度、结果和心跳时间）
+        :param jobs: 任务字典列表（CrawlJob.to_dict() 的返回值）
+        """
+        if not jobs:
+            return
+        sql = """
+        INSERT INTO crawl_jobs (
+            job_id, kind, params, status, progress, result, error,
+            worker, created_at, started_at, finished_at, heartbeat_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status),
+            progress = VALUES(progress),
+            result = VALUES(result),
+            error = VALUES(error),
+            started_at = VALUES(started_at),
+            finished_at = VALUES(finished_at),
+            heartbeat_at = VALUES(heartbeat_at)
+        """
+        now = time.time()
+        with MySQLPool.session() as s:
+            s.executemany(sql, [self._params(data, now) for data in jobs])
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """
+        读取任务（含结果）
+        :param job_id: 任务ID
+        :return: 任务字典，不存在时返回 None
+        """
+        with MySQLPool.session(commit=False) as s:
+            s.execute(f"SELECT {self._SUMMARY_COLUMNS}, result FROM crawl_jobs WHERE job_id = %s", (job_id,))
+            row = s.fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int) -> List[Dict]:
+        """
+        列出最近提交的任务（不含结果）
+        :param limit: 最多返回数量
+        :return: 任务字典列表（按提交时间倒序）
+        """
+        with MySQLPool.session(commit=False) as s:
+            s.execute(
+                f"SELECT {self._SUMMARY_COLUMNS} FROM crawl_jobs ORDER BY created_at DESC LIMIT %s",
+                (limit,)
+            )
+            rows = s.fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """
+        各状态的任务数量（所有进程）
+        :return: 状态 -> 数量
+        """
+        with MySQLPool.session(commit=False) as s:
+            s.execute("SELECT status, COUNT(*) AS count FROM crawl_jobs GROUP BY status")
+            rows = s.fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    def fail_stale(self, stale_after: float) -> int:
+        """
+        把超过 stale_after 秒没有心跳的未结束任务标记为失败（所在进程已退出）
+        :param stale_after: 心跳超时（秒）
+        :return: 标记的任务数
+        """
+        now = time.time()
+        with MySQLPool.session() as s:
+            s.execute("""
+            UPDATE crawl_jobs
+            SET status = 'failed', error = '任务所在的进程已退出', finished_at = %s
+            WHERE status IN ('queued', 'running') AND heartbeat_at < %s
+            """, (now, now - stale_after))
+            return s.rowcount
+
+    def prune(self, keep: int) -> int:
+        """
+        只保留最近结束的 keep 个任务
+        :param keep: 保留数量
+        :return: 删除的任务数
+        """
+        with MySQLPool.session() as s:
+            s.execute("""
+            SELECT finished_at FROM crawl_jobs
+            WHERE finished_at IS NOT NULL
+            ORDER BY finished_at DESC
+            LIMIT 1 OFFSET %s
+            """, (keep,))
+            row = s.fetchone()
+            if not row:
+                return 0
+            s.execute("DELETE FROM crawl_jobs WHERE finished_at IS NOT NULL AND finished_at <= %s",
+                      (row['finished_at'],))
+            return s.rowcount
+
+    @staticmethod
+    def _to_dict(row: Dict) -> Dict:
+        """数据库行 -> 任务字典（格式与 CrawlJob.to_dict() 一致）"""
+        data = {
+            'job_id': row['job_id'],
+            'kind': row['kind'],
+            'params': json.loads(row['params']) if row.get('params') else {},
+            'status': row['status'],
+            'progress': json.loads(row['progress']) if row.get('progress') else {},
+            'created_at': row['created_at'],
+            'started_at': row.get('started_at'),
+            'finished_at': row.get('finished_at'),
+            'error': row.get('error'),
+            'worker': row.get('worker', '')
+        }
+        if row.get('result') is not None:
+            data['result'] = json.loads(row['result'])
+        return data
@@ -0,0 +1,385 @@
+"""
+爬取任务模块
+提交爬取任务后立即返回任务ID，任务在可配置大小的线程池中排队执行，
+执行期间可随时查询爬虫的实时进度，完成后可获取结果；
+接入共享存储后（见 job_store.py），多个 worker 进程中的任务都可以在任一进程中查询
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+JOB_FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """排队中的任务过多"""
+    pass
+
+
+class CrawlJob:
+    """爬取任务"""
+
+    def __init__(self, kind: str, params: Optional[Dict] = None):
+        """
+        初始化任务
+        :param kind: 任务类型（dangdang / fanqie_recommend / fanqie_detail / fanqie_author）
+        :param params: 任务参数（仅用于展示）
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future: Optional[Future] = None
+        self._spider = None  # 运行中的爬虫实例（用于读取实时进度）
+        self._final_progress = None  # 结束时的进度快照
+        self.books: List[Dict] = []  # 已解析出的数据（按解析顺序，供事件流回放）
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self._lock = threading.Lock()
+
+    def attach_spider(self, spider):
+        """
+        关联运行中的爬虫（作为 run_spider 等函数的 on_spider 回调）
+        :param spider: 爬虫实例
+        """
+        self._spider = spider
+
+    def publish_book(self, book: Dict):
+        """
+        发布一条刚解析出的数据（作为 run_spider 的 on_result 回调）
+        :param book: 数据字典
+        """
+        with self._lock:
+            self.books.append(book)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener('book', book)
+
+    def subscribe(self, listener: Callable[[str, Any], None]):
+        """
+        订阅任务事件：listener(event, data)，event 为 book / done
+        回调在爬虫线程中执行，订阅方需自行切换线程
+        :param listener: 事件回调
+        :return: (订阅前已解析出的数据, 任务是否已结束)
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            return list(self.books), self.done
+
+    def unsubscribe(self, listener: Callable[[str, Any], None]):
+        """
+        取消订阅
+        :param listener: 事件回调
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def progress(self) -> Dict:
+        """
+        读取实时进度
+        :return: 进度字典
+        """
+        if self._final_progress is not None:
+            return self._final_progress
+
+        spider = self._spider
+        if spider is None:
+            return {'crawled_count': 0, 'saved_count': 0, 'duplicate_count': 0}
+
+        results = getattr(spider, 'results', None) or []
+        return {
+            'crawled_count': getattr(spider, 'crawled_count', len(results)),
+            'saved_count': getattr(spider, 'saved_count', 0),
+            'duplicate_count': getattr(spider, 'duplicate_count', 0)
+        }
+
+    def start(self) -> bool:
+        """
+        标记任务开始执行
+        :return: 是否开始（任务已结束时为 False，如服务停止时已被标记为失败）
+        """
+        with self._lock:
+            if self.done:
+                return False
+            self.status = JOB_RUNNING
+            self.started_at = time.time()
+            return True
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """
+        结束任务：记录结果并保存进度快照，释放爬虫实例（只有第一次调用生效）
+        :param status: 结束状态
+        :param result: 任务结果
+        :param error: 错误信息
+        :return: 是否由本次调用结束（任务已结束时为 False，不覆盖之前的状态）
+        """
+        with self._lock:
+            if self.done:
+                return False
+            self._final_progress = self.progress()
+            self._spider = None
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.status = status
+            listeners = list(self._listeners)
+        
+        summary = self.to_dict(include_result=False)
+        for listener in listeners:
+            listener('done', summary)
+        return True
+
+    @property
+    def done(self) -> bool:
+        """任务是否已结束"""
+        return self.status in (JOB_FINISHED, JOB_FAILED)
+
+    def to_dict(self, include_result: bool = True) -> Dict:
+        """
+        转换为响应字典
+        :param include_result: 是否包含任务结果（仅任务结束后有结果）
+        :return: 任务信息字典
+        """
+        data = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress(),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+        if include_result and self.done:
+            data['result'] = self.result
+        return data
+
+
+class JobSnapshot:
+    """从共享存储读取的任务快照（任务在其他 worker 进程中执行，只读）"""
+
+    def __init__(self, data: Dict):
+        """
+        初始化
+        :param data: 任务字典（格式与 CrawlJob.to_dict() 一致）
+        """
+        self._data = data
+        self.id = data['job_id']
+        self.kind = data['kind']
+        self.params = data.get('params') or {}
+        self.status = data['status']
+        self.created_at = data['created_at']
+
+    @property
+    def done(self) -> bool:
+        """任务是否已结束"""
+        return self.status in (JOB_FINISHED, JOB_FAILED)
+
+    def progress(self) -> Dict:
+        """最近一次写入存储的进度"""
+        return self._data.get('progress') or {'crawled_count': 0, 'saved_count': 0, 'duplicate_count': 0}
+
+    def to_dict(self, include_result: bool = True) -> Dict:
+        """
+        转换为响应字典
+        :param include_result: 是否包含任务结果（仅任务结束后有结果）
+        :return: 任务信息字典
+        """
+        data = {key: value for key, value in self._data.items() if key != 'result'}
+        if include_result and self.done:
+            data['result'] = self._data.get('result')
+        return data
+
+
+class JobManager:
+    """爬取任务管理器"""
+
+    def __init__(self, max_workers: int = 3, max_pending: int = 500, max_finished: int = 1000,
+                 sync_interval: float = 2.0, stale_after: float = 300):
+        """
+        初始化任务管理器
+        :param max_workers: 同时执行的任务数量
+        :param max_pending: 排队 + 执行中的任务上限（超过则拒绝提交）
+        :param max_finished: 保留的已结束任务数量（超过则淘汰最早的）
+        :param sync_interval: 接入共享存储后，未结束任务的进度写入间隔（秒）
+        :param stale_after: 接入共享存储后，超过该时间（秒）没有写入的未结束任务视为所在进程已退出
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.sync_interval = sync_interval
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl-job")
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = None
+        self._store_writer: Optional[ThreadPoolExecutor] = None
+        self._stopped = threading.Event()
+
+    def attach_store(self, store):
+        """
+        接入共享存储：任务提交、开始、结束时写入存储，未结束任务的进度每 sync_interval 秒写入一次，
+        查询不在本进程中的任务时从存储读取
+        写入在单独的线程中按提交顺序执行，不阻塞调用方
+        :param store: 任务存储（见 job_store.MySQLJobStore）
+        """
+        if self._store is not None:
+            return
+        self._store = store
+        self._store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        threading.Thread(target=self._sync_loop, name="job-sync", daemon=True).start()
+
+    def submit(self, kind: str, func: Callable[[CrawlJob], Any], params: Optional[Dict] = None) -> CrawlJob:
+        """
+        提交任务（立即返回）
+        :param kind: 任务类型
+        :param func: 任务函数 func(job)，返回值作为任务结果；应把 job.attach_spider 传给爬虫运行函数
+        :param params: 任务参数（仅用于展示）
+        :return: 任务
+        """
+        job = CrawlJob(kind, params)
+        with self._lock:
+            active = sum(1 for item in self._jobs.values() if not item.done)
+            if active >= self.max_pending:
+                raise JobQueueFull(f"排队任务过多（{active}），请稍后重试")
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._persist(job)
+        job.future = self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str):
+        """
+        查询任务（本进程中没有时从共享存储读取，会访问数据库）
+        :param job_id: 任务ID
+        :return: CrawlJob（本进程中的任务）或 JobSnapshot（其他进程中的任务），不存在时返回 None
+        """
+        job = self._jobs.get(job_id)
+        if job is not None or self._store is None:
+            return job
+        data = self._store.load(job_id)
+        return JobSnapshot(data) if data else None
+
+    def list(self) -> List:
+        """
+        列出全部任务（按提交时间倒序；接入共享存储后包含其他进程中最近的 max_finished 个任务）
+        :return: 任务列表
+        """
+        with self._lock:
+            jobs = list(reversed(self._jobs.values()))
+        if self._store is None:
+            return jobs
+        
+        local_ids = {job.id for job in jobs}
+        jobs += [JobSnapshot(data) for data in self._store.list(self.max_finished) if data['job_id'] not in local_ids]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs
+
+    def stats(self) -> Dict:
+        """
+        任务统计（接入共享存储后为所有进程的合计）
+        :return: 各状态的任务数量
+        """
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_FINISHED: 0, JOB_FAILED: 0}
+        if self._store is not None:
+            for status, count in self._store.counts().items():
+                if status in counts:
+                    counts[status] = count
+        else:
+            with self._lock:
+                for job in self._jobs.values():
+                    counts[job.status] += 1
+        counts['max_workers'] = self.max_workers
+        return counts
+
+    def shutdown(self):
+        """关闭线程池（取消排队中的任务）；接入共享存储时把本进程未结束的任务标记为失败"""
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._store is not None:
+            with self._lock:
+                active = [job for job in self._jobs.values() if not job.done]
+            for job in active:
+                job.finish(JOB_FAILED, error="服务已停止，任务中断")
+            self._persist(*active)
+            self._store_writer.shutdown(wait=True)
+
+    def _run(self, job: CrawlJob, func: Callable[[CrawlJob], Any]):
+        """在工作线程中执行任务（服务停止后结束的任务已由 shutdown 标记为失败并写入存储，不再写入）"""
+        if not job.start():
+            return None
+        self._persist(job)
+        try:
+            result = func(job)
+            job.finish(JOB_FINISHED, result=result)
+            return result
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job.finish(JOB_FAILED, error=str(e))
+            return None
+        finally:
+            if not self._stopped.is_set():
+                self._persist(job)
+
+    def _persist(self, *jobs: CrawlJob):
+        """把任务交给写入线程（写入时读取任务的最新状态，后入队的旧快照不会覆盖新状态）"""
+        if self._store is None or not jobs:
+            return
+        try:
+            self._store_writer.submit(self._write, jobs)
+        except RuntimeError:
+            pass  # 写入线程已关闭
+
+    def _write(self, jobs):
+        try:
+            self._store.save([job.to_dict() for job in jobs])
+        except Exception as e:
+            # print(f"⚠️ 写入任务状态失败: {e}")
+            pass
+
+    def _maintain(self):
+        """标记已退出进程遗留的任务，清理超出保留数量的已结束任务"""
+        try:
+            self._store.fail_stale(self.stale_after)
+            self._store.prune(self.max_finished)
+        except Exception as e:
+            # print(f"⚠️ 清理任务表失败: {e}")
+            pass
+
+    def _sync_loop(self):
+        """定期写入本进程中未结束任务的进度（同时作为心跳），约每分钟清理一次任务表"""
+        rounds = 0
+        while not self._stopped.wait(self.sync_interval):
+            with self._lock:
+                active = [job for job in self._jobs.values() if not job.done]
+            self._persist(*active)
+            rounds += 1
+            if rounds * self.sync_interval >= 60:
+                rounds = 0
+                try:
+                    self._store_writer.submit(self._maintain)
+                except RuntimeError:
+                    return
+
+    def _prune(self):
+        """淘汰超出保留数量的已结束任务（调用方需持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
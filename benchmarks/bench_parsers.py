@@ -0,0 +1,218 @@
+"""
+爬虫解析函数性能测试（完全离线）
+用 benchmarks/fixtures 下保存的当当搜索页/详情页、番茄推荐页/搜索页/详情页/章节页：
+1. 直接调用各爬虫的解析回调，统计吞吐量（页/秒）、单页耗时 p50/p99 和进程峰值内存
+2. 对比 lxml 与 BeautifulSoup(html.parser) 两种解析后端的吞吐量，并检查两者提取结果一致
+
+用法:
+    python benchmarks/bench_parsers.py [--iterations 50] [--case 当当详情页] [--suite callbacks|backends]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feapder import Request
+from feapder.network.response import Response
+
+from dangdang import DangDangSpider
+from fanqie import FanQieAuthorSpider, FanQieDetailSpider, FanQieRecommendSpider, extract_book_detail, extract_book_items
+from fanqie_web_detail import FanQieWebDetail
+from html_parsing import BACKEND_BS4, BACKEND_LXML, HAS_LXML
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(filename):
+    """读取页面文件"""
+    with open(os.path.join(FIXTURE_DIR, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def peak_rss_mb():
+    """
+    进程峰值常驻内存（MB），无法获取时返回 None
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except Exception:
+        return None
+
+
+def spider_case(spider, callback_name, html, url, meta=None):
+    """
+    构造调用爬虫解析回调的函数（每次调用前清空结果，避免计数达到上限后提前返回）
+    :param spider: 爬虫实例（不启动）
+    :param callback_name: 解析方法名
+    :param html: 页面 HTML
+    :param url: 页面 URL
+    :param meta: 请求 meta
+    """
+    callback = getattr(spider, callback_name)
+
+    def run():
+        spider.results = []
+        spider.crawled_count = 0
+        # 每次构造新的 Response，保证解析缓存不会在多次调用间复用
+        request = Request(url, headers={}, meta=meta or {})
+        response = Response.from_text(html, url=url)
+        result = callback(request, response)
+        if result is not None:
+            for _ in result:  # 回调为生成器时消费掉生成的请求
+                pass
+    return run
+
+
+def build_cases():
+    """
+    构造解析回调用例：(名称, 调用函数)
+    """
+    dangdang = DangDangSpider(keyword="Python", use_mysql=False, max_books=0)
+    dangdang.max_crawl_limit = float('inf')
+    recommend = FanQieRecommendSpider(use_mysql=False, max_books=10 ** 6)
+    detail = FanQieDetailSpider(book_id="7276384138653862966", use_mysql=False)
+    author = FanQieAuthorSpider(author_name="三九音域", use_mysql=False, max_books=10 ** 6)
+    web_detail = FanQieWebDetail()
+    chapter_html = load_fixture('fanqie_chapter.html')
+    chapter_text = web_detail.parse_chapter_content(chapter_html)
+
+    return [
+        ('当当搜索页', spider_case(
+            dangdang, 'parse_search_page', load_fixture('dangdang_search.html'),
+            'https://search.dangdang.com/?key=Python&act=input')),
+        ('当当详情页', spider_case(
+            dangdang, 'parse_detail_page', load_fixture('dangdang_detail.html'),
+            'https://product.dangdang.com/29123456.html', meta={'title': 'Python', 'price': '¥71.60'})),
+        ('番茄推荐页', spider_case(
+            recommend, 'parse_recommend_page', load_fixture('fanqie_recommend.html'),
+            'https://fanqienovel.com/page/recommend')),
+        ('番茄详情页', spider_case(
+            detail, 'parse_detail_page', load_fixture('fanqie_detail.html'),
+            'https://fanqienovel.com/page/7276384138653862966')),
+        ('番茄作者搜索页', spider_case(
+            author, 'parse_search_page', load_fixture('fanqie_search.html'),
+            'https://fanqienovel.com/search/三九音域')),
+        ('番茄章节页', lambda: web_detail.parse_chapter_content(chapter_html)),
+        ('章节解码 decode_content', lambda: web_detail.decode_content(chapter_text)),
+    ]
+
+
+def build_backend_cases():
+    """
+    构造解析后端对比用例：(名称, 页面文件, 解析函数(html, backend))
+    """
+    detail = FanQieWebDetail()
+    return [
+        ('推荐页 extract_book_items', 'fanqie_recommend.html',
+         lambda html, backend: extract_book_items(html, '[class*="recommend-item"]', backend=backend)),
+        ('搜索页 extract_book_items', 'fanqie_search.html',
+         lambda html, backend: extract_book_items(html, backend=backend)),
+        ('详情页 extract_book_detail', 'fanqie_detail.html', extract_book_detail),
+        ('目录页 parse_book_info', 'fanqie_detail.html', detail.parse_book_info),
+        ('章节页 parse_chapter_content', 'fanqie_chapter.html', detail.parse_chapter_content),
+    ]
+
+
+def percentile(sorted_values, p):
+    """取已排序数据的 p 分位数（最近秩法）"""
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_case(func, iterations):
+    """
+    运行一个用例
+    :return: (页/秒, p50 毫秒, p99 毫秒)
+    """
+    func()  # 预热
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return (
+        len(latencies) / sum(latencies),
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000
+    )
+
+
+def run_callbacks(iterations, names=None):
+    """运行解析回调用例"""
+    cases = build_cases()
+    if names:
+        cases = [case for case in cases if case[0] in names]
+
+    print(f"{'用例':<24}{'页/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'峰值内存(MB)':>14}")
+    for name, func in cases:
+        pages_per_sec, p50, p99 = run_case(func, iterations)
+        rss = peak_rss_mb()
+        rss_text = f"{rss:.1f}" if rss is not None else "n/a"
+        print(f"{name:<24}{pages_per_sec:>10.1f}{p50:>10.2f}{p99:>10.2f}{rss_text:>14}")
+
+
+def run_backends(iterations, names=None) -> bool:
+    """
+    运行解析后端对比用例
+    :return: 两种后端的提取结果是否全部一致
+    """
+    if not HAS_LXML:
+        print("❌ 未安装 lxml / cssselect，无法对比")
+        return False
+
+    cases = build_backend_cases()
+    if names:
+        cases = [case for case in cases if case[0] in names]
+
+    matched = True
+    print(f"{'用例':<30}{'大小':>8}{'bs4 页/秒':>12}{'lxml 页/秒':>12}{'加速比':>8}")
+    for name, filename, func in cases:
+        html = load_fixture(filename)
+        if func(html, BACKEND_BS4) != func(html, BACKEND_LXML):
+            matched = False
+            print(f"❌ {name}: 两种后端的解析结果不一致")
+
+        bs4_rate = run_case(lambda: func(html, BACKEND_BS4), iterations)[0]
+        lxml_rate = run_case(lambda: func(html, BACKEND_LXML), iterations)[0]
+        print(f"{name:<30}{len(html) // 1024:>6}KB{bs4_rate:>12.1f}{lxml_rate:>12.1f}"
+              f"{lxml_rate / bs4_rate:>7.1f}x")
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬虫解析函数性能测试（离线）")
+    parser.add_argument('--iterations', type=int, default=50, help="每个用例的解析次数")
+    parser.add_argument('--case', action='append', help="只运行指定名称的用例（可重复）")
+    parser.add_argument('--suite', choices=('callbacks', 'backends'), action='append',
+                        help="只运行解析回调（callbacks）或解析后端对比（backends），默认都运行")
+    args = parser.parse_args()
+
+    suites = args.suite or ['callbacks', 'backends']
+    matched = True
+    if 'callbacks' in suites:
+        run_callbacks(args.iterations, args.case)
+    if 'backends' in suites:
+        if 'callbacks' in suites:
+            print()
+        matched = run_backends(args.iterations, args.case)
+
+    if not matched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+端到端压测（对本地模拟站点，不访问真实网站）
+启动 mock_server.MockServer，把 DangDangSpider.SEARCH_URL、fanqie.BASE_URL、FanQieWebDetail.BASE_URL
+指向它，再按指定并发运行爬虫，统计图书/秒、数据库写入速率，以及（--api 模式下）接口延迟
+
+用法:
+    # 直接调用 run_spider，4 个关键词并发
+    python benchmarks/load_test.py --target dangdang --jobs 8 --concurrency 4 --max-books 100
+
+    # 番茄推荐/详情/作者爬虫
+    python benchmarks/load_test.py --target fanqie --jobs 9 --concurrency 3
+
+    # 通过进程内启动的 API（POST /api/jobs）提交任务，同时测量接口延迟
+    python benchmarks/load_test.py --target dangdang --api --jobs 8 --concurrency 4
+
+    # 写入 MySQL（使用 db_config.MYSQL_CONFIG），统计实际写库速率
+    python benchmarks/load_test.py --target dangdang --mysql
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import fanqie
+from dangdang import DangDangSpider, run_spider
+from db_config import MYSQL_CONFIG
+from fanqie_web_detail import FanQieWebDetail
+
+from mock_server import MockServer
+
+
+class LatencyRecorder:
+    """记录接口延迟（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # 接口名 -> [秒]
+        self.errors = 0
+
+    def call(self, name, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, url, timeout=30, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if response.status_code >= 500:
+                self.errors += 1
+        return response
+
+    def report(self):
+        lines = []
+        with self._lock:
+            for name, values in sorted(self.samples.items()):
+                values = sorted(values)
+                p50 = values[len(values) // 2] * 1000
+                p99 = values[min(len(values) - 1, int(len(values) * 0.99))] * 1000
+                lines.append(f"  {name:<28} 次数 {len(values):>6}  p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+                             f"最大 {values[-1] * 1000:8.2f} ms")
+            lines.append(f"  错误（5xx / 连接失败）: {self.errors}")
+        return '\n'.join(lines)
+
+
+def dangdang_job(index, args):
+    """当当任务：每个任务使用不同关键词，保证写入的是不同的图书"""
+    result = run_spider(
+        keyword=f"{args.keyword_prefix}{index}",
+        thread_count=args.spider_threads,
+        use_mysql=args.mysql,
+        mysql_config=MYSQL_CONFIG if args.mysql else None,
+        max_books=args.max_books
+    ) or {}
+    return result.get('total_crawled', 0), result.get('total_saved', 0)
+
+
+def fanqie_job(index, args):
+    """番茄任务：按序号轮流运行推荐、详情、作者爬虫"""
+    kind = index % 3
+    if kind == 0:
+        result = fanqie.run_recommend_spider(use_mysql=args.mysql, max_books=args.max_books)
+        return result.get('total_crawled', 0), 0
+    if kind == 1:
+        result = fanqie.run_detail_spider(book_id=str(10 ** 17 + index), use_mysql=args.mysql)
+        return (1, 0) if result and result.get('success') else (0, 0)
+    result = fanqie.run_author_spider(author_name=f"作者{index}", use_mysql=args.mysql, max_books=args.max_books)
+    return result.get('total_crawled', 0), 0
+
+
+def start_api(args):
+    """
+    在当前进程中启动 FastAPI 应用（与爬虫共享上面设置的站点地址）
+    :return: API 根地址
+    """
+    import uvicorn
+    import backend.api as api
+
+    api.USE_MYSQL = args.mysql
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, name="api", daemon=True).start()
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(base + "/health", timeout=1)
+            return base
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError("API 启动失败")
+
+
+def api_job(index, args, api_base, recorder):
+    """通过 POST /api/jobs 提交任务并轮询结果"""
+    if args.target == 'dangdang':
+        payload = {"kind": "dangdang", "keyword": f"{args.keyword_prefix}{index}", "max_books": args.max_books}
+    else:
+        payload = [
+            {"kind": "fanqie_recommend", "max_books": args.max_books},
+            {"kind": "fanqie_detail", "book_id": str(10 ** 17 + index)},
+            {"kind": "fanqie_author", "author_name": f"作者{index}", "max_books": args.max_books},
+        ][index % 3]
+
+    response = recorder.call("POST /api/jobs", "POST", api_base + "/api/jobs", json=payload)
+    if response is None or response.status_code != 202:
+        return 0, 0
+    job_id = response.json()["job_id"]
+
+    while True:
+        time.sleep(args.poll_interval)
+        response = recorder.call("GET /api/jobs/{id}", "GET", f"{api_base}/api/jobs/{job_id}")
+        if response is None:
+            continue
+        job = response.json()
+        if job.get("status") in ("finished", "failed"):
+            result = job.get("result") or {}
+            if args.target == 'dangdang':
+                return result.get('total_crawled', 0), result.get('total_saved', 0)
+            return result.get('total_crawled', 1 if result.get('success') else 0), 0
+
+
+def probe_reads(api_base, recorder, stop_event, interval, use_mysql):
+    """压测期间持续请求只读接口，测量爬取负载下的查询延迟（/api/books 需要 MySQL）"""
+    while not stop_event.is_set():
+        if use_mysql:
+            recorder.call("GET /api/books", "GET", api_base + "/api/books", params={"limit": 20})
+        recorder.call("GET /api/jobs", "GET", api_base + "/api/jobs")
+        stop_event.wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端压测（本地模拟站点）")
+    parser.add_argument('--target', choices=['dangdang', 'fanqie'], default='dangdang')
+    parser.add_argument('--jobs', type=int, default=8, help="任务总数")
+    parser.add_argument('--concurrency', type=int, default=4, help="同时运行的任务数")
+    parser.add_argument('--max-books', type=int, default=50, help="每个任务的目标数量")
+    parser.add_argument('--spider-threads', type=int, default=3, help="每个当当爬虫的线程数")
+    parser.add_argument('--keyword-prefix', default="压测", help="当当关键词前缀")
+    parser.add_argument('--mysql', action='store_true', help="写入 MySQL（默认不写库）")
+    parser.add_argument('--api', action='store_true', help="通过进程内启动的 API 提交任务并测量接口延迟")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="--api 模式下轮询任务状态的间隔（秒）")
+    parser.add_argument('--probe-interval', type=float, default=0.2, help="--api 模式下只读接口探测间隔（秒）")
+    parser.add_argument('--pages', type=int, default=5, help="模拟站点每个关键词的搜索页数")
+    parser.add_argument('--items-per-page', type=int, default=60, help="模拟站点每页商品数")
+    parser.add_argument('--latency-ms', type=float, default=20, help="模拟站点平均响应延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=10, help="模拟站点延迟浮动（毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟站点 503 比例")
+    args = parser.parse_args()
+
+    server = MockServer(
+        pages=args.pages, items_per_page=args.items_per_page,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate
+    ).start()
+    DangDangSpider.SEARCH_URL = server.dangdang_search_url
+    fanqie.BASE_URL = server.base_url
+    FanQieWebDetail.BASE_URL = server.base_url
+
+    recorder = LatencyRecorder()
+    stop_event = threading.Event()
+    prober = None
+    if args.api:
+        api_base = start_api(args)
+        prober = threading.Thread(target=probe_reads, args=(api_base, recorder, stop_event, args.probe_interval, args.mysql),
+                                  daemon=True)
+        prober.start()
+        run = lambda index: api_job(index, args, api_base, recorder)
+    else:
+        job = dangdang_job if args.target == 'dangdang' else fanqie_job
+        run = lambda index: job(index, args)
+
+    print(f"模拟站点: {server.base_url}  目标: {args.target}  任务: {args.jobs}  并发: {args.concurrency}  "
+          f"写库: {'是' if args.mysql else '否'}  API: {'是' if args.api else '否'}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(run, range(args.jobs)))
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    if prober:
+        prober.join(timeout=5)
+
+    crawled = sum(item[0] for item in results)
+    saved = sum(item[1] for item in results)
+    site = server.site.stats()
+    server.stop()
+
+    print(f"耗时: {elapsed:.2f} s")
+    print(f"爬取: {crawled} 本  {crawled / elapsed:.1f} 本/秒")
+    if args.mysql:
+        print(f"写库: {saved} 本  {saved / elapsed:.1f} 行/秒")
+    print(f"模拟站点请求: {site['requests']}（{site['requests'] / elapsed:.1f} 次/秒），返回错误: {site['errors']}")
+    if args.api:
+        print("接口延迟:")
+        print(recorder.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+本地模拟站点（当当搜索页/详情页 + 番茄推荐页/详情页/搜索页/章节页）
+页面结构与解析代码依赖的 class、id 一致，内容由 URL 中的关键词、页码、ID 确定性生成，
+可配置响应延迟和错误率，用于端到端压测（见 load_test.py），不访问真实网站
+
+路由:
+    /dangdang/search?key=关键词&page_index=N   当当搜索页（li.next 翻页，共 --pages 页）
+    /dangdang/product/<ID>.html              当当详情页
+    /page/recommend                          番茄推荐页
+    /page/<ID>                               番茄书籍详情页（含章节目录）
+    /search/<名称>                            番茄搜索页（作者 / 书名）
+    /reader/<ID>                             番茄章节页（含混淆字符）
+    /__stats                                 请求统计（JSON）
+
+用法:
+    python benchmarks/mock_server.py --port 8900 --latency-ms 50 --error-rate 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fanqie_web_detail import FanQieWebDetail
+
+# 章节页中混入的混淆字符
+_OBFUSCATED = [chr(int(code)) for code in FanQieWebDetail.CHAR_MAP]
+_WORDS = '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民'
+
+
+def _number(*parts) -> int:
+    """由若干字段确定性地生成一个整数（同样的输入总是得到同样的 ID）"""
+    digest = hashlib.blake2b('\x00'.join(str(p) for p in parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _text(seed, length, obfuscated_ratio=0.0) -> str:
+    """确定性生成一段随机文字"""
+    rng = random.Random(seed)
+    return ''.join(
+        rng.choice(_OBFUSCATED) if rng.random() < obfuscated_ratio else rng.choice(_WORDS)
+        for _ in range(length)
+    )
+
+
+def _page(title, body) -> str:
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f'<title>{escape(title)}</title></head><body>{body}</body></html>'
+    )
+
+
+class MockSite:
+    """页面生成与请求统计"""
+
+    def __init__(self, pages=5, items_per_page=60, chapters=200, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        """
+        初始化
+        :param pages: 每个关键词的搜索结果页数
+        :param items_per_page: 每页商品数
+        :param chapters: 每本番茄小说的章节数
+        :param latency_ms: 平均响应延迟（毫秒）
+        :param jitter_ms: 延迟随机浮动范围（毫秒）
+        :param error_rate: 返回 503 的概率
+        """
+        self.pages = pages
+        self.items_per_page = items_per_page
+        self.chapters = chapters
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors}
+
+    def handle(self, path, query):
+        """
+        生成响应
+        :return: (状态码, HTML)
+        """
+        with self._lock:
+            self.requests += 1
+        if self.latency_ms or self.jitter_ms:
+            delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms))
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 503, _page('503', 'Service Unavailable')
+
+        if path == '/dangdang/search':
+            keyword = query.get('key', [''])[0]
+            page_index = int(query.get('page_index', ['1'])[0] or 1)
+            return 200, self.dangdang_search(keyword, page_index)
+        if path.startswith('/dangdang/product/') and path.endswith('.html'):
+            return 200, self.dangdang_detail(path[len('/dangdang/product/'):-len('.html')])
+        if path == '/page/recommend':
+            return 200, self.fanqie_list('recommend', author=None)
+        if path.startswith('/page/'):
+            return 200, self.fanqie_detail(path[len('/page/'):])
+        if path.startswith('/search/'):
+            name = unquote(path[len('/search/'):])
+            return 200, self.fanqie_list(name, author=name)
+        if path.startswith('/reader/'):
+            return 200, self.fanqie_chapter(path[len('/reader/'):])
+        return 404, _page('404', 'Not Found')
+
+    # ---------- 当当 ----------
+
+    @staticmethod
+    def dangdang_title(product_id) -> str:
+        return f"模拟图书{product_id}"
+
+    def dangdang_search(self, keyword, page_index) -> str:
+        items = []
+        for i in range(self.items_per_page):
+            product_id = _number(keyword, page_index, i) % 10 ** 9
+            title = escape(self.dangdang_title(product_id))
+            url = f"/dangdang/product/{product_id}.html"
+            items.append(
+                f'<li><a class="pic" title="{title}" href="{url}"><img src="/img/{product_id}.jpg"></a>'
+                f'<p class="name"><a title="{title}" href="{url}">{title}</a></p>'
+                f'<p class="price"><span class="search_now_price">&yen;{product_id % 200}.00</span></p>'
+                f'<p class="search_book_author"><a name="itemlist-author" title="作者{product_id % 997}">'
+                f'作者{product_id % 997}</a></p></li>'
+            )
+        paging = ''
+        if page_index < self.pages:
+            paging = (f'<ul class="paging"><li class="next">'
+                      f'<a href="/dangdang/search?key={escape(keyword)}&act=input&page_index={page_index + 1}">下一页</a>'
+                      f'</li></ul>')
+        return _page(keyword, f'<ul class="bigimg">{"".join(items)}</ul>{paging}')
+
+    def dangdang_detail(self, product_id) -> str:
+        product_id = int(product_id) if product_id.isdigit() else _number(product_id) % 10 ** 9
+        title = escape(self.dangdang_title(product_id))
+        body = (
+            f'<div class="name_info"><h1 title="{title}">{title}</h1></div>'
+            f'<span id="author"><a>作者{product_id % 997}</a></span>'
+            f'<span id="publisher"><a>模拟出版社{product_id % 31}</a></span>'
+            f'<span id="publish_time">20{product_id % 25:02d}年01月</span>'
+            f'<span id="original-price">&yen;{product_id % 200 + 20}.00</span>'
+            f'<span id="dd-price">&yen;{product_id % 200}.00</span>'
+            f'<ul><li>国际标准书号ISBN：978{product_id:010d}</li></ul>'
+            f'<div class="descrip">{_text(product_id, 300)}</div>'
+            f'<span class="star_gray">{product_id % 5}.{product_id % 10}</span>'
+            f'<span id="comm_num_down">{product_id % 50000}</span>'
+            f'<img id="largePic" src="/img/{product_id}.jpg">'
+        )
+        return _page(title, body)
+
+    # ---------- 番茄 ----------
+
+    def fanqie_list(self, seed, author=None) -> str:
+        items = []
+        for i in range(self.items_per_page):
+            book_id = _number('fanqie', seed, i) % 10 ** 18
+            items.append(
+                f'<div class="book-item"><a href="/page/{book_id}"><h3>模拟小说{book_id}</h3></a>'
+                f'<div class="author">{escape(author or f"作者{book_id % 997}")}</div></div>'
+            )
+        return _page(seed, ''.join(items))
+
+    def fanqie_detail(self, book_id) -> str:
+        seed = int(book_id) if book_id.isdigit() else _number(book_id)
+        chapters = ''.join(
+            f'<a class="chapter-item-title" href="/reader/{seed % 10 ** 12 * 10000 + i}">第{i + 1}章</a>'
+            for i in range(self.chapters)
+        )
+        body = (
+            f'<div class="info-name"><h1>模拟小说{book_id}</h1></div>'
+            f'<span class="author-name-text">作者{seed % 997}</span>'
+            f'<div class="info-label"><span>连载中</span><span>都市</span></div>'
+            f'<span class="category">都市</span><span class="status">连载中</span>'
+            f'<div class="page-abstract-content">{_text(seed, 200)}</div>'
+            f'<div><div><span>字数</span></div><span>{seed % 300}万</span></div>'
+            f'<div><div><span>章节</span></div><span>{self.chapters}</span></div>'
+            f'<img class="book-cover" src="/img/{book_id}.jpg">'
+            f'<span class="latest-chapter"><a>第{self.chapters}章</a></span>'
+            f'<span class="update-time">2024-01-01</span>'
+            f'<div class="chapter">{chapters}</div>'
+        )
+        return _page(book_id, body)
+
+    def fanqie_chapter(self, chapter_id) -> str:
+        paragraphs = ''.join(
+            f'<p>{_text(f"{chapter_id}-{i}", 120, obfuscated_ratio=0.15)}</p>' for i in range(30)
+        )
+        return _page(chapter_id, f'<div class="muye-reader-content-16">{paragraphs}</div>')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    site: MockSite = None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == '/__stats':
+            status, body, content_type = 200, json.dumps(self.site.stats()), 'application/json'
+        else:
+            status, body = self.site.handle(parts.path, parse_qs(parts.query))
+            content_type = 'text/html; charset=utf-8'
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer:
+    """在后台线程中运行的模拟站点"""
+
+    def __init__(self, host='127.0.0.1', port=0, **site_options):
+        """
+        初始化
+        :param host: 监听地址
+        :param port: 端口（0 表示随机空闲端口）
+        :param site_options: 传给 MockSite 的参数（页数、延迟、错误率等）
+        """
+        self.site = MockSite(**site_options)
+        handler = type('MockHandler', (_Handler,), {'site': self.site})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def dangdang_search_url(self) -> str:
+        """可直接赋给 DangDangSpider.SEARCH_URL 的模板"""
+        return self.base_url + "/dangdang/search?key={keyword}&act=input"
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟当当/番茄站点")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--pages', type=int, default=5, help="每个关键词的搜索结果页数")
+    parser.add_argument('--items-per-page', type=int, default=60, help="每页商品数")
+    parser.add_argument('--chapters', type=int, default=200, help="每本番茄小说的章节数")
+    parser.add_argument('--latency-ms', type=float, default=0, help="平均响应延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="延迟随机浮动范围（毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0, help="返回 503 的概率")
+    args = parser.parse_args()
+
+    server = MockServer(
+        host=args.host, port=args.port, pages=args.pages, items_per_page=args.items_per_page,
+        chapters=args.chapters, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate
+    )
+    print(f"模拟站点已启动: {server.base_url}")
+    print(f"  DangDangSpider.SEARCH_URL = {server.dangdang_search_url!r}")
+    print(f"  fanqie.BASE_URL = FanQieWebDetail.BASE_URL = {server.base_url!r}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
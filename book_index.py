@@ -0,0 +1,338 @@
+"""
+已知图书索引模块
+在爬虫启动时从 books 表加载 标题+作者 和详情页商品ID，
+搜索页据此跳过已入库图书的详情页请求；
+另提供进程内共享的详情页请求登记表，同一商品在有效期内只请求一次详情页
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from mysql_pool import MySQLPool
+
+
+# 当当详情页 URL 形如 //product.dangdang.com/29123456.html
+_PRODUCT_ID_PATTERN = re.compile(r'/(\d+)\.html')
+
+
+def extract_product_id(url: Optional[str]) -> Optional[str]:
+    """
+    从详情页 URL 中提取商品ID（忽略协议、域名和查询参数的差异）
+    :param url: 详情页 URL
+    :return: 商品ID，无法识别时返回 None
+    """
+    if not url:
+        return None
+    match = _PRODUCT_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def product_key(url: Optional[str]) -> Optional[str]:
+    """
+    详情页的去重键：能识别商品ID时使用商品ID，否则使用去掉协议和查询参数的 URL
+    :param url: 详情页 URL
+    :return: 去重键，URL 为空时返回 None
+    """
+    if not url:
+        return None
+    product_id = extract_product_id(url)
+    if product_id:
+        return product_id
+    parts = urlsplit(url if '//' in url else '//' + url)
+    return f"{parts.netloc.lower()}{parts.path}"
+
+
+def _fingerprint(text: str) -> int:
+    """
+    计算 64 位指纹（比直接保存字符串更省内存）
+    :param text: 原始字符串
+    :return: 整数指纹
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class KnownBookIndex:
+    """已知图书索引（标题+作者指纹集合 + 商品ID集合）"""
+
+    def __init__(self):
+        self._keys = set()  # 标题+作者指纹
+        self._product_ids = set()  # 详情页商品ID
+        self._lock = threading.Lock()
+        self.loaded_at = 0.0  # 最近一次从数据库加载的时间
+
+    @classmethod
+    def load_from_db(cls) -> 'KnownBookIndex':
+        """
+        从 books 表构建索引
+        :return: 索引实例
+        """
+        index = cls()
+        for row in MySQLPool.iter_book_keys():
+            index.add(row.get('title'), row.get('author'), row.get('detail_url'))
+        index.loaded_at = time.time()
+        return index
+
+    @staticmethod
+    def _key(title: Optional[str], author: Optional[str]) -> Optional[int]:
+        """
+        标题+作者的指纹，规则与数据库唯一索引一致（见 MySQLPool.dedup_key）
+        作者为空时不生成指纹，避免仅凭标题误判
+        """
+        if not title or not author or not author.strip():
+            return None
+        title_key, author_key = MySQLPool.dedup_key(title.strip(), author.strip())
+        return _fingerprint(f"{title_key}\x00{author_key}")
+
+    def add(self, title: Optional[str] = None, author: Optional[str] = None, detail_url: Optional[str] = None):
+        """
+        登记一本已入库的图书
+        :param title: 标题
+        :param author: 作者
+        :param detail_url: 详情页 URL
+        """
+        key = self._key(title, author)
+        product_id = extract_product_id(detail_url)
+        with self._lock:
+            if key is not None:
+                self._keys.add(key)
+            if product_id:
+                self._product_ids.add(product_id)
+
+    def contains(self, title: Optional[str] = None, author: Optional[str] = None, detail_url: Optional[str] = None) -> bool:
+        """
+        判断图书是否已入库（商品ID 或 标题+作者 任一命中即认为已入库）
+        :param title: 标题
+        :param author: 作者
+        :param detail_url: 详情页 URL
+        :return: 是否已入库
+        """
+        product_id = extract_product_id(detail_url)
+        if product_id and product_id in self._product_ids:
+            return True
+        key = self._key(title, author)
+        return key is not None and key in self._keys
+
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_index(max_age: float = 600) -> KnownBookIndex:
+    """
+    获取进程内共享的已知图书索引（首次调用或超过 max_age 秒后重新从数据库加载）
+    爬虫写库成功后会把新书加入该索引，因此多次爬取之间无需每次全表扫描
+    :param max_age: 索引最长有效期（秒）
+    :return: 索引实例
+    """
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None or time.time() - _shared_index.loaded_at > max_age:
+            _shared_index = KnownBookIndex.load_from_db()
+        return _shared_index
+
+
+class _SeenEntry:
+    __slots__ = ('expires_at', 'keywords', 'record', 'waiters')
+
+    def __init__(self, expires_at: float, keyword: Optional[str]):
+        self.expires_at = expires_at
+        self.keywords = [keyword] if keyword else []  # 搜到该商品的全部关键词（按发现顺序）
+        self.record = None  # 解析出的 (标题, 作者)（只保留去重和关联关键词需要的字段）
+        self.waiters = []  # 详情页请求中时，其他关键词/爬虫登记的回调（见 SeenProductRegistry.claim）
+
+
+class SeenProductRegistry:
+    """
+    详情页请求登记表（进程内共享，线程安全）
+    搜索页发起详情页请求前先登记商品，有效期内其他关键词/爬虫再搜到同一商品时不再请求，
+    只把关键词追加到该商品的关键词列表，并通过回调拿到解析出的图书数据（关键词列表为登记时的副本）；
+    请求方放弃解析时，由等待中的关键词接手重新请求
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 200000):
+        """
+        初始化
+        :param ttl: 登记有效期（秒），过期后允许再次请求详情页
+        :param max_entries: 最大登记数量（超过后淘汰最早登记的商品）
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _SeenEntry]" = OrderedDict()  # 按登记时间排序（有效期相同，即按过期时间排序）
+        self._lock = threading.Lock()
+        self.claimed = 0  # 登记成功（需要请求详情页）的次数
+        self.deduplicated = 0  # 因已登记而跳过的次数
+
+    def _evict(self, now: float, orphans: List[Callable[[Optional[Dict]], bool]]):
+        """淘汰过期和超出容量的登记（调用方持有锁），被淘汰登记的等待方放入 orphans，由调用方在锁外通知"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            orphans.extend(entry.waiters)
+
+    def claim(self, detail_url: str, keyword: Optional[str] = None,
+              waiter: Optional[Callable[[Optional[Dict]], bool]] = None) -> bool:
+        """
+        登记一个详情页
+        已被登记时调用 waiter(图书数据)：已解析的商品立即调用（图书数据只含 标题、作者、关键词列表），
+        请求中的商品在解析完成时调用（完整的图书数据）；请求方放弃解析时调用 waiter(None)，
+        返回 True 表示接手重新请求
+        :param detail_url: 详情页 URL
+        :param keyword: 搜到该商品的关键词
+        :param waiter: 已被登记时的回调（在其他爬虫的线程中调用，不能阻塞）；登记因过期或超出容量被淘汰时，
+                       等待方收到 waiter(None)（返回值忽略，接手的一方直接请求详情页）
+        :return: True 表示调用方应请求详情页；False 表示有效期内已被请求过（关键词已追加到该商品）
+        """
+        key = product_key(detail_url)
+        if key is None:
+            return True
+        now = time.monotonic()
+        orphans = []
+        record = None
+        try:
+            with self._lock:
+                self._evict(now, orphans)
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._entries[key] = _SeenEntry(now + self.ttl, keyword)
+                    self._evict(now, orphans)
+                    self.claimed += 1
+                    return True
+                if keyword and keyword not in entry.keywords:
+                    entry.keywords.append(keyword)
+                self.deduplicated += 1
+                record = entry.record
+                if record is not None:
+                    keywords = list(entry.keywords)
+                elif waiter is not None:
+                    entry.waiters.append(waiter)
+        finally:
+            for orphan in orphans:
+                self._notify(orphan, None)
+        
+        if record is not None and waiter is not None:
+            self._notify(waiter, {'标题': record[0], '作者': record[1], '关键词列表': keywords})
+        return False
+
+    def has_waiters(self, detail_url: str) -> bool:
+        """
+        是否有其他关键词/爬虫在等待该详情页的解析结果
+        :param detail_url: 详情页 URL
+        """
+        key = product_key(detail_url)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            return entry is not None and bool(entry.waiters)
+
+    def release(self, detail_url: str):
+        """
+        放弃解析（详情页请求失败或未解析时调用）：有等待中的关键词/爬虫时交给其中一个重新请求，
+        没有人接手时撤销登记，让之后搜到该商品的爬虫可以重新请求；已关联图书数据的登记不撤销
+        :param detail_url: 详情页 URL
+        """
+        key = product_key(detail_url)
+        if key is None:
+            return
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry.record is not None:
+                    return
+                if not entry.waiters:
+                    del self._entries[key]
+                    return
+                waiter = entry.waiters.pop(0)
+            if self._notify(waiter, None):
+                return
+
+    @staticmethod
+    def _notify(waiter: Callable[[Optional[Dict]], bool], book_data: Optional[Dict]) -> bool:
+        """调用等待方的回调（回调出错时视为不接手）"""
+        try:
+            return bool(waiter(book_data))
+        except Exception:
+            return False
+
+    def attach(self, detail_url: str, book_data: Dict) -> List[str]:
+        """
+        关联解析出的图书数据：book_data["关键词列表"] 设为该商品当前关键词列表的副本
+        （之后才搜到该商品的关键词由各自的爬虫登记关联）；等待中的关键词/爬虫在返回前各收到一份 book_data 副本
+        :param detail_url: 详情页 URL（与 claim 时相同）
+        :param book_data: 图书数据
+        :return: 关键词列表
+        """
+        key = product_key(detail_url)
+        keyword = book_data.get("搜索关键词")
+        waiters = []
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                keywords = [keyword] if keyword else []
+            else:
+                if keyword and keyword not in entry.keywords:
+                    entry.keywords.append(keyword)
+                entry.record = (book_data.get("标题", ""), book_data.get("作者", ""))
+                keywords = list(entry.keywords)
+                waiters, entry.waiters = entry.waiters, []
+            book_data["关键词列表"] = keywords
+        
+        for waiter in waiters:
+            self._notify(waiter, dict(book_data, 关键词列表=list(keywords)))
+        return keywords
+
+    def keywords_of(self, detail_url: str) -> List[str]:
+        """
+        读取商品的关键词列表
+        :param detail_url: 详情页 URL
+        :return: 关键词列表副本（未登记或已过期时为空）
+        """
+        key = product_key(detail_url)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None or entry.expires_at <= time.monotonic():
+                return []
+            return list(entry.keywords)
+
+    def stats(self) -> Dict:
+        """
+        登记表统计
+        :return: 登记数量、登记/去重次数等
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'claimed': self.claimed,
+                'deduplicated': self.deduplicated,
+                'ttl': self.ttl,
+                'max_entries': self.max_entries
+            }
+
+    def clear(self):
+        """清空登记表"""
+        with self._lock:
+            self._entries.clear()
+
+
+_seen_registry = None
+
+
+def get_seen_registry() -> SeenProductRegistry:
+    """
+    获取进程内共享的详情页请求登记表（并发运行的多个爬虫共用，参数见 db_config.DETAIL_DEDUP_CONFIG）
+    :return: 登记表实例
+    """
+    global _seen_registry
+    with _shared_lock:
+        if _seen_registry is None:
+            from db_config import DETAIL_DEDUP_CONFIG
+            _seen_registry = SeenProductRegistry(
+                ttl=DETAIL_DEDUP_CONFIG.get('ttl', 3600),
+                max_entries=DETAIL_DEDUP_CONFIG.get('max_entries', 200000)
+            )
+        return _seen_registry
@@ -0,0 +1,120 @@
+"""
+图书批量写入模块（write-behind）
+解析结果先进入有界队列，由后台线程按数量或时间批量写入 MySQL，
+每批只占用一次连接、一次 executemany 和一次 commit
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+from mysql_pool import MySQLPool
+
+
+class BookWriteBuffer:
+    """图书写缓冲"""
+
+    def __init__(self, on_result: Optional[Callable[[Dict, Dict], None]] = None,
+                 batch_size: int = 20, max_delay: float = 1.0, max_queue_size: int = 500):
+        """
+        初始化写缓冲
+        :param on_result: 每行写入结果的回调 on_result(book_data, result)，result 与 MySQLPool.save_book 返回格式一致
+        :param batch_size: 每批写入的最大行数（达到该数量立即刷新）
+        :param max_delay: 数据在缓冲中的最长停留时间（秒）
+        :param max_queue_size: 队列容量（队列满时 put 阻塞，形成背压）
+        """
+        self.on_result = on_result
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._flush_lock = threading.Lock()  # 保证同一时间只有一个批次在写
+        self._wake = threading.Event()  # 达到批量大小时唤醒刷新线程
+        self._closed = threading.Event()
+        self._in_flight = 0  # 已出队但尚未写完的行数
+        self._thread = None
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="BookWriteBuffer", daemon=True)
+            self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """尚未得到写入结果的行数"""
+        return self._queue.qsize() + self._in_flight
+
+    def put(self, book_data: Dict):
+        """
+        放入一条待写入的图书数据
+        :param book_data: 图书数据字典
+        """
+        if self._closed.is_set():
+            # 已关闭时直接同步写入，保证数据不丢
+            self._write([book_data])
+            return
+
+        self._queue.put(book_data)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """同步写出队列中的全部数据（返回时所有已放入数据的结果都已回调）"""
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if not batch:
+                    return
+
+                self._in_flight = len(batch)
+                try:
+                    self._write(batch)
+                finally:
+                    self._in_flight = 0
+
+    def close(self):
+        """停止刷新线程并写出剩余数据（可重复调用）"""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        """后台刷新线程：按数量（被唤醒）或时间（超时）刷新"""
+        while not self._closed.is_set():
+            self._wake.wait(timeout=self.max_delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # print(f"⚠️ 批量写入失败: {e}")
+                pass
+
+    def _write(self, batch: List[Dict]):
+        """
+        写入一个批次并逐行回调结果
+        :param batch: 图书数据列表
+        """
+        try:
+            results = MySQLPool.save_books_batch(batch)
+        except Exception as e:
+            results = [{
+                'success': False,
+                'is_duplicate': False,
+                'message': f'保存失败: {str(e)}'
+            } for _ in batch]
+
+        if self.on_result:
+            for book_data, result in zip(batch, results):
+                try:
+                    self.on_result(book_data, result)
+                except Exception as e:
+                    # print(f"⚠️ 写入结果回调失败: {e}")
+                    pass
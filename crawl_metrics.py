@@ -0,0 +1,399 @@
+"""
+爬虫指标模块
+进程内的计数器、仪表和直方图（线程安全，每次记录只是一次加锁的整数/浮点累加），
+由后端 /metrics 接口以 Prometheus 文本格式输出；不依赖 prometheus_client
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+# 默认直方图分桶（秒）：覆盖毫秒级解析/写库到数十秒的下载
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值缓存子指标"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        初始化
+        :param name: 指标名
+        :param documentation: 说明
+        :param labelnames: 标签名列表
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        取指定标签值的子指标（首次调用时创建）
+        :param values: 标签值（顺序与 labelnames 一致）
+        :return: 子指标
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要 {len(self.labelnames)} 个标签值")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        """无标签计数器加 amount"""
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ('_value', '_lock', '_function')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """输出时调用 function 取值（用于读取连接池等对象的当前状态）"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        """无标签仪表设为 value"""
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1):
+        """无标签仪表加 amount"""
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        """无标签仪表减 amount"""
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """无标签仪表在输出时调用 function 取值"""
+        self.labels().set_function(function)
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_counts', '_sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """记录一个观测值"""
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """记录代码块耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    """直方图（累计分桶 + 总和 + 次数）"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        初始化
+        :param name: 指标名
+        :param documentation: 说明
+        :param labelnames: 标签名列表
+        :param buckets: 分桶上界（升序）
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """无标签直方图记录一个观测值"""
+        self.labels().observe(value)
+
+    def time(self):
+        """无标签直方图记录代码块耗时"""
+        return self.labels().time()
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, (('le', _format_value(bound)),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        注册指标（同名指标只注册一次）
+        :param metric: 指标
+        :return: 已注册的指标
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        以 Prometheus 文本格式输出全部指标
+        :return: 文本
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# 爬虫
+FETCH_SECONDS = REGISTRY.histogram('crawl_fetch_seconds', '页面下载耗时（秒，发出请求到收到响应头）', ('spider', 'callback'))
+PARSE_SECONDS = REGISTRY.histogram('crawl_parse_seconds', '解析回调耗时（秒）', ('spider', 'callback'))
+PAGES = REGISTRY.counter('crawl_pages_total', '已解析的页面数', ('spider', 'callback'))
+BOOKS = REGISTRY.counter('crawl_books_total', '解析出的图书数', ('spider',))
+SAVED = REGISTRY.counter('crawl_saved_total', '新增入库的图书数', ('spider',))
+DUPLICATES = REGISTRY.counter('crawl_duplicates_total', '入库时因重复被忽略的图书数', ('spider',))
+SKIPPED = REGISTRY.counter('crawl_skipped_total', '未请求或未解析的详情页数', ('spider', 'reason'))
+ERRORS = REGISTRY.counter('crawl_errors_total', '错误数（解析异常、请求失败、写库失败等）', ('spider', 'stage'))
+
+# 数据库
+DB_SECONDS = REGISTRY.histogram('mysql_call_seconds', 'MySQLPool / AsyncMySQLPool 方法耗时（秒，含取连接）', ('method',))
+DB_ERRORS = REGISTRY.counter('mysql_errors_total', 'MySQLPool / AsyncMySQLPool 方法抛出的异常数', ('method',))
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    'mysql_pool_wait_seconds', '从连接池取连接的等待时间（秒）',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+POOL_IN_USE = REGISTRY.gauge('mysql_pool_in_use', '已借出（使用中）的连接数')
+POOL_IDLE = REGISTRY.gauge('mysql_pool_idle', '池中空闲的连接数')
+POOL_WAITING = REGISTRY.gauge('mysql_pool_waiting', '正在等待取连接的线程数')
+POOL_MAX = REGISTRY.gauge('mysql_pool_max_connections', '连接池允许的最大连接数（0 表示不限）')
+POOL_CREATED = REGISTRY.counter('mysql_pool_connections_created_total', '新建的数据库连接数')
+POOL_CLOSED = REGISTRY.counter('mysql_pool_connections_closed_total', '关闭的数据库连接数')
+
+
+def track_callback(spider: str):
+    """
+    解析回调装饰器：记录下载耗时（response.elapsed）、解析耗时、页面数，以及未捕获的异常
+    回调为生成器时，解析耗时为遍历整个生成器的时间
+    :param spider: 爬虫名（标签值）
+    """
+    def decorator(func):
+        callback = func.__name__
+        fetch = FETCH_SECONDS.labels(spider, callback)
+        parse = PARSE_SECONDS.labels(spider, callback)
+        pages = PAGES.labels(spider, callback)
+        errors = ERRORS.labels(spider, callback)
+
+        def observe_fetch(response):
+            elapsed = getattr(response, 'elapsed', None)
+            if elapsed:
+                fetch.observe(elapsed.total_seconds())
+            pages.inc()
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(self, request, response):
+                observe_fetch(response)
+                start = time.perf_counter()
+                try:
+                    yield from func(self, request, response)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    parse.observe(time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(self, request, response):
+                observe_fetch(response)
+                start = time.perf_counter()
+                try:
+                    return func(self, request, response)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    parse.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def track_db(func):
+    """
+    MySQLPool / AsyncMySQLPool 方法装饰器（放在 @classmethod 之下）：记录耗时和抛出的异常
+    协程方法按 await 完成的时间计，标签为 方法名_async（与同名的同步方法区分）
+    """
+    is_async = inspect.iscoroutinefunction(func)
+    method = f"{func.__name__}_async" if is_async else func.__name__
+    seconds = DB_SECONDS.labels(method)
+    errors = DB_ERRORS.labels(method)
+
+    if is_async:
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出全部指标"""
+    return REGISTRY.render()
@@ -25,6 +25,10 @@ CREATE TABLE IF NOT EXISTS books (
     cover_image VARCHAR(500) DEFAULT '' COMMENT '封面图',
     detail_url VARCHAR(500) DEFAULT '' COMMENT '详情页URL',
     search_keyword VARCHAR(100) DEFAULT '' COMMENT '搜索关键词',
+    price_cents INT NOT NULL DEFAULT 0 COMMENT '现价（分）',
+    original_price_cents INT NOT NULL DEFAULT 0 COMMENT '原价（分）',
+    rating_value DECIMAL(5,2) NOT NULL DEFAULT 0 COMMENT '评分（数值）',
+    comment_num INT NOT NULL DEFAULT 0 COMMENT '评论数（数值）',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     
@@ -34,9 +38,55 @@ CREATE TABLE IF NOT EXISTS books (
     -- 普通索引
     INDEX idx_keyword (search_keyword) COMMENT '搜索关键词索引',
     INDEX idx_title (title(100)) COMMENT '标题索引',
-    INDEX idx_created_at (created_at) COMMENT '创建时间索引'
+    INDEX idx_created_at (created_at) COMMENT '创建时间索引',
+    INDEX idx_keyword_price (search_keyword, price_cents) COMMENT '按关键词+价格排序分页',
+    INDEX idx_price (price_cents) COMMENT '按价格排序分页',
+    
+    -- 全文索引：标题/作者/简介站内搜索（ngram 分词支持中文，需要 MySQL 5.7.6+）
+    FULLTEXT INDEX ft_search (title, author, description) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='图书信息表';
 
+-- 创建关键词-图书关联表（一本书可被多个关键词搜到；price_cents 冗余自 books，用于按关键词+价格分页）
+CREATE TABLE IF NOT EXISTS book_keywords (
+    keyword VARCHAR(100) NOT NULL COMMENT '搜索关键词',
+    book_id INT NOT NULL COMMENT '图书ID（books.id）',
+    price_cents INT NOT NULL DEFAULT 0 COMMENT '现价（分）',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    PRIMARY KEY (keyword, book_id),
+    INDEX idx_keyword_price (keyword, price_cents, book_id) COMMENT '按关键词+价格排序分页',
+    INDEX idx_book_id (book_id) COMMENT '按图书查关键词'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='关键词图书关联表';
+
+-- 创建爬取任务表（后端多个 worker 进程共享任务状态和进度）
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    job_id CHAR(32) NOT NULL PRIMARY KEY COMMENT '任务ID',
+    kind VARCHAR(50) NOT NULL COMMENT '任务类型',
+    params TEXT COMMENT '任务参数（JSON）',
+    status VARCHAR(20) NOT NULL COMMENT '状态（queued / running / finished / failed）',
+    progress TEXT COMMENT '进度（JSON）',
+    result MEDIUMTEXT COMMENT '任务结果（JSON，任务结束后写入）',
+    error TEXT COMMENT '错误信息',
+    worker VARCHAR(100) NOT NULL DEFAULT '' COMMENT '执行任务的进程（主机名:进程号）',
+    created_at DOUBLE NOT NULL COMMENT '提交时间（Unix 时间戳）',
+    started_at DOUBLE NULL COMMENT '开始时间',
+    finished_at DOUBLE NULL COMMENT '结束时间',
+    heartbeat_at DOUBLE NOT NULL COMMENT '所在进程最近一次写入的时间（用于识别已退出进程遗留的任务）',
+    INDEX idx_created (created_at),
+    INDEX idx_status_heartbeat (status, heartbeat_at),
+    INDEX idx_finished (finished_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='爬取任务表';
+
+-- 创建数据迁移进度表（分批回填中断后，下次启动从记录的位置继续）
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name VARCHAR(100) NOT NULL PRIMARY KEY COMMENT '迁移名',
+    last_id BIGINT NOT NULL DEFAULT 0 COMMENT '已处理到的主键',
+    finished_at DATETIME NULL COMMENT '完成时间（未完成时为 NULL）'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据迁移进度表';
+
+-- 旧数据回填关联（可重复执行）
+INSERT IGNORE INTO book_keywords (keyword, book_id, price_cents)
+SELECT search_keyword, id, price_cents FROM books WHERE search_keyword != '';
+
 -- 显示表结构
 DESCRIBE books;
 
@@ -3,10 +3,122 @@
 功能：根据关键词搜索图书，并爬取详情页信息
 """
 
+import queue
+import threading
+from urllib.parse import urljoin
 import feapder
 from feapder import Request
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from mysql_pool import MySQLPool
+from book_writer import BookWriteBuffer
+from book_index import KnownBookIndex, SeenProductRegistry, get_seen_registry, get_shared_index, product_key
+from html_parsing import XPathExtractor
+from crawl_metrics import BOOKS, DUPLICATES, ERRORS, SAVED, SKIPPED, track_callback
+
+
+def _normalize_isbn(value: str) -> str:
+    """去掉 ISBN 文本中的前缀"""
+    return value.replace("ISBN：", "").replace("ISBN:", "").strip()
+
+
+# 详情页字段提取规则：字段名 -> (按优先级排列的 XPath, 规整函数)
+# 所有 XPath 在导入时编译一次；命中统计见 DETAIL_EXTRACTOR.stats()
+DETAIL_EXTRACTOR = XPathExtractor({
+    "标题": ([
+        '//div[@class="name_info"]//h1/@title',
+        '//div[@class="name_info"]//h1/text()',
+        '//h1[@class="title"]/text()',
+    ], None),
+    "作者": ([
+        '//span[@id="author"]//a/text()',
+        '//div[@class="messbox_info"]//span[contains(text(),"作")]/following-sibling::a[1]/text()',
+        '//a[@name="itemlist-author"]/text()',
+        '//p[@class="author"]//a[1]/text()',
+    ], None),
+    "出版社": ([
+        '//span[@id="publisher"]//a/text()',
+        '//div[@class="messbox_info"]//span[contains(text(),"出版社")]/following-sibling::a[1]/text()',
+        '//a[@name="P_cbs"]/text()',
+    ], None),
+    "出版时间": ([
+        '//span[@id="publish_time"]/text()',
+        '//div[@class="messbox_info"]//span[contains(text(),"出版时间")]/following-sibling::text()[1]',
+        '//span[@name="P_date"]/text()',
+    ], None),
+    "原价": ([
+        '//span[@id="original-price"]/text()',
+        '//p[@class="price"]/span[@class="price_n"]/text()',
+    ], None),
+    "现价": ([
+        '//span[@id="dd-price"]/text()',
+    ], None),
+    "ISBN": ([
+        '//li[contains(text(),"ISBN")]/text()',
+        '//span[contains(text(),"ISBN")]/following-sibling::text()[1]',
+    ], _normalize_isbn),
+    "评分": ([
+        '//span[@class="star_gray"]/text()',
+        '//div[@class="star"]//text()',
+        '//span[@class="score"]/text()',
+    ], None),
+    "评论数": ([
+        '//span[@id="comm_num_down"]/text()',
+        '//a[@id="comm_num"]/text()',
+    ], None),
+    "简介": ([
+        '//div[@class="descrip"]//text()',
+        '//div[@id="content"]//div[@class="describe_detail"]//text()',
+        '//div[@class="book_intro"]//text()',
+    ], None),
+    "封面图": ([
+        '//img[@id="largePic"]/@src',
+        '//div[@class="pic_box"]//img/@src',
+        '//img[@id="main-img"]/@src',
+    ], None),
+})
+
+
+class KeywordProgress:
+    """单个关键词的爬取进度（批量爬取时每个关键词各自计数、各自判断是否达到目标）"""
+    
+    def __init__(self, keyword: str, target: int):
+        """
+        初始化
+        :param keyword: 搜索关键词
+        :param target: 目标新增数量（0 表示不限制）
+        """
+        self.keyword = keyword
+        self.target = target
+        self.pages = 0  # 已解析的搜索页数
+        self.crawled = 0  # 已解析的详情页数
+        self.saved = 0  # 新增入库数量
+        self.duplicates = 0  # 去重数量
+        self.known_skipped = 0  # 因已入库而跳过的详情页数量
+        self.shared_skipped = 0  # 因已被其他关键词/爬虫请求而跳过的详情页数量（见 SeenProductRegistry）
+        self.items = set()  # 已处理的商品（去重键），搜索结果中重复出现的商品不再处理
+        self.pending = 0  # 已放入写缓冲、尚未得到写入结果的数量
+    
+    @property
+    def is_unlimited(self) -> bool:
+        return self.target == 0
+    
+    @property
+    def target_reached(self) -> bool:
+        """是否已达到目标新增数量"""
+        return not self.is_unlimited and self.saved >= self.target
+    
+    def to_dict(self) -> Dict:
+        return {
+            'keyword': self.keyword,
+            'target': self.target,
+            'pages': self.pages,
+            'crawled': self.crawled,
+            'saved': self.saved,
+            'duplicates': self.duplicates,
+            'known_skipped': self.known_skipped,
+            'shared_skipped': self.shared_skipped,
+            'target_reached': self.target_reached
+        }
 
 
 class DangDangSpider(feapder.AirSpider):
@@ -21,35 +133,262 @@ class DangDangSpider(feapder.AirSpider):
         LOG_LEVEL="ERROR",  # 只显示错误日志
     )
     
-    def __init__(self, keyword="Python", use_mysql=True, max_books=20, proxy=None, *args, **kwargs):
+    # 搜索页 URL 模板（压测时可指向本地模拟服务器，见 benchmarks/mock_server.py）
+    SEARCH_URL = "https://search.dangdang.com/?key={keyword}&act=input"
+    
+    def __init__(self, keyword="Python", use_mysql=True, max_books=20, proxy=None,
+                 write_batch_size=20, write_max_delay=1.0, skip_known=True,
+                 known_index: Optional[KnownBookIndex] = None,
+                 on_result: Optional[Callable[[Dict], None]] = None,
+                 keywords: Optional[List[str]] = None,
+                 seen_registry: Optional[SeenProductRegistry] = None, *args, **kwargs):
         """
         初始化爬虫
         :param keyword: 搜索关键词
         :param use_mysql: 是否使用 MySQL 存储（默认 True）
-        :param max_books: 最大爬取图书数量（默认 20，0表示爬取所有）
+        :param max_books: 每个关键词的最大爬取图书数量（默认 20，0表示爬取所有）
         :param proxy: 代理地址（格式：http://ip:port 或 https://ip:port）
+        :param write_batch_size: 批量写库的每批行数
+        :param write_max_delay: 数据在写缓冲中的最长停留时间（秒）
+        :param skip_known: 是否在搜索页跳过已入库图书的详情页请求（仅在使用 MySQL 时生效）
+        :param known_index: 已知图书索引（不传则使用进程内共享索引）
+        :param on_result: 每解析出一本图书时的回调 on_result(book_data)（用于流式返回结果）
+        :param keywords: 批量爬取的关键词列表（传入时忽略 keyword，所有关键词共用本爬虫的线程、写缓冲和去重状态）
+        :param seen_registry: 详情页请求登记表（不传则使用进程内共享登记表，并发运行的爬虫之间也不重复请求）
         """
         super().__init__(*args, **kwargs)
-        self.keyword = keyword
+        self.keywords = list(dict.fromkeys(keywords)) if keywords else [keyword]
+        self.keyword = self.keywords[0]
+        self.progress = {kw: KeywordProgress(kw, max_books) for kw in self.keywords}  # 关键词 -> 进度
+        self._seen = seen_registry or get_seen_registry()  # 已请求过详情页的商品（跨关键词、跨爬虫去重）
+        self._claimed = {}  # 本爬虫已登记、尚未解析的详情页：去重键 -> URL（爬虫结束时撤销登记）
+        self._claims_closed = False  # 已撤销全部登记（爬虫已结束，不再接手或接收其他爬虫的详情页）
+        self._shared = queue.Queue()  # 其他关键词/爬虫交来的详情页（解析结果或接手请求），只在本爬虫的线程中处理
+        self._awaiting = 0  # 已登记、尚未收到回调的等待（见 _claim），大于 0 时队列为空也不结束
+        self._keyword_links = []  # 待登记的 (关键词, 标题, 作者)：跳过详情页的已入库图书也要关联到本次关键词
         self.results = []  # 存储爬取结果
         self.use_mysql = use_mysql
-        self.target_new_books = max_books  # 目标新增数量
+        self.target_new_books = max_books  # 每个关键词的目标新增数量
         self.is_unlimited = (max_books == 0)  # 是否无限制模式
         self.crawled_count = 0  # 已爬取数量
         self._stop_flag = False  # 停止标志
         self.saved_count = 0  # 实际保存到数据库的数量（新增）
         self.duplicate_count = 0  # 去重数量
-        self.max_crawl_limit = 1000  # 最大爬取限制（防止无限循环）
+        self.max_crawl_limit = 1000  # 每个关键词的最大爬取限制（防止无限循环）
         self.proxy = proxy  # 代理地址
         self.skipped_count = 0  # 跳过的请求数量（用于统计）
+        self.on_result = on_result
+        self.known_skipped_count = 0  # 因已入库而跳过的详情页数量
+        self.shared_skipped_count = 0  # 因已被其他关键词/爬虫请求而跳过的详情页数量
+        self.skip_known = skip_known and use_mysql
+        self._known_index = known_index
+        self._count_lock = threading.Lock()  # 保护 saved_count / duplicate_count（写缓冲线程也会更新）
+        self._finished_event = threading.Event()  # 爬虫主循环已退出
+        self._done_event = threading.Event()  # 爬虫已结束或已达到目标（run_spider 等待该事件）
+        
+        # 批量写库缓冲（write-behind）
+        self._writer = None
+        if self.use_mysql:
+            self._writer = BookWriteBuffer(
+                on_result=self._on_book_saved,
+                batch_size=write_batch_size,
+                max_delay=write_max_delay
+            )
+    
+    def start_callback(self):
+        """爬虫开始回调：加载已知图书索引，启动写缓冲线程"""
+        if self.skip_known and self._known_index is None:
+            try:
+                self._known_index = get_shared_index()
+            except Exception as e:
+                # print(f"⚠️ 加载已知图书索引失败，不做预去重: {e}")
+                ERRORS.labels("dangdang", "known_index").inc()
+                self.skip_known = False
+        if self._writer:
+            self._writer.start()
+    
+    def end_callback(self):
+        """爬虫结束回调：撤销未解析详情页的登记，处理已收到的共享结果，写出缓冲中剩余的数据，并通知等待方"""
+        try:
+            self.release_claims()
+            for _ in self._drain_shared():
+                pass  # 已撤销登记，接手的请求不再发出
+            self.close_writer()
+        finally:
+            self.mark_finished()
+    
+    def all_thread_is_done(self):
+        """
+        feapder 主循环判断爬虫是否结束：请求队列为空后，在主循环线程中处理共享队列（接手的请求按 feapder
+        分发 start_requests 的方式入队）；还在等待其他关键词/爬虫的解析结果时不结束
+        """
+        if not super().all_thread_is_done():
+            return False
+        if self._stop_flag:
+            return True
+        requests = list(self._drain_shared())
+        for request in requests:
+            request.parser_name = request.parser_name or self.name
+            self._request_buffer.put_request(request, ignore_max_size=False)
+        with self._count_lock:
+            return not requests and self._awaiting == 0 and self._shared.empty()
+    
+    def _claim(self, detail_url: str, keyword: str, waiter: Optional[Callable[[Optional[Dict]], bool]] = None) -> bool:
+        """登记详情页，返回是否需要请求（已被其他关键词/爬虫请求时由 waiter 接收结果，见 SeenProductRegistry.claim）"""
+        if waiter is not None:
+            with self._count_lock:
+                self._awaiting += 1
+        if not self._seen.claim(detail_url, keyword, waiter):
+            return False
+        with self._count_lock:
+            if waiter is not None:
+                self._awaiting -= 1
+            self._claimed[product_key(detail_url)] = detail_url
+        return True
+    
+    def _release(self, detail_url: str, attached: bool = False):
+        """
+        详情页已解析（attached=True）或不再解析时调用；本爬虫仍持有的未解析登记撤销（交给等待方）
+        """
+        with self._count_lock:
+            owned = self._claimed.pop(product_key(detail_url), None) is not None
+        if owned and not attached:
+            self._seen.release(detail_url)
+    
+    def release_claims(self):
+        """撤销本爬虫已登记但未解析的详情页（达到目标或停止后队列中剩余的请求不会再被解析，可重复调用）"""
+        with self._count_lock:
+            self._claims_closed = True
+            urls, self._claimed = list(self._claimed.values()), {}
+        for url in urls:
+            self._seen.release(url)
+    
+    def _give_up(self, request, response=None):
+        """
+        本关键词不再需要该详情页（达到目标、超过限制或已停止）：
+        有其他关键词/爬虫在等待时解析后交给它们（不计入本关键词的结果），否则撤销登记
+        """
+        if response is not None and self._seen.has_waiters(request.url):
+            book_data = self._extract_book(request, response, request.meta.get("keyword", self.keyword))
+            self._seen.attach(request.url, book_data)
+            self._release(request.url, attached=True)
+        else:
+            self._release(request.url)
+    
+    def _share_waiter(self, progress: KeywordProgress, detail_url: str, title: Optional[str],
+                      price: Optional[str], author: Optional[str], headers) -> Callable[[Optional[Dict]], bool]:
+        """
+        其他关键词/爬虫已请求该详情页时的回调（见 SeenProductRegistry.claim，在其他爬虫的线程中调用）：
+        只把图书数据或接手请求放入本爬虫的共享队列，由本爬虫在自己的线程中处理（见 _drain_shared）；
+        对方放弃解析（传入 None）时，本爬虫未结束且该关键词未达到目标则接手
+        """
+        def waiter(record: Optional[Dict]) -> bool:
+            try:
+                if record is not None:
+                    if not self._claims_closed:
+                        self._shared.put(("result", progress, detail_url, (record, title, price, author)))
+                    return True
+                with self._count_lock:
+                    if self._claims_closed or self._stop_flag or progress.target_reached:
+                        return False
+                    self._claimed[product_key(detail_url)] = detail_url
+                self._shared.put(("take_over", progress, detail_url, (title, price, headers)))
+                return True
+            finally:
+                with self._count_lock:
+                    self._awaiting -= 1
+        return waiter
+    
+    def _drain_shared(self):
+        """
+        处理共享队列（只在本爬虫的线程中调用）：解析结果复制一份作为本关键词的结果，
+        生成接手的详情页请求（由调用方 yield 给 feapder）；本爬虫已不需要的接手请求撤销登记
+        """
+        while True:
+            try:
+                kind, progress, detail_url, payload = self._shared.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "result":
+                self._add_shared_result(progress, detail_url, *payload)
+            elif self._claims_closed:
+                continue  # release_claims 已撤销该登记
+            elif self._stop_flag or progress.target_reached:
+                self._release(detail_url)
+            else:
+                title, price, headers = payload
+                yield self._detail_request(detail_url, headers, title, price, progress.keyword)
+    
+    def _add_shared_result(self, progress: KeywordProgress, detail_url: str, record: Dict,
+                           title: Optional[str], price: Optional[str], author: Optional[str]):
+        """
+        把其他关键词/爬虫解析出的图书复制一份作为本关键词的结果（已解析较久的商品只有 标题、作者，其余字段取搜索页信息）；
+        该关键词已不需要更多结果时只登记关键词关联
+        """
+        if self._stop_flag or progress.target_reached or progress.crawled >= self.max_crawl_limit:
+            self._link_keyword(progress.keyword, record.get("标题") or title, record.get("作者") or author)
+            return
+        book_data = dict.fromkeys(DETAIL_EXTRACTOR.field_names, "")
+        book_data.update({"标题": title or "", "作者": (author or "").strip(), "现价": price or "", "详情页URL": detail_url})
+        book_data.update(record)
+        book_data["搜索关键词"] = progress.keyword
+        self._add_result(progress, book_data)
+    
+    def mark_finished(self):
+        """标记爬虫已结束（主循环退出或启动失败时调用）"""
+        self._finished_event.set()
+        self._done_event.set()
+    
+    def wait_done(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待爬虫结束或达到目标新增数量
+        :param timeout: 最长等待时间（秒），None 表示一直等待
+        :return: 是否在超时前结束/达到目标
+        """
+        return self._done_event.wait(timeout)
+    
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待爬虫主循环退出
+        :param timeout: 最长等待时间（秒），None 表示一直等待
+        :return: 是否在超时前退出
+        """
+        return self._finished_event.wait(timeout)
+    
+    def close_writer(self):
+        """关闭写缓冲并写出剩余数据和待登记的关键词关联（可重复调用）"""
+        if self._writer:
+            self._writer.close()
+        self.flush_keyword_links()
+    
+    def _link_keyword(self, keyword: str, title: Optional[str], author: Optional[str]):
+        """
+        记录一次未请求详情页的命中（已入库或已被其他关键词请求），攒够一批后写入 book_keywords
+        """
+        if not self.use_mysql or not title:
+            return
+        with self._count_lock:
+            self._keyword_links.append((keyword, title, (author or '').strip()))
+            full = len(self._keyword_links) >= 50
+        if full:
+            self.flush_keyword_links()
+    
+    def flush_keyword_links(self):
+        """写出待登记的关键词关联（失败时丢弃，不影响爬取）"""
+        with self._count_lock:
+            links, self._keyword_links = self._keyword_links, []
+        if not links:
+            return
+        try:
+            MySQLPool.link_book_keywords(links)
+        except Exception as e:
+            # print(f"⚠️ 登记关键词关联失败: {e}")
+            ERRORS.labels("dangdang", "link_keywords").inc()
     
     def start_requests(self):
         """
-        生成初始请求 - 搜索页
+        生成初始请求 - 搜索页（每个关键词一个）
         """
-        # 构造搜索URL
-        search_url = f"https://search.dangdang.com/?key={self.keyword}&act=input"
-        
         # 设置请求头，模拟浏览器
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -59,23 +398,37 @@ class DangDangSpider(feapder.AirSpider):
             "Connection": "keep-alive",
         }
         
-        # 构建请求参数
-        request_kwargs = {
-            "url": search_url,
-            "headers": headers,
-            "callback": self.parse_search_page
-        }
-        
-        # 如果设置了代理，添加代理配置
-        if self.proxy:
-            request_kwargs["proxies"] = {
-                "http": self.proxy,
-                "https": self.proxy
+        for keyword in self.keywords:
+            # 构造搜索URL
+            search_url = self.SEARCH_URL.format(keyword=keyword)
+            
+            # 构建请求参数
+            request_kwargs = {
+                "url": search_url,
+                "headers": headers,
+                "callback": self.parse_search_page,
+                "meta": {"keyword": keyword}
             }
-            # print(f"🔒 使用代理: {self.proxy}")
-        
-        yield Request(**request_kwargs)
+            
+            # 如果设置了代理，添加代理配置
+            if self.proxy:
+                request_kwargs["proxies"] = {
+                    "http": self.proxy,
+                    "https": self.proxy
+                }
+                # print(f"🔒 使用代理: {self.proxy}")
+            
+            yield Request(**request_kwargs)
+    
+    def _progress_of(self, request) -> KeywordProgress:
+        """请求所属关键词的进度"""
+        return self.progress[request.meta.get("keyword", self.keyword)]
+    
+    def _all_targets_reached(self) -> bool:
+        """是否所有关键词都已达到目标新增数量"""
+        return all(progress.target_reached for progress in self.progress.values())
     
+    @track_callback("dangdang")
     def parse_search_page(self, request, response):
         """
         解析搜索结果页
@@ -83,6 +436,9 @@ class DangDangSpider(feapder.AirSpider):
         """
         # print(f"📄 正在解析搜索页: {response.url}")
         
+        # 先处理其他关键词/爬虫交来的详情页
+        yield from self._drain_shared()
+        
         # 提取图书列表
         # 方式1: 大图模式
         book_items = response.xpath('//ul[@class="bigimg"]/li')
@@ -97,20 +453,23 @@ class DangDangSpider(feapder.AirSpider):
         
         # print(f"📚 找到 {len(book_items)} 个图书项")
         
+        progress = self._progress_of(request)
+        progress.pages += 1
+        
         # 检查是否应该停止
         if self._stop_flag:
             # 已经停止，不再处理
             return
         
-        if not self.is_unlimited and self.saved_count >= self.target_new_books:
-            # 已达到目标，不再处理
+        if progress.target_reached:
+            # 该关键词已达到目标，不再处理
             if self.skipped_count == 0:
                 # print(f"\n⏭️  已达到目标，跳过搜索页处理")
                 pass
             return
         
         # 检查是否超过最大爬取限制
-        if self.crawled_count >= self.max_crawl_limit:
+        if progress.crawled >= self.max_crawl_limit:
             # 已达到限制
             if self.skipped_count == 0:
                 # print(f"\n⏭️  已达到最大爬取限制，跳过搜索页处理")
@@ -126,7 +485,7 @@ class DangDangSpider(feapder.AirSpider):
                 # 已经停止，不再处理
                 return
             
-            if not self.is_unlimited and self.saved_count >= self.target_new_books:
+            if progress.target_reached:
                 # 已达到目标，不再发起新请求
                 return
             
@@ -143,30 +502,42 @@ class DangDangSpider(feapder.AirSpider):
             price = item.xpath('.//p[@class="price"]/span[@class="search_now_price"]/text()').extract_first() or \
                    item.xpath('.//span[@class="search_now_price"]/text()').extract_first()
             
+            author = item.xpath('.//p[@class="search_book_author"]//a[@name="itemlist-author"]/@title').extract_first() or \
+                    item.xpath('.//a[@name="itemlist-author"]/text()').extract_first()
+            
             if detail_url:
+                # 已入库的图书不再请求详情页
+                if self.skip_known and self._known_index.contains(title=title, author=author, detail_url=detail_url):
+                    self.known_skipped_count += 1
+                    progress.known_skipped += 1
+                    SKIPPED.labels("dangdang", "known").inc()
+                    self._link_keyword(progress.keyword, title, author)
+                    continue
+                
+                # 有效期内已被请求过的商品（如被多个关键词搜到）不再重复请求，把关键词追加到该商品，
+                # 解析结果（已解析的立即、请求中的解析完成时）复制一份作为本关键词的结果
+                item_key = product_key(detail_url)
+                if item_key is not None:
+                    if item_key in progress.items:
+                        continue
+                    progress.items.add(item_key)
+                waiter = self._share_waiter(progress, detail_url, title, price, author, request.headers)
+                if not self._claim(detail_url, progress.keyword, waiter):
+                    progress.shared_skipped += 1
+                    self.shared_skipped_count += 1
+                    SKIPPED.labels("dangdang", "shared").inc()
+                    continue
+                
                 count += 1
                 
                 # 再次检查（在发起请求前）
-                if self._stop_flag or (not self.is_unlimited and self.saved_count >= self.target_new_books):
+                if self._stop_flag or progress.target_reached:
                     # 不再发起新请求
+                    self._release(detail_url)
                     return
-                # 构建请求参数
-                request_kwargs = {
-                    "url": detail_url,
-                    "headers": request.headers,
-                    "callback": self.parse_detail_page,
-                    "meta": {"title": title, "price": price}
-                }
-                
-                # 如果设置了代理，添加代理配置
-                if self.proxy:
-                    request_kwargs["proxies"] = {
-                        "http": self.proxy,
-                        "https": self.proxy
-                    }
                 
                 # 发起详情页请求
-                yield Request(**request_kwargs)
+                yield self._detail_request(detail_url, request.headers, title, price, progress.keyword)
         
         # 判断是否需要翻页
         should_continue = False
@@ -176,15 +547,15 @@ class DangDangSpider(feapder.AirSpider):
             # 已停止，不再翻页
             return
         
-        if self.is_unlimited:
+        if progress.is_unlimited:
             # 无限制模式：继续翻页直到没有更多数据
             should_continue = True
         else:
             # 限制模式：如果新增数量未达到目标，继续翻页
-            if self.saved_count < self.target_new_books and self.crawled_count < self.max_crawl_limit:
+            if not progress.target_reached and progress.crawled < self.max_crawl_limit:
                 should_continue = True
             else:
-                if self.saved_count >= self.target_new_books:
+                if progress.target_reached:
                     # 已达到目标，不再翻页
                     return
         
@@ -192,18 +563,19 @@ class DangDangSpider(feapder.AirSpider):
         if should_continue:
             next_page = response.xpath('//li[@class="next"]/a/@href').extract_first()
             if next_page:
-                if self.is_unlimited:
+                if progress.is_unlimited:
                     # print(f"📄 无限制模式，继续翻页: {next_page}")
                     pass
                 else:
-                    # print(f"📄 新增数量 {self.saved_count}/{self.target_new_books}，继续翻页: {next_page}")
+                    # print(f"📄 [{progress.keyword}] 新增数量 {progress.saved}/{progress.target}，继续翻页: {next_page}")
                     pass
                 
                 # 构建请求参数
                 request_kwargs = {
-                    "url": response.urljoin(next_page),
+                    "url": urljoin(response.url, next_page),
                     "headers": request.headers,
-                    "callback": self.parse_search_page
+                    "callback": self.parse_search_page,
+                    "meta": {"keyword": progress.keyword}
                 }
                 
                 # 如果设置了代理，添加代理配置
@@ -215,199 +587,218 @@ class DangDangSpider(feapder.AirSpider):
                 
                 yield Request(**request_kwargs)
             else:
-                if self.is_unlimited:
+                if progress.is_unlimited:
                     # print(f"📄 已到最后一页，无更多数据")
                     pass
                 else:
-                    # print(f"📄 已到最后一页，实际新增 {self.saved_count} 本（目标 {self.target_new_books} 本）")
+                    # print(f"📄 [{progress.keyword}] 已到最后一页，实际新增 {progress.saved} 本（目标 {progress.target} 本）")
                     pass
 
+    def _detail_request(self, detail_url: str, headers, title: Optional[str], price: Optional[str], keyword: str) -> Request:
+        """构造详情页请求（标题、价格为搜索页信息，详情页未提取到时使用）"""
+        request_kwargs = {
+            "url": detail_url,
+            "headers": headers,
+            "callback": self.parse_detail_page,
+            "meta": {"title": title, "price": price, "keyword": keyword}
+        }
+        
+        # 如果设置了代理，添加代理配置
+        if self.proxy:
+            request_kwargs["proxies"] = {
+                "http": self.proxy,
+                "https": self.proxy
+            }
+        return Request(**request_kwargs)
+    
+    @track_callback("dangdang")
     def parse_detail_page(self, request, response):
         """
         解析图书详情页
         提取完整的图书信息
         """
+        # 先处理其他关键词/爬虫交来的详情页
+        yield from self._drain_shared()
+        
         try:
-            # 检查是否应该停止（非无限制模式且已达到目标）
-            if not self.is_unlimited and self.saved_count >= self.target_new_books:
+            progress = self._progress_of(request)
+            
+            # 检查是否应该停止（非无限制模式且该关键词已达到目标）
+            if progress.target_reached:
                 # 记录跳过数量
                 self.skipped_count += 1
                 # 只在第一次跳过时打印提示
                 if self.skipped_count == 1:
-                    # print(f"\n⏭️  已达到目标新增数量 {self.target_new_books}，后续请求将被跳过...")
+                    # print(f"\n⏭️  [{progress.keyword}] 已达到目标新增数量 {progress.target}，后续请求将被跳过...")
                     pass
+                SKIPPED.labels("dangdang", "target_reached").inc()
+                self._give_up(request, response)
                 return
             
             # 检查是否超过最大爬取限制
-            if self.crawled_count >= self.max_crawl_limit:
+            if progress.crawled >= self.max_crawl_limit:
                 self.skipped_count += 1
                 if self.skipped_count == 1:
                     # print(f"\n⏭️  已达到最大爬取限制 {self.max_crawl_limit}，后续请求将被跳过...")
                     pass
+                SKIPPED.labels("dangdang", "crawl_limit").inc()
+                self._give_up(request, response)
                 return
             
             # 检查停止标志
             if self._stop_flag:
                 self.skipped_count += 1
+                SKIPPED.labels("dangdang", "stopped").inc()
+                self._give_up(request, response)
                 return
             
             # 打印正在解析的URL
             # print(f"🔍 正在解析详情页: {response.url}")
             
-            # 从meta中获取搜索页的基本信息
-            basic_title = request.meta.get("title", "")
-            basic_price = request.meta.get("price", "")
-            
-            # 提取详情页信息
-            # 图书标题 - 多种方式尝试
-            title = response.xpath('//div[@class="name_info"]//h1/@title').extract_first() or \
-                   response.xpath('//div[@class="name_info"]//h1/text()').extract_first() or \
-                   response.xpath('//h1[@class="title"]/text()').extract_first() or \
-                   basic_title
-            
-            # 作者 - 多种方式尝试
-            author = response.xpath('//span[@id="author"]//a/text()').extract_first() or \
-                    response.xpath('//div[@class="messbox_info"]//span[contains(text(),"作")]/following-sibling::a[1]/text()').extract_first() or \
-                    response.xpath('//a[@name="itemlist-author"]/text()').extract_first() or \
-                    response.xpath('//p[@class="author"]//a[1]/text()').extract_first()
-            
-            # 出版社 - 多种方式尝试
-            publisher = response.xpath('//span[@id="publisher"]//a/text()').extract_first() or \
-                       response.xpath('//div[@class="messbox_info"]//span[contains(text(),"出版社")]/following-sibling::a[1]/text()').extract_first() or \
-                       response.xpath('//a[@name="P_cbs"]/text()').extract_first()
-            
-            # 出版时间 - 多种方式尝试
-            publish_date = response.xpath('//span[@id="publish_time"]/text()').extract_first() or \
-                          response.xpath('//div[@class="messbox_info"]//span[contains(text(),"出版时间")]/following-sibling::text()[1]').extract_first() or \
-                          response.xpath('//span[@name="P_date"]/text()').extract_first()
-            
-            # 价格信息
-            original_price = response.xpath('//span[@id="original-price"]/text()').extract_first() or \
-                            response.xpath('//p[@class="price"]/span[@class="price_n"]/text()').extract_first()
-            
-            current_price = response.xpath('//span[@id="dd-price"]/text()').extract_first() or \
-                           basic_price
-            
-            # 图书简介
-            description = response.xpath('//div[@class="descrip"]//text()').extract_first() or \
-                         response.xpath('//div[@id="content"]//div[@class="describe_detail"]//text()').extract_first() or \
-                         response.xpath('//div[@class="book_intro"]//text()').extract_first()
-            
-            # ISBN - 多种方式尝试
-            isbn = response.xpath('//li[contains(text(),"ISBN")]/text()').extract_first()
-            if not isbn:
-                isbn = response.xpath('//span[contains(text(),"ISBN")]/following-sibling::text()[1]').extract_first()
-            if isbn:
-                isbn = isbn.replace("ISBN：", "").replace("ISBN:", "").strip()
-            
-            # 评分 - 多种方式尝试
-            rating = response.xpath('//span[@class="star_gray"]/text()').extract_first() or \
-                    response.xpath('//div[@class="star"]//text()').extract_first() or \
-                    response.xpath('//span[@class="score"]/text()').extract_first()
-            
-            # 评论数
-            comment_count = response.xpath('//span[@id="comm_num_down"]/text()').extract_first() or \
-                           response.xpath('//a[@id="comm_num"]/text()').extract_first()
-            
-            # 图书封面
-            cover_image = response.xpath('//img[@id="largePic"]/@src').extract_first() or \
-                         response.xpath('//div[@class="pic_box"]//img/@src').extract_first() or \
-                         response.xpath('//img[@id="main-img"]/@src').extract_first()
-            
-            # 清理数据
-            if title:
-                title = title.strip()
-            if author:
-                author = author.strip()
-            if publisher:
-                publisher = publisher.strip()
-            if publish_date:
-                publish_date = publish_date.strip()
-            if description:
-                description = description.strip()
-            
-            # 构造图书数据
-            book_data = {
-                "标题": title if title else "",
-                "作者": author if author else "",
-                "出版社": publisher if publisher else "",
-                "出版时间": publish_date if publish_date else "",
-                "原价": original_price.strip() if original_price else "",
-                "现价": current_price.strip() if current_price else "",
-                "ISBN": isbn.strip() if isbn else "",
-                "评分": rating.strip() if rating else "",
-                "评论数": comment_count.strip() if comment_count else "",
-                "简介": description if description else "",
-                "封面图": cover_image.strip() if cover_image else "",
-                "详情页URL": response.url,
-                "搜索关键词": self.keyword  # 添加搜索关键词
-            }
+            book_data = self._extract_book(request, response, progress.keyword)
+            # 关联到登记表：之后其他关键词再搜到该商品时会追加到"关键词列表"，等待中的关键词收到一份副本
+            self._seen.attach(request.url, book_data)
+            self._release(request.url, attached=True)
             
             # 打印提取的信息用于调试
-            # print(f"📖 提取信息: 标题={title}, 作者={author}, 出版社={publisher}, 出版时间={publish_date}, 评分={rating}")
-            
-            # 存储到内存
-            self.results.append(book_data)
-            self.crawled_count += 1
+            # print(f"📖 提取信息: {book_data}")
             
-            # 存储到 MySQL（使用连接池）
-            is_new = False
-            if self.use_mysql:
-                try:
-                    result = MySQLPool.save_book(book_data)
-                    if result['success']:
-                        self.saved_count += 1
-                        is_new = True
-                        if self.is_unlimited:
-                            # print(f"💾 成功保存到数据库（已新增: {self.saved_count}，已爬取: {self.crawled_count}）")
-                            pass
-                        else:
-                            # print(f"💾 成功保存到数据库（已新增: {self.saved_count}/{self.target_new_books}，已爬取: {self.crawled_count}）")
-                            pass
-                    elif result['is_duplicate']:
-                        self.duplicate_count += 1
-                        # print(f"⚠️ 图书重复，已跳过（去重: {self.duplicate_count}，已爬取: {self.crawled_count}）")
-                    else:
-                        # print(f"⚠️ 保存到数据库失败: {result['message']}")
-                        pass
-                except Exception as e:
-                    # print(f"⚠️ 保存到数据库失败: {e}")
-                    pass
-            else:
-                # 不使用数据库时，所有数据都算新增
-                self.saved_count += 1
-                is_new = True
-            
-            # 显示进度
-            if self.is_unlimited:
-                # print(f"✅ 已爬取 {self.crawled_count} 本图书（新增: {self.saved_count}，重复: {self.duplicate_count}）")
-                pass
-            else:
-                # print(f"✅ 已爬取 {self.crawled_count} 本图书（新增: {self.saved_count}/{self.target_new_books}，重复: {self.duplicate_count}）")
-                pass
-            
-            # 检查是否达到目标（非无限制模式）
-            if not self.is_unlimited and self.saved_count >= self.target_new_books:
-                # 只在刚达到目标时打印一次
-                if not self._stop_flag:
-                    # print(f"\n{'='*60}")
-                    pass
-                    # print(f"🎉 已完成目标！成功新增 {self.saved_count} 本图书")
-                    # print(f"📊 总爬取: {self.crawled_count} 本，去重: {self.duplicate_count} 本")
-                    # print(f"🛑 正在停止爬虫...")
-                    # print(f"{'='*60}\n")
-                    # 主动停止爬虫
-                    self._stop_crawling()
-                return
+            self._add_result(progress, book_data)
         
         except Exception as e:
             # print(f"❌ 解析详情页失败: {e}")
-            pass
+            ERRORS.labels("dangdang", "parse_detail_page").inc()
+            self._release(request.url)
             import traceback
             traceback.print_exc()
             # 继续处理其他页面，不中断爬虫
             pass
     
+    def _extract_book(self, request, response, keyword: str) -> Dict:
+        """
+        提取详情页的图书数据
+        :param keyword: 搜索关键词
+        :return: 图书数据字典
+        """
+        # 从meta中获取搜索页的基本信息
+        basic_title = request.meta.get("title", "")
+        basic_price = request.meta.get("price", "")
+        
+        # 提取详情页信息（预编译的 XPath 规则，标题和现价未命中时使用搜索页的信息）
+        fields = DETAIL_EXTRACTOR.extract(
+            response.selector.root,
+            defaults={"标题": basic_title, "现价": basic_price}
+        )
+        
+        # 构造图书数据
+        book_data = {name: value or "" for name, value in fields.items()}
+        book_data["详情页URL"] = response.url
+        book_data["搜索关键词"] = keyword  # 添加搜索关键词
+        return book_data
+    
+    def _add_result(self, progress: KeywordProgress, book_data: Dict):
+        """
+        记录一本图书：存入内存、推送给订阅方、放入写缓冲，并检查是否所有关键词都已达到目标
+        :param progress: 所属关键词的进度
+        :param book_data: 图书数据
+        """
+        # 存储到内存
+        self.results.append(book_data)
+        with self._count_lock:
+            self.crawled_count += 1
+            progress.crawled += 1
+        BOOKS.labels("dangdang").inc()
+        
+        # 推送给流式订阅方
+        if self.on_result:
+            try:
+                self.on_result(book_data)
+            except Exception as e:
+                # print(f"⚠️ 推送结果失败: {e}")
+                ERRORS.labels("dangdang", "on_result").inc()
+        
+        # 存储到 MySQL（放入写缓冲，由后台线程批量写入）
+        if self.use_mysql:
+            with self._count_lock:
+                progress.pending += 1
+            self._writer.put(book_data)
+            
+            # 缓冲中的数据可能让该关键词的新增数量达到目标，此时同步刷新，保证停止判断准确
+            if not progress.is_unlimited and progress.saved + progress.pending >= progress.target:
+                self._writer.flush()
+        else:
+            # 不使用数据库时，所有数据都算新增
+            with self._count_lock:
+                self.saved_count += 1
+                progress.saved += 1
+            SAVED.labels("dangdang").inc()
+        
+        # 显示进度
+        if progress.is_unlimited:
+            # print(f"✅ 已爬取 {self.crawled_count} 本图书（新增: {self.saved_count}，重复: {self.duplicate_count}）")
+            pass
+        else:
+            # print(f"✅ 已爬取 {self.crawled_count} 本图书（新增: {self.saved_count}/{self.target_new_books}，重复: {self.duplicate_count}）")
+            pass
+        
+        # 检查是否所有关键词都已达到目标（非无限制模式）
+        if self._all_targets_reached():
+            # 只在刚达到目标时打印一次
+            if not self._stop_flag:
+                # print(f"\n{'='*60}")
+                pass
+                # print(f"🎉 已完成目标！成功新增 {self.saved_count} 本图书")
+                # print(f"📊 总爬取: {self.crawled_count} 本，去重: {self.duplicate_count} 本")
+                # print(f"🛑 正在停止爬虫...")
+                # print(f"{'='*60}\n")
+                # 主动停止爬虫
+                self._stop_crawling()
+    
+    def failed_request(self, request, response, e):
+        """
+        超过最大重试次数的请求：放弃该详情页（有等待中的关键词/爬虫时由其接手，否则撤销登记）
+        """
+        ERRORS.labels("dangdang", "fetch").inc()
+        self._release(request.url)
+    
+    def _on_book_saved(self, book_data: Dict, result: Dict):
+        """
+        写缓冲的逐行结果回调：更新新增/去重计数
+        :param book_data: 图书数据
+        :param result: 保存结果 {'success': bool, 'is_duplicate': bool, 'message': str}
+        """
+        progress = self.progress.get(book_data.get("搜索关键词"), self.progress[self.keyword])
+        with self._count_lock:
+            progress.pending = max(0, progress.pending - 1)
+            if result['success']:
+                self.saved_count += 1
+                progress.saved += 1
+                SAVED.labels("dangdang").inc()
+                if self.skip_known:
+                    self._known_index.add(book_data.get('标题'), book_data.get('作者'), book_data.get('详情页URL'))
+                if self.is_unlimited:
+                    # print(f"💾 成功保存到数据库（已新增: {self.saved_count}，已爬取: {self.crawled_count}）")
+                    pass
+                else:
+                    # print(f"💾 成功保存到数据库（已新增: {self.saved_count}/{self.target_new_books}，已爬取: {self.crawled_count}）")
+                    pass
+            elif result['is_duplicate']:
+                self.duplicate_count += 1
+                progress.duplicates += 1
+                DUPLICATES.labels("dangdang").inc()
+                if self.skip_known:
+                    self._known_index.add(book_data.get('标题'), book_data.get('作者'), book_data.get('详情页URL'))
+                # print(f"⚠️ 图书重复，已跳过（去重: {self.duplicate_count}，已爬取: {self.crawled_count}）")
+            else:
+                # print(f"⚠️ 保存到数据库失败: {result['message']}")
+                ERRORS.labels("dangdang", "save").inc()
+            
+            target_reached = self._all_targets_reached()
+        
+        # 后台批量写入也可能让所有关键词都达到目标
+        if target_reached:
+            self._stop_crawling()
+    
     def _stop_crawling(self):
         """停止爬虫的内部方法"""
         if self._stop_flag:
@@ -416,6 +807,8 @@ class DangDangSpider(feapder.AirSpider):
         
         try:
             self._stop_flag = True
+            # 通知 run_spider 立即返回
+            self._done_event.set()
             # print("🛑 爬虫已停止")
             
             # 打印跳过统计
@@ -423,9 +816,8 @@ class DangDangSpider(feapder.AirSpider):
                 # print(f"📊 跳过了 {self.skipped_count} 个已在队列中的请求")
                 pass
             
-            # 调用父类的停止方法
-            if hasattr(self, '_spider') and self._spider:
-                self._spider.stop()
+            # 调用父类的停止方法（feapder 主循环在下一次检查时退出）
+            self.stop_spider()
         except Exception as e:
             # print(f"⚠️ 停止爬虫时出错: {e}")
             pass
@@ -435,7 +827,90 @@ class DangDangSpider(feapder.AirSpider):
         self._stop_crawling()
 
 
-def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysql_config: Optional[Dict] = None, max_books: int = 20, proxy: Optional[str] = None) -> Dict:
+def _init_mysql_pool(mysql_config: Optional[Dict] = None) -> bool:
+    """
+    初始化 MySQL 连接池（已初始化时不重复创建）
+    :param mysql_config: MySQL 配置字典（为空时使用 db_config.MYSQL_CONFIG）
+    :return: 连接池是否可用
+    """
+    from db_config import POOL_CONFIG
+    if mysql_config is None:
+        # 如果没有提供配置，使用默认配置
+        from db_config import MYSQL_CONFIG
+        mysql_config = MYSQL_CONFIG
+    
+    try:
+        MySQLPool.initialize(
+            host=mysql_config.get('host', 'localhost'),
+            port=mysql_config.get('port', 3306),
+            user=mysql_config.get('user', 'root'),
+            password=mysql_config.get('password', ''),
+            database=mysql_config.get('database', 'dangdang_books'),
+            mincached=POOL_CONFIG.get('mincached', 2),
+            maxcached=POOL_CONFIG.get('maxcached', 10),
+            maxconnections=POOL_CONFIG.get('maxconnections', 20)
+        )
+        return True
+    except Exception as e:
+        # print(f"⚠️ 连接池初始化失败: {e}")
+        ERRORS.labels("dangdang", "pool_init").inc()
+        return False
+
+
+def _run_until_done(spider: DangDangSpider, max_wait_time: float):
+    """
+    在单独的线程中运行爬虫，等待其结束或达到目标，超时则主动停止，最后写出写缓冲中的剩余数据
+    :param spider: 爬虫实例
+    :param max_wait_time: 最长等待时间（秒）
+    """
+    # 在单独的线程中运行爬虫（非 daemon，确保正常完成）
+    def run_spider_thread():
+        try:
+            spider.start()
+        except Exception as e:
+            # print(f"⚠️ 爬虫线程异常: {e}")
+            ERRORS.labels("dangdang", "spider").inc()
+            # 启动失败时不会触发 end_callback，直接通知等待方
+            spider.mark_finished()
+    
+    spider_thread = threading.Thread(target=run_spider_thread, daemon=False)
+    spider_thread.start()
+    
+    # 等待爬虫结束或达到目标（由爬虫通过事件通知，无需轮询）
+    # print(f"⏳ 等待爬虫完成...")
+    
+    if spider.wait_done(timeout=max_wait_time):
+        if spider._all_targets_reached():
+            # print(f"\n{'='*60}")
+            # print(f"✅ 已达到目标新增数量，准备停止爬虫")
+            # print(f"📊 当前状态: 爬取 {spider.crawled_count} 本，新增 {spider.saved_count} 本，去重 {spider.duplicate_count} 本")
+            # print(f"{'='*60}\n")
+            pass
+    else:
+        # 超时处理
+        # print(f"⚠️ 等待超时（{max_wait_time}秒），强制返回结果")
+        try:
+            spider._stop_crawling()
+        except Exception as e:
+            # print(f"⚠️ 停止爬虫时出错: {e}")
+            pass
+    
+    # 等待爬虫主循环退出（最多3秒，达到目标或超时后 feapder 会在1秒内退出）
+    # print(f"⏳ 等待爬虫线程结束...")
+    if not spider.wait_finished(timeout=3):
+        # print(f"⚠️ 爬虫线程未能及时结束，强制返回结果")
+        pass
+    
+    # print(f"🕷️ 爬虫运行结束")
+    
+    # 写出写缓冲中剩余的数据，确保统计数量完整；撤销未解析详情页的登记
+    spider.close_writer()
+    spider.release_claims()
+
+
+def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysql_config: Optional[Dict] = None, max_books: int = 20, proxy: Optional[str] = None,
+               on_spider: Optional[Callable[[DangDangSpider], None]] = None,
+               on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
     """
     运行爬虫并返回结果
     :param keyword: 搜索关键词
@@ -443,11 +918,10 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
     :param use_mysql: 是否使用 MySQL 存储（默认 True）
     :param mysql_config: MySQL 配置字典（用于初始化连接池）
     :param max_books: 最大爬取图书数量（默认 20）
+    :param on_spider: 爬虫创建后的回调（用于在运行期间读取实时进度）
+    :param on_result: 每解析出一本图书时的回调（用于流式返回结果）
     :return: 图书数据列表
     """
-    import time
-    import threading
-    
     # print("\n" + "="*60)
     # print(f"🚀 开始爬取关键词: {keyword}")
     # print(f"📊 线程数: {thread_count}")
@@ -469,29 +943,9 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
     
     # 如果使用 MySQL，先初始化连接池
     if use_mysql:
-        if mysql_config is None:
-            # 如果没有提供配置，使用默认配置
-            from db_config import MYSQL_CONFIG
-            mysql_config = MYSQL_CONFIG
-        
-        try:
-            MySQLPool.initialize(
-                host=mysql_config.get('host', 'localhost'),
-                port=mysql_config.get('port', 3306),
-                user=mysql_config.get('user', 'root'),
-                password=mysql_config.get('password', ''),
-                database=mysql_config.get('database', 'dangdang_books'),
-                mincached=2,
-                maxcached=10,
-                maxconnections=20
-            )
-        except Exception as e:
-            # print(f"⚠️ 连接池初始化失败: {e}")
-            pass
-            use_mysql = False
+        use_mysql = _init_mysql_pool(mysql_config)
     
     spider = None
-    spider_thread = None
     
     try:
         spider = DangDangSpider(
@@ -499,87 +953,23 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
             thread_count=thread_count,
             use_mysql=use_mysql,
             max_books=max_books,
-            proxy=proxy
+            proxy=proxy,
+            on_result=on_result
         )
         
-        # print(f"🕷️ 爬虫开始运行...")
-        
-        # 在单独的线程中运行爬虫（非 daemon，确保正常完成）
-        def run_spider_thread():
-            try:
-                spider.start()
-            except Exception as e:
-                # print(f"⚠️ 爬虫线程异常: {e}")
-                pass
-        
-        spider_thread = threading.Thread(target=run_spider_thread, daemon=False)
-        spider_thread.start()
-        
-        # 等待爬虫完成或达到目标
-        max_wait_time = 60  # 最多等待60秒（从180秒减少到60秒）
-        wait_interval = 0.5  # 每0.5秒检查一次
-        elapsed = 0
+        if on_spider:
+            on_spider(spider)
         
-        # print(f"⏳ 等待爬虫完成...")
-        
-        while elapsed < max_wait_time:
-            # 检查线程是否还活着（优先检查）
-            if not spider_thread.is_alive():
-                # print(f"✅ 爬虫线程已自然结束")
-                pass
-                break
-            
-            # 检查是否达到目标数量（非无限制模式）
-            if not spider.is_unlimited and spider.saved_count >= max_books:
-                # print(f"\n{'='*60}")
-                pass
-                # print(f"✅ 已达到目标新增数量 {max_books}，准备停止爬虫")
-                # print(f"📊 当前状态: 爬取 {spider.crawled_count} 本，新增 {spider.saved_count} 本，去重 {spider.duplicate_count} 本")
-                # print(f"{'='*60}\n")
-                
-                # 设置停止标志
-                spider._stop_flag = True
-                
-                # 主动停止爬虫
-                try:
-                    spider._stop_crawling()
-                except Exception as e:
-                    # print(f"⚠️ 停止爬虫时出错: {e}")
-                    pass
-                
-                # 等待线程结束（最多3秒，从5秒减少到3秒）
-                # print(f"⏳ 等待爬虫线程结束...")
-                spider_thread.join(timeout=3)
-                
-                if spider_thread.is_alive():
-                    # print(f"⚠️ 爬虫线程未能及时结束，强制返回结果")
-                    pass
-                else:
-                    # print(f"✅ 爬虫线程已正常结束")
-                    pass
-                
-                break
-            
-            time.sleep(wait_interval)
-            elapsed += wait_interval
-        
-        # 超时处理
-        if elapsed >= max_wait_time:
-            # print(f"⚠️ 等待超时（{max_wait_time}秒），强制返回结果")
-            pass
-            spider._stop_flag = True
-            try:
-                spider._stop_crawling()
-            except:
-                pass
-            # 强制等待线程结束（最多2秒）
-            spider_thread.join(timeout=2)
+        # print(f"🕷️ 爬虫开始运行...")
         
-        # print(f"🕷️ 爬虫运行结束")
+        # 最多等待60秒（从180秒减少到60秒）
+        _run_until_done(spider, max_wait_time=60)
         
         result_count = len(spider.results) if spider and spider.results else 0
         saved_count = spider.saved_count if spider else 0
         duplicate_count = spider.duplicate_count if spider else 0
+        known_skipped_count = spider.known_skipped_count if spider else 0
+        shared_skipped_count = spider.shared_skipped_count if spider else 0
         
         # print("\n" + "="*60)
         # print(f"✅ 爬取完成！")
@@ -602,6 +992,8 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
             'total_crawled': result_count,
             'total_saved': saved_count,
             'total_duplicates': duplicate_count,
+            'total_known_skipped': known_skipped_count,
+            'total_shared_skipped': shared_skipped_count,
             'dedup_key': '标题 + 作者'
         }
     
@@ -613,6 +1005,12 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
         # print("="*60 + "\n")
         
         # 即使出错也返回已爬取的结果
+        if spider:
+            try:
+                spider.close_writer()
+            except Exception:
+                pass
+        
         if spider and spider.results:
             # print(f"⚠️ 返回已爬取的 {len(spider.results)} 本图书")
             return {
@@ -620,6 +1018,8 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
                 'total_crawled': len(spider.results),
                 'total_saved': spider.saved_count if spider else 0,
                 'total_duplicates': spider.duplicate_count if spider else 0,
+                'total_known_skipped': spider.known_skipped_count if spider else 0,
+                'total_shared_skipped': spider.shared_skipped_count if spider else 0,
                 'dedup_key': '标题 + 作者'
             }
         return {
@@ -627,6 +1027,8 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
             'total_crawled': 0,
             'total_saved': 0,
             'total_duplicates': 0,
+            'total_known_skipped': 0,
+            'total_shared_skipped': 0,
             'dedup_key': '标题 + 作者'
         }
     
@@ -635,6 +1037,67 @@ def run_spider(keyword: str, thread_count: int = 3, use_mysql: bool = True, mysq
         pass
 
 
+def run_spider_batch(keywords: List[str], thread_count: int = 6, use_mysql: bool = True, mysql_config: Optional[Dict] = None,
+                     max_books: int = 20, proxy: Optional[str] = None, max_wait_time: Optional[float] = None,
+                     on_spider: Optional[Callable[[DangDangSpider], None]] = None,
+                     on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    批量爬取多个关键词：所有关键词的搜索请求进入同一个爬虫，
+    共用线程、写缓冲、连接池和去重状态（多个关键词搜到同一商品时只请求一次详情页），
+    每个关键词各自计数、各自达到 max_books 后停止翻页
+    :param keywords: 关键词列表（自动去重、去除空白）
+    :param thread_count: 线程数
+    :param use_mysql: 是否使用 MySQL 存储（默认 True）
+    :param mysql_config: MySQL 配置字典（用于初始化连接池）
+    :param max_books: 每个关键词的目标新增数量（0 表示不限制）
+    :param proxy: 代理地址
+    :param max_wait_time: 最长等待时间（秒），为空时按关键词数量估算（每个关键词 20 秒，至少 60 秒）
+    :param on_spider: 爬虫创建后的回调（用于在运行期间读取实时进度）
+    :param on_result: 每解析出一本图书时的回调（用于流式返回结果）
+    :return: 汇总统计和每个关键词的统计 {'keywords': {关键词: {...}}, ...}
+    """
+    keywords = [kw.strip() for kw in keywords if kw and kw.strip()]
+    if not keywords:
+        raise ValueError("关键词列表不能为空")
+    
+    if use_mysql:
+        use_mysql = _init_mysql_pool(mysql_config)
+    
+    spider = DangDangSpider(
+        keywords=keywords,
+        thread_count=thread_count,
+        use_mysql=use_mysql,
+        max_books=max_books,
+        proxy=proxy,
+        on_result=on_result
+    )
+    
+    if on_spider:
+        on_spider(spider)
+    
+    if max_wait_time is None:
+        max_wait_time = max(60, 20 * len(spider.keywords))
+    
+    try:
+        _run_until_done(spider, max_wait_time=max_wait_time)
+    except Exception as e:
+        # print(f"\n❌ 批量爬取出错: {e}")
+        import traceback
+        traceback.print_exc()
+        spider.close_writer()
+    
+    return {
+        'books': spider.results,
+        'total_crawled': spider.crawled_count,
+        'total_saved': spider.saved_count,
+        'total_duplicates': spider.duplicate_count,
+        'total_known_skipped': spider.known_skipped_count,
+        'total_shared_skipped': spider.shared_skipped_count,
+        'dedup_key': '标题 + 作者',
+        'keywords': {kw: progress.to_dict() for kw, progress in spider.progress.items()}
+    }
+
+
 if __name__ == "__main__":
     # 命令行模式
     keyword = input("请输入搜索关键词: ").strip()
@@ -14,3 +14,42 @@ MYSQL_CONFIG = {
 
 # 是否启用数据库存储
 USE_MYSQL = True  # 设置为 True 启用 MySQL 存储，False 则只使用内存存储
+
+# 连接池配置（后端 API 和命令行爬虫共用；可根据 /api/pool 的使用率和等待时间调整）
+POOL_CONFIG = {
+    'mincached': 2,         # 启动时创建的空闲连接数
+    'maxcached': 10,        # 池中保留的空闲连接上限（超过的归还连接会被关闭）
+    'maxconnections': 20    # 同时借出的连接上限（达到后取连接会阻塞等待）
+}
+
+# 异步连接池配置（后端 API 只读接口使用 aiomysql；未安装或初始化失败时只读接口在线程池中使用上面的同步连接池）
+ASYNC_POOL_CONFIG = {
+    'minsize': 1,   # 保持的最小连接数
+    'maxsize': 10   # 最大连接数
+}
+
+# 爬取任务配置（后端 API 使用）
+CRAWL_JOB_CONFIG = {
+    'max_workers': 3,       # 同时执行的爬取任务数量
+    'max_pending': 500,     # 排队 + 执行中的任务上限（超过则拒绝提交）
+    'max_finished': 1000,   # 保留的已结束任务数量（用于查询结果）
+    'sync_interval': 2,     # 多进程部署时，运行中任务的进度写入 crawl_jobs 表的间隔（秒）
+    'stale_after': 300      # 多进程部署时，超过该时间（秒）没有写入的未结束任务标记为失败
+}
+
+# 后端 API 服务配置
+API_SERVER_CONFIG = {
+    'workers': 1    # worker 进程数；大于 1 时需启用 MySQL（任务状态保存在 crawl_jobs 表中供各进程查询）
+}
+
+# 查询结果缓存配置（/api/books、/api/books/fanqie；进程内缓存，API_SERVER_CONFIG['workers'] 大于 1 时不启用）
+RESULT_CACHE_CONFIG = {
+    'maxsize': 512,  # 最大缓存条目数
+    'ttl': 60        # 缓存有效期（秒）
+}
+
+# 详情页去重配置（同一商品在有效期内只请求一次详情页，进程内所有爬虫共享）
+DETAIL_DEDUP_CONFIG = {
+    'ttl': 3600,            # 登记有效期（秒）
+    'max_entries': 200000   # 最大登记商品数
+}
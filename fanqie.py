@@ -8,10 +8,64 @@
 
 import feapder
 from feapder import Request
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from mysql_pool import MySQLPool
+from html_parsing import parse_html
+from crawl_metrics import BOOKS, ERRORS, SAVED, track_callback
 import re
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+
+
+# 番茄小说站点地址（压测时可指向本地模拟服务器，见 benchmarks/mock_server.py）
+BASE_URL = "https://fanqienovel.com"
+
+
+def extract_book_items(html: str, fallback_selector: Optional[str] = None, backend: Optional[str] = None) -> List[Dict]:
+    """
+    提取书籍列表页（推荐页、搜索页）中的书籍条目
+    :param html: 页面 HTML
+    :param fallback_selector: .book-item 未命中时使用的备用选择器
+    :param backend: 解析后端（为空时优先 lxml）
+    :return: 条目列表，每项包含 title / author / href / book_id
+    """
+    doc = parse_html(html, backend)
+    book_items = doc.select('.book-item')
+    if not book_items and fallback_selector:
+        book_items = doc.select(fallback_selector)
+    
+    items = []
+    for item in book_items:
+        href = item.first_attr('href', 'a')
+        match = re.search(r'/page/(\d+)', href) if href else None
+        items.append({
+            'title': item.first_text('h3', '.title'),
+            'author': item.first_text('.author'),
+            'href': href,
+            'book_id': match.group(1) if match else None
+        })
+    return items
+
+
+def extract_book_detail(html: str, backend: Optional[str] = None) -> Dict:
+    """
+    提取书籍详情页信息
+    :param html: 页面 HTML
+    :param backend: 解析后端（为空时优先 lxml）
+    :return: 字段字典（未找到的字段为 None）
+    """
+    doc = parse_html(html, backend)
+    return {
+        'title': doc.first_text('.info-name h1', '.book-title'),
+        'author': doc.first_text('.author-name-text', '.author'),
+        'category': doc.first_text('.category', '.tag'),
+        'status': doc.first_text('.status', '.book-status'),
+        'description': doc.first_text('.page-abstract-content', '.book-intro'),
+        'word_count': doc.labeled_value('span', '字数'),
+        'chapter_count': doc.labeled_value('span', '章节'),
+        'cover_image': doc.first_attr('src', 'img.book-cover', '.cover img'),
+        'latest_chapter': doc.first_text('.latest-chapter a'),
+        'update_time': doc.first_text('.update-time')
+    }
 
 
 class FanQieRecommendSpider(feapder.AirSpider):
@@ -43,7 +97,7 @@ class FanQieRecommendSpider(feapder.AirSpider):
     def start_requests(self):
         """生成初始请求 - 推荐页面"""
         # 番茄小说推荐页面URL
-        recommend_url = "https://fanqienovel.com/page/recommend"
+        recommend_url = f"{BASE_URL}/page/recommend"
         
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -65,57 +119,40 @@ class FanQieRecommendSpider(feapder.AirSpider):
         
         yield Request(**request_kwargs)
     
+    @track_callback("fanqie_recommend")
     def parse_recommend_page(self, request, response):
-        """解析推荐页面 - 只提取书名和ID（使用 BeautifulSoup）"""
+        """解析推荐页面 - 只提取书名和ID"""
         try:
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取书籍列表
-            book_items = soup.select('.book-item')
-            
-            if not book_items:
-                book_items = soup.select('[class*="recommend-item"]')
-            
-            for item in book_items:
+            # 提取书籍列表（书籍ID从URL中提取，例如：/page/123456）
+            for item in extract_book_items(response.text, fallback_selector='[class*="recommend-item"]'):
                 if self.crawled_count >= self.max_books:
                     return
                 
-                # 提取书名
-                title_tag = item.select_one('h3')
-                if not title_tag:
-                    title_tag = item.select_one('.title')
-                title = title_tag.get_text(strip=True) if title_tag else None
-                
-                # 提取书籍ID（从URL中提取）
-                link_tag = item.select_one('a')
-                detail_url = link_tag.get('href') if link_tag else None
-                book_id = None
-                if detail_url:
-                    # 从URL中提取ID，例如：/page/123456
-                    match = re.search(r'/page/(\d+)', detail_url)
-                    if match:
-                        book_id = match.group(1)
+                title = item['title']
+                book_id = item['book_id']
+                detail_url = item['href']
                 
                 if title and book_id:
                     book_data = {
                         "书名": title,
                         "书籍ID": book_id,
-                        "详情页URL": response.urljoin(detail_url) if detail_url else ""
+                        "详情页URL": urljoin(response.url, detail_url) if detail_url else ""
                     }
                     
                     self.results.append(book_data)
                     self.crawled_count += 1
+                    BOOKS.labels("fanqie_recommend").inc()
                     
                     # 保存到数据库
                     if self.use_mysql:
                         try:
-                            MySQLPool.save_fanqie_recommend(book_data)
+                            if MySQLPool.save_fanqie_recommend(book_data).get('success'):
+                                SAVED.labels("fanqie_recommend").inc()
                         except Exception as e:
-                            pass
+                            ERRORS.labels("fanqie_recommend", "save").inc()
         
         except Exception as e:
-            pass
+            ERRORS.labels("fanqie_recommend", "parse_recommend_page").inc()
 
 
 class FanQieDetailSpider(feapder.AirSpider):
@@ -149,10 +186,10 @@ class FanQieDetailSpider(feapder.AirSpider):
         """生成初始请求 - 详情页"""
         if self.book_id:
             # 使用书籍ID构造URL
-            detail_url = f"https://fanqienovel.com/page/{self.book_id}"
+            detail_url = f"{BASE_URL}/page/{self.book_id}"
         elif self.book_name:
             # 使用书名搜索
-            detail_url = f"https://fanqienovel.com/search/{self.book_name}"
+            detail_url = f"{BASE_URL}/search/{self.book_name}"
         else:
             return
         
@@ -176,19 +213,17 @@ class FanQieDetailSpider(feapder.AirSpider):
         
         yield Request(**request_kwargs)
     
+    @track_callback("fanqie_detail")
     def parse_search_page(self, request, response):
-        """解析搜索页面，找到第一个匹配的书籍（使用 BeautifulSoup）"""
+        """解析搜索页面，找到第一个匹配的书籍"""
         try:
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # 找到第一个匹配的书籍
-            first_book = soup.select_one('.book-item a')
+            first_book = parse_html(response.text).select_one('.book-item a')
             
-            if first_book:
+            if first_book is not None:
                 detail_url = first_book.get('href')
                 if detail_url:
-                    detail_url = response.urljoin(detail_url)
+                    detail_url = urljoin(response.url, detail_url)
                     
                     request_kwargs = {
                         "url": detail_url,
@@ -204,10 +239,11 @@ class FanQieDetailSpider(feapder.AirSpider):
                     
                     yield Request(**request_kwargs)
         except Exception as e:
-            pass
+            ERRORS.labels("fanqie_detail", "parse_search_page").inc()
     
+    @track_callback("fanqie_detail")
     def parse_detail_page(self, request, response):
-        """解析详情页 - 提取完整信息（使用 BeautifulSoup）"""
+        """解析详情页 - 提取完整信息"""
         try:
             # 提取书籍ID
             book_id = None
@@ -215,75 +251,18 @@ class FanQieDetailSpider(feapder.AirSpider):
             if match:
                 book_id = match.group(1)
             
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # 提取详细信息
-            # 书名
-            title_tag = soup.select_one('.info-name h1')
-            title = title_tag.get_text(strip=True) if title_tag else None
-            if not title:
-                title_tag = soup.select_one('.book-title')
-                title = title_tag.get_text(strip=True) if title_tag else None
-            
-            # 作者
-            author_tag = soup.select_one('.author-name-text')
-            author = author_tag.get_text(strip=True) if author_tag else None
-            if not author:
-                author_tag = soup.select_one('.author')
-                author = author_tag.get_text(strip=True) if author_tag else None
-            
-            # 分类
-            category_tag = soup.select_one('.category')
-            category = category_tag.get_text(strip=True) if category_tag else None
-            if not category:
-                category_tag = soup.select_one('.tag')
-                category = category_tag.get_text(strip=True) if category_tag else None
-            
-            # 状态
-            status_tag = soup.select_one('.status')
-            status = status_tag.get_text(strip=True) if status_tag else None
-            if not status:
-                status_tag = soup.select_one('.book-status')
-                status = status_tag.get_text(strip=True) if status_tag else None
-            
-            # 简介
-            desc_tag = soup.select_one('.page-abstract-content')
-            description = desc_tag.get_text(strip=True) if desc_tag else None
-            if not description:
-                desc_tag = soup.select_one('.book-intro')
-                description = desc_tag.get_text(strip=True) if desc_tag else None
-            
-            # 字数
-            word_count = None
-            word_tags = soup.find_all('span', string=re.compile('字数'))
-            if word_tags:
-                word_parent = word_tags[0].parent
-                word_count_tag = word_parent.find_next_sibling('span')
-                word_count = word_count_tag.get_text(strip=True) if word_count_tag else None
-            
-            # 章节数
-            chapter_count = None
-            chapter_tags = soup.find_all('span', string=re.compile('章节'))
-            if chapter_tags:
-                chapter_parent = chapter_tags[0].parent
-                chapter_count_tag = chapter_parent.find_next_sibling('span')
-                chapter_count = chapter_count_tag.get_text(strip=True) if chapter_count_tag else None
-            
-            # 封面图
-            cover_tag = soup.select_one('img.book-cover')
-            cover_image = cover_tag.get('src') if cover_tag else None
-            if not cover_image:
-                cover_tag = soup.select_one('.cover img')
-                cover_image = cover_tag.get('src') if cover_tag else None
-            
-            # 最新章节
-            latest_tag = soup.select_one('.latest-chapter a')
-            latest_chapter = latest_tag.get_text(strip=True) if latest_tag else None
-            
-            # 更新时间
-            update_tag = soup.select_one('.update-time')
-            update_time = update_tag.get_text(strip=True) if update_tag else None
+            detail = extract_book_detail(response.text)
+            title = detail['title']
+            author = detail['author']
+            category = detail['category']
+            status = detail['status']
+            description = detail['description']
+            word_count = detail['word_count']
+            chapter_count = detail['chapter_count']
+            cover_image = detail['cover_image']
+            latest_chapter = detail['latest_chapter']
+            update_time = detail['update_time']
             
             # 构造书籍数据
             book_data = {
@@ -302,19 +281,24 @@ class FanQieDetailSpider(feapder.AirSpider):
             }
             
             self.results.append(book_data)
+            BOOKS.labels("fanqie_detail").inc()
             
             # 保存到数据库
             if self.use_mysql:
                 try:
-                    result = MySQLPool.save_fanqie_book_detail(book_data)
-                    if result['success'] and book_data['作者']:
-                        # 同时保存作者信息
-                        MySQLPool.save_fanqie_author(book_data['作者'], book_data['书籍ID'])
+                    # 详情和作者信息在同一个事务中提交
+                    with MySQLPool.session():
+                        result = MySQLPool.save_fanqie_book_detail(book_data)
+                        if result['success'] and book_data['作者']:
+                            # 同时保存作者信息
+                            MySQLPool.save_fanqie_author(book_data['作者'], book_data['书籍ID'])
+                    if result['success']:
+                        SAVED.labels("fanqie_detail").inc()
                 except Exception as e:
-                    pass
+                    ERRORS.labels("fanqie_detail", "save").inc()
         
         except Exception as e:
-            pass
+            ERRORS.labels("fanqie_detail", "parse_detail_page").inc()
 
 
 class FanQieAuthorSpider(feapder.AirSpider):
@@ -347,7 +331,7 @@ class FanQieAuthorSpider(feapder.AirSpider):
     
     def start_requests(self):
         """生成初始请求 - 搜索作者"""
-        search_url = f"https://fanqienovel.com/search/{self.author_name}"
+        search_url = f"{BASE_URL}/search/{self.author_name}"
         
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -369,69 +353,56 @@ class FanQieAuthorSpider(feapder.AirSpider):
         
         yield Request(**request_kwargs)
     
+    @track_callback("fanqie_author")
     def parse_search_page(self, request, response):
-        """解析搜索页面 - 提取该作者的所有书籍（使用 BeautifulSoup）"""
+        """解析搜索页面 - 提取该作者的所有书籍"""
         try:
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # 提取书籍列表
-            book_items = soup.select('.book-item')
-            
-            for item in book_items:
+            for item in extract_book_items(response.text):
                 if self.crawled_count >= self.max_books:
                     return
                 
-                # 提取书名
-                title_tag = item.select_one('h3')
-                if not title_tag:
-                    title_tag = item.select_one('.title')
-                title = title_tag.get_text(strip=True) if title_tag else None
-                
-                # 提取作者（验证是否匹配）
-                author_tag = item.select_one('.author')
-                author = author_tag.get_text(strip=True) if author_tag else None
+                title = item['title']
+                author = item['author']  # 作者（验证是否匹配）
                 
                 # 只保存匹配作者的书籍
                 if author and self.author_name in author:
-                    # 提取书籍ID
-                    link_tag = item.select_one('a')
-                    detail_url = link_tag.get('href') if link_tag else None
-                    book_id = None
-                    if detail_url:
-                        match = re.search(r'/page/(\d+)', detail_url)
-                        if match:
-                            book_id = match.group(1)
+                    book_id = item['book_id']
+                    detail_url = item['href']
                     
                     if title and book_id:
                         book_data = {
                             "书名": title,
                             "书籍ID": book_id,
                             "作者": author,
-                            "详情页URL": response.urljoin(detail_url) if detail_url else ""
+                            "详情页URL": urljoin(response.url, detail_url) if detail_url else ""
                         }
                         
                         self.results.append(book_data)
                         self.crawled_count += 1
+                        BOOKS.labels("fanqie_author").inc()
                         
                         # 保存到数据库
                         if self.use_mysql:
                             try:
-                                MySQLPool.save_fanqie_author_book(author, book_id, title)
+                                if MySQLPool.save_fanqie_author_book(author, book_id, title).get('success'):
+                                    SAVED.labels("fanqie_author").inc()
                             except Exception as e:
-                                pass
+                                ERRORS.labels("fanqie_author", "save").inc()
         
         except Exception as e:
-            pass
+            ERRORS.labels("fanqie_author", "parse_search_page").inc()
 
 
 # 运行函数
-def run_recommend_spider(use_mysql: bool = True, max_books: int = 50, proxy: Optional[str] = None) -> Dict:
+def run_recommend_spider(use_mysql: bool = True, max_books: int = 50, proxy: Optional[str] = None,
+                         on_spider: Optional[Callable] = None) -> Dict:
     """
     运行推荐列表爬虫
     :param use_mysql: 是否使用 MySQL 存储
     :param max_books: 最大爬取数量
     :param proxy: 代理地址
+    :param on_spider: 爬虫创建后的回调（用于在运行期间读取实时进度）
     :return: 书籍列表
     """
     import threading
@@ -446,9 +417,13 @@ def run_recommend_spider(use_mysql: bool = True, max_books: int = 50, proxy: Opt
             proxy=proxy
         )
         
+        if on_spider:
+            on_spider(spider)
+        
         def run_spider_thread():
             try:
                 spider.start()
+                spider.join()  # Python 3.12 以下 start() 立即返回，需等待爬虫主循环结束
             except Exception as e:
                 pass
         
@@ -471,13 +446,15 @@ def run_recommend_spider(use_mysql: bool = True, max_books: int = 50, proxy: Opt
 
 
 def run_detail_spider(book_name: Optional[str] = None, book_id: Optional[str] = None, 
-                     use_mysql: bool = True, proxy: Optional[str] = None) -> Dict:
+                     use_mysql: bool = True, proxy: Optional[str] = None,
+                     on_spider: Optional[Callable] = None) -> Dict:
     """
     运行详情爬虫
     :param book_name: 书名
     :param book_id: 书籍ID
     :param use_mysql: 是否使用 MySQL 存储
     :param proxy: 代理地址
+    :param on_spider: 爬虫创建后的回调（用于在运行期间读取实时进度）
     :return: 书籍详情
     """
     import threading
@@ -493,9 +470,13 @@ def run_detail_spider(book_name: Optional[str] = None, book_id: Optional[str] =
             proxy=proxy
         )
         
+        if on_spider:
+            on_spider(spider)
+        
         def run_spider_thread():
             try:
                 spider.start()
+                spider.join()  # Python 3.12 以下 start() 立即返回，需等待爬虫主循环结束
             except Exception as e:
                 pass
         
@@ -518,13 +499,14 @@ def run_detail_spider(book_name: Optional[str] = None, book_id: Optional[str] =
 
 
 def run_author_spider(author_name: str, use_mysql: bool = True, max_books: int = 50, 
-                     proxy: Optional[str] = None) -> Dict:
+                     proxy: Optional[str] = None, on_spider: Optional[Callable] = None) -> Dict:
     """
     运行作者爬虫
     :param author_name: 作者名
     :param use_mysql: 是否使用 MySQL 存储
     :param max_books: 最大爬取数量
     :param proxy: 代理地址
+    :param on_spider: 爬虫创建后的回调（用于在运行期间读取实时进度）
     :return: 作者的书籍列表
     """
     import threading
@@ -540,9 +522,13 @@ def run_author_spider(author_name: str, use_mysql: bool = True, max_books: int =
             proxy=proxy
         )
         
+        if on_spider:
+            on_spider(spider)
+        
         def run_spider_thread():
             try:
                 spider.start()
+                spider.join()  # Python 3.12 以下 start() 立即返回，需等待爬虫主循环结束
             except Exception as e:
                 pass
         
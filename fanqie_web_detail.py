@@ -1,10 +1,244 @@
 """
 番茄小说详情页解析工具
-使用 BeautifulSoup 解析 HTML
+使用 lxml 解析 HTML（不可用时退回 BeautifulSoup，见 html_parsing）
 """
 
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from crawl_metrics import FETCH_SECONDS, PAGES
+from html_parsing import parse_html
+
+try:
+    import brotli  # noqa: F401  # 安装了 brotli 时 urllib3 才能解压 br 编码的响应
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def load_char_map(path):
+    """
+    从 JSON 文件加载字符映射（站点更新字体后只需替换映射文件，不用改代码）
+    文件内容为 {"58670": "0", ...}，键可以是十进制码点，也可以是字符本身
+    :param path: 映射文件路径
+    :return: 字符映射字典（键为十进制码点字符串）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        (key if key.isdigit() else str(ord(key))): value
+        for key, value in data.items()
+    }
+
+
+def build_translate_table(char_map):
+    """
+    将字符映射编译为 str.translate 使用的码点转换表
+    使用按码点下标访问的列表而不是字典（未映射的码点映射为自身，超出列表范围的字符保持不变），
+    对非 ASCII 文本比字典查找快一倍以上
+    :param char_map: 字符映射字典（键为十进制码点字符串）
+    :return: 转换表（列表，下标为码点）
+    """
+    mapping = {int(code): value for code, value in char_map.items()}
+    table = list(range(max(mapping) + 1 if mapping else 0))
+    for code, value in mapping.items():
+        table[code] = value
+    return table
+
+
+class RateLimiter:
+    """简单的速率限制器（线程安全）：保证相邻两次请求的间隔不小于 1/rate 秒"""
+    
+    def __init__(self, rate):
+        """
+        初始化
+        :param rate: 每秒最多请求次数
+        """
+        self.interval = 1.0 / rate
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """等待直到允许发出下一次请求"""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class ChapterCheckpoint:
+    """
+    整本书下载的断点记录
+    章节内容按完成顺序追加到 chapters.part，每完成一章向 manifest.jsonl 追加一行
+    （章节序号、URL、在 part 文件中的偏移、长度、sha256），重新下载时跳过已完成的章节
+    """
+    
+    MANIFEST_NAME = 'manifest.jsonl'
+    PART_NAME = 'chapters.part'
+    
+    def __init__(self, work_dir):
+        """
+        初始化（读取已有的断点记录）
+        :param work_dir: 断点目录（通常为 保存路径 + '.parts'）
+        """
+        self.work_dir = work_dir
+        self.manifest_path = os.path.join(work_dir, self.MANIFEST_NAME)
+        self.part_path = os.path.join(work_dir, self.PART_NAME)
+        self.book = None  # 书籍信息（第一次下载时记录）
+        self.chapters = {}  # 章节序号 -> 记录
+        self._manifest = None
+        self._part = None
+        self._load()
+    
+    def _load(self):
+        """读取 manifest（忽略中断时写了一半的最后一行，以及内容不完整的记录）"""
+        if not os.path.exists(self.manifest_path):
+            return
+        part_size = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') == 'book':
+                    self.book = record
+                elif record.get('type') == 'chapter' and record['offset'] + record['length'] <= part_size:
+                    self.chapters[record['index']] = record
+    
+    def open(self, book_info):
+        """
+        打开断点文件准备追加（首次下载时写入书籍信息）
+        :param book_info: 书籍信息
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._manifest = open(self.manifest_path, 'a', encoding='utf-8')
+        if self._manifest.tell() > 0:
+            # 上次中断时最后一行可能没写完，先换行，避免新记录接在半行后面
+            with open(self.manifest_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._manifest.write('\n')
+        self._part = open(self.part_path, 'ab')
+        if self.book is None:
+            self.book = {
+                'type': 'book',
+                'name': book_info['name'],
+                'author': book_info['author'],
+                'labels': book_info['labels']
+            }
+            self._append(self.book)
+    
+    def close(self):
+        """关闭断点文件"""
+        for f in (self._manifest, self._part):
+            if f:
+                f.close()
+        self._manifest = self._part = None
+    
+    def is_done(self, index, chapter):
+        """
+        章节是否已下载（序号和 URL 都一致才算，避免章节列表变化后错位）
+        :param index: 章节序号（从 1 开始）
+        :param chapter: 章节信息
+        :return: 是否已下载
+        """
+        record = self.chapters.get(index)
+        return record is not None and record['url'] == chapter['url']
+    
+    def add(self, index, chapter, content):
+        """
+        记录一章下载结果：先追加内容，再追加 manifest 行
+        :param index: 章节序号
+        :param chapter: 章节信息
+        :param content: 章节内容（可以为空字符串）
+        """
+        data = content.encode('utf-8')
+        self._part.seek(0, os.SEEK_END)
+        offset = self._part.tell()
+        self._part.write(data)
+        self._part.flush()
+        
+        record = {
+            'type': 'chapter',
+            'index': index,
+            'title': chapter['title'],
+            'url': chapter['url'],
+            'offset': offset,
+            'length': len(data),
+            'sha256': hashlib.sha256(data).hexdigest()
+        }
+        self._append(record)
+        self.chapters[index] = record
+    
+    def _append(self, record):
+        """追加一行 manifest 并刷新到磁盘"""
+        self._manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+    
+    def read(self, index):
+        """
+        读取已下载章节的内容（校验 sha256）
+        :param index: 章节序号
+        :return: 章节内容（内容为空的章节为空字符串），校验失败时返回 None
+        """
+        record = self.chapters[index]
+        with open(self.part_path, 'rb') as f:
+            f.seek(record['offset'])
+            data = f.read(record['length'])
+        if hashlib.sha256(data).hexdigest() != record['sha256']:
+            return None
+        return data.decode('utf-8')
+    
+    def assemble(self, save_path, chapters):
+        """
+        按章节顺序拼接出最终的文本文件（先写临时文件再替换，避免留下半个文件）
+        :param save_path: 保存路径
+        :param chapters: 章节列表（决定顺序和标题）
+        :return: 缺失或校验失败的章节序号列表
+        """
+        missing = []
+        tmp_path = save_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"书名: {self.book['name']}\n")
+            f.write(f"作者: {self.book['author']}\n")
+            f.write(f"标签: {', '.join(self.book['labels'])}\n")
+            f.write("=" * 50 + "\n\n")
+            
+            for index, chapter in enumerate(chapters, 1):
+                content = self.read(index) if self.is_done(index, chapter) else None
+                if content is None:
+                    missing.append(index)
+                    self.chapters.pop(index, None)  # 校验失败的章节下次重新下载
+                    continue
+                f.write(f"\n\n{'=' * 50}\n")
+                f.write(f"第 {index} 章: {chapter['title']}\n")
+                f.write(f"{'=' * 50}\n\n")
+                f.write(content)
+        os.replace(tmp_path, save_path)
+        return missing
+    
+    def remove(self):
+        """删除断点目录（全部章节下载完成后调用）"""
+        self.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
 
 
 class FanQieWebDetail:
@@ -87,14 +321,87 @@ class FanQieWebDetail:
         '58591': '条', '58682': '呢'
     }
     
-    def __init__(self, headers=None):
+    # 自定义映射文件路径的环境变量（未传入 char_map 时生效）
+    CHAR_MAP_ENV = 'FANQIE_CHAR_MAP'
+    
+    _default_translate_table = None  # 内置 CHAR_MAP 编译后的转换表
+    
+    # 站点地址（章节链接为相对路径，拼接该地址；压测时可指向本地模拟服务器）
+    BASE_URL = 'https://fanqienovel.com'
+    
+    def __init__(self, headers=None, pool_size=10, retries=3, backoff_factor=0.5, timeout=30, rate_limit=None,
+                 char_map=None):
         """
         初始化
         :param headers: 请求头
+        :param pool_size: 连接池大小（每个域名保持的长连接数量）
+        :param retries: 连接失败或返回 429/5xx 时的重试次数
+        :param backoff_factor: 重试退避系数（第 n 次重试前等待 backoff_factor * 2^(n-1) 秒）
+        :param timeout: 请求超时（秒）
+        :param rate_limit: 每个域名每秒最多请求次数（为空则不限速）
+        :param char_map: 额外的字符映射（字典或 JSON 文件路径），覆盖内置 CHAR_MAP 中的同名项；
+                         为空时读取环境变量 FANQIE_CHAR_MAP 指定的文件
         """
         self.headers = headers or {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
         }
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self._rate_limiters = {}  # 域名 -> RateLimiter
+        self._rate_lock = threading.Lock()
+        
+        # 字符映射编译为码点转换表，解码只需一次 str.translate
+        char_map = char_map or os.environ.get(self.CHAR_MAP_ENV)
+        if isinstance(char_map, str):
+            char_map = load_char_map(char_map)
+        if char_map:
+            self.char_map = {**self.CHAR_MAP, **char_map}
+            self.translate_table = build_translate_table(self.char_map)
+        else:
+            # 内置映射的转换表在所有实例间共享，只编译一次
+            if FanQieWebDetail._default_translate_table is None:
+                FanQieWebDetail._default_translate_table = build_translate_table(self.CHAR_MAP)
+            self.char_map = self.CHAR_MAP
+            self.translate_table = FanQieWebDetail._default_translate_table
+        
+        # 复用同一个 Session：所有章节共用少量长连接，避免每个请求重新握手
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': ACCEPT_ENCODING})
+        self.session.headers.update(self.headers)
+    
+    def close(self):
+        """关闭会话，释放连接池中的连接"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def fetch(self, url):
+        """
+        通过会话请求页面
+        :param url: 页面URL
+        :return: 页面 HTML
+        """
+        if self.rate_limit:
+            self._get_rate_limiter(url).wait()
+        response = self.session.get(url=url, timeout=self.timeout)
+        FETCH_SECONDS.labels('fanqie_web', 'fetch').observe(response.elapsed.total_seconds())
+        PAGES.labels('fanqie_web', 'fetch').inc()
+        response.encoding = 'utf-8'
+        return response.text
     
     def decode_content(self, content):
         """
@@ -102,14 +409,20 @@ class FanQieWebDetail:
         :param content: 原始内容
         :return: 解码后的内容
         """
-        decoded = []
-        for char in content:
-            char_code = str(ord(char))
-            if char_code in self.CHAR_MAP:
-                decoded.append(self.CHAR_MAP[char_code])
-            else:
-                decoded.append(char)
-        return ''.join(decoded)
+        return content.translate(self.translate_table)
+    
+    def _get_rate_limiter(self, url):
+        """
+        获取 URL 所属域名的速率限制器
+        :param url: 页面URL
+        :return: RateLimiter
+        """
+        host = urlsplit(url).netloc
+        with self._rate_lock:
+            limiter = self._rate_limiters.get(host)
+            if limiter is None:
+                limiter = self._rate_limiters[host] = RateLimiter(self.rate_limit)
+            return limiter
     
     def get_book_info(self, url):
         """
@@ -118,48 +431,48 @@ class FanQieWebDetail:
         :return: 书籍信息字典
         """
         try:
-            response = requests.get(url=url, headers=self.headers, timeout=30)
-            response.encoding = 'utf-8'
-            html = response.text
-            
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # 书名
-            name_tag = soup.select_one('.info-name h1')
-            name = name_tag.get_text(strip=True) if name_tag else ''
-            
-            # 作者
-            author_tag = soup.select_one('.author-name-text')
-            author = author_tag.get_text(strip=True) if author_tag else ''
-            
-            # 标签信息
-            label_tags = soup.select('.info-label span')
-            labels = [tag.get_text(strip=True) for tag in label_tags]
-            
-            # 章节列表
-            chapter_tags = soup.select('.chapter-item-title')
-            chapters = []
-            for tag in chapter_tags:
-                chapter_title = tag.get_text(strip=True)
-                chapter_href = tag.get('href', '')
-                if chapter_href:
-                    chapters.append({
-                        'title': chapter_title,
-                        'url': 'https://fanqienovel.com' + chapter_href
-                    })
-            
-            return {
-                'name': name,
-                'author': author,
-                'labels': labels,
-                'chapters': chapters
-            }
+            return self.parse_book_info(self.fetch(url))
         
         except Exception as e:
             print(f"获取书籍信息失败: {e}")
             return None
     
+    def parse_book_info(self, html, backend=None):
+        """
+        解析书籍详情页
+        :param html: 页面 HTML
+        :param backend: 解析后端（为空时优先 lxml）
+        :return: 书籍信息字典
+        """
+        doc = parse_html(html, backend)
+        
+        # 书名
+        name = doc.first_text('.info-name h1') or ''
+        
+        # 作者
+        author = doc.first_text('.author-name-text') or ''
+        
+        # 标签信息
+        labels = [tag.text() for tag in doc.select('.info-label span')]
+        
+        # 章节列表
+        chapters = []
+        for tag in doc.select('.chapter-item-title'):
+            chapter_title = tag.text()
+            chapter_href = tag.get('href', '')
+            if chapter_href:
+                chapters.append({
+                    'title': chapter_title,
+                    'url': self.BASE_URL + chapter_href
+                })
+        
+        return {
+            'name': name,
+            'author': author,
+            'labels': labels,
+            'chapters': chapters
+        }
+    
     def get_chapter_content(self, chapter_url):
         """
         获取章节内容
@@ -167,35 +480,40 @@ class FanQieWebDetail:
         :return: 解码后的章节内容
         """
         try:
-            response = requests.get(url=chapter_url, headers=self.headers, timeout=30)
-            response.encoding = 'utf-8'
-            html = response.text
-            
-            # 使用 BeautifulSoup 解析
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # 提取小说内容
-            content_tags = soup.select('.muye-reader-content-16 p')
-            content_list = [tag.get_text(strip=True) for tag in content_tags]
-            
-            # 合并内容
-            raw_content = '\n'.join(content_list)
-            
-            # 解码内容
-            decoded_content = self.decode_content(raw_content)
-            
-            return decoded_content
+            return self.parse_chapter_content(self.fetch(chapter_url))
         
         except Exception as e:
             print(f"获取章节内容失败: {e}")
             return None
     
-    def download_book(self, book_url, save_path=None):
+    def parse_chapter_content(self, html, backend=None):
+        """
+        解析章节页
+        :param html: 页面 HTML
+        :param backend: 解析后端（为空时优先 lxml）
+        :return: 解码后的章节内容
+        """
+        # 提取小说内容
+        content_tags = parse_html(html, backend).select('.muye-reader-content-16 p')
+        content_list = [tag.text() for tag in content_tags]
+        
+        # 合并内容
+        raw_content = '\n'.join(content_list)
+        
+        # 解码内容
+        return self.decode_content(raw_content)
+    
+    def download_book(self, book_url, save_path=None, concurrency=4, on_progress=None, keep_parts=False):
         """
-        下载整本书
+        下载整本书（多线程并发下载章节，支持断点续传）
+        已完成的章节记录在 保存路径 + '.parts' 目录中，中断后重新调用会跳过这些章节，
+        全部下载完成后按原章节顺序拼接出最终文件
         :param book_url: 书籍详情页URL
         :param save_path: 保存路径（可选）
-        :return: 是否成功
+        :param concurrency: 同时下载的章节数（1 表示逐章下载；超过连接池大小的部分会等待空闲连接）
+        :param on_progress: 进度回调 on_progress(已完成章节数, 总章节数, 章节信息, 是否成功)（内容为空的章节也算成功）
+        :param keep_parts: 全部完成后是否保留断点目录
+        :return: 是否全部章节下载成功（有缺失章节时为 False，文件中只有已下载的章节，重新调用可继续下载）
         """
         # 获取书籍信息
         book_info = self.get_book_info(book_url)
@@ -213,33 +531,62 @@ class FanQieWebDetail:
         if not save_path:
             save_path = f"{book_info['name']}.txt"
         
-        # 下载所有章节
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(f"书名: {book_info['name']}\n")
-            f.write(f"作者: {book_info['author']}\n")
-            f.write(f"标签: {', '.join(book_info['labels'])}\n")
-            f.write("=" * 50 + "\n\n")
-            
-            for i, chapter in enumerate(book_info['chapters'], 1):
-                print(f"正在下载第 {i}/{len(book_info['chapters'])} 章: {chapter['title']}")
-                
-                content = self.get_chapter_content(chapter['url'])
-                if content:
-                    f.write(f"\n\n{'=' * 50}\n")
-                    f.write(f"第 {i} 章: {chapter['title']}\n")
-                    f.write(f"{'=' * 50}\n\n")
-                    f.write(content)
-                else:
-                    print(f"  下载失败: {chapter['title']}")
+        chapters = book_info['chapters']
+        total = len(chapters)
+        checkpoint = ChapterCheckpoint(save_path + '.parts')
+        pending = [(i, chapter) for i, chapter in enumerate(chapters, 1) if not checkpoint.is_done(i, chapter)]
+        done_count = total - len(pending)
+        if done_count:
+            print(f"断点续传：已下载 {done_count} 章，剩余 {len(pending)} 章")
         
+        # 下载缺失的章节（完成一章记录一章）
+        checkpoint.open(book_info)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="chapter") as executor:
+                futures = {
+                    executor.submit(self.get_chapter_content, chapter['url']): (i, chapter)
+                    for i, chapter in pending
+                }
+                for future in as_completed(futures):
+                    i, chapter = futures[future]
+                    content = future.result()
+                    done_count += 1
+                    
+                    print(f"已下载 {done_count}/{total} 章: 第 {i} 章 {chapter['title']}")
+                    # None 表示获取失败；空字符串是内容为空的章节，照常记录（长度为 0），续传时不再重新下载
+                    if content is not None:
+                        checkpoint.add(i, chapter, content)
+                    else:
+                        print(f"  下载失败: {chapter['title']}")
+                    if on_progress:
+                        on_progress(done_count, total, chapter, content is not None)
+        finally:
+            checkpoint.close()
+        
+        # 按原顺序拼接
+        missing = checkpoint.assemble(save_path, chapters)
+        if missing:
+            print(f"\n有 {len(missing)} 章未下载成功，重新运行可继续下载缺失章节")
+            return False
+        
+        if not keep_parts:
+            checkpoint.remove()
         print(f"\n下载完成！保存到: {save_path}")
         return True
 
 
 def main():
     """主函数 - 示例用法"""
-    # 创建解析器实例
-    parser = FanQieWebDetail()
+    # 创建解析器实例（复用连接池，退出时关闭）
+    with FanQieWebDetail() as parser:
+        run_demo(parser)
+
+
+def run_demo(parser):
+    """
+    示例流程：获取书籍信息并可选下载整本书
+    :param parser: 解析器实例
+    """
     
     # 示例：获取书籍信息
     book_url = "https://fanqienovel.com/page/7276384138653862966"
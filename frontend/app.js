@@ -78,6 +78,34 @@ createApp({
             window.location.href = 'home.html';
         },
         
+        /**
+         * 从数据库获取图书（/api/books 按游标分页，每页最多 100 本，依次请求直到没有下一页）
+         * @param {string} keyword 关键词（为空表示全部）
+         * @returns {Promise<{keyword: string, books: Array}>}
+         */
+        async fetchAllBooks(keyword) {
+            const books = [];
+            let resultKeyword = keyword || '全部';
+            let cursor = null;
+            do {
+                const params = { limit: 100 };
+                if (keyword) {
+                    params.keyword = keyword;
+                }
+                if (cursor) {
+                    params.cursor = cursor;
+                }
+                const response = await axios.get(`${API_BASE_URL}/api/books`, { params });
+                if (!response.data.success) {
+                    throw new Error('后端返回失败');
+                }
+                books.push(...response.data.books);
+                resultKeyword = response.data.keyword;
+                cursor = response.data.next_cursor;
+            } while (cursor);
+            return { keyword: resultKeyword, books };
+        },
+        
         /**
          * 检查后端是否在线
          */
@@ -254,20 +282,17 @@ createApp({
                     console.log(`🔄 正在从数据库获取所有相关数据...`);
                     
                     try {
-                        const dbResponse = await axios.get(`${API_BASE_URL}/api/books?keyword=${encodeURIComponent(this.keyword.trim())}`);
+                        const dbResult = await this.fetchAllBooks(this.keyword.trim());
+                        this.books = dbResult.books;
+                        this.currentKeyword = this.keyword.trim();
+                        this.searched = true;
+                        this.dataSource = `爬取并保存 (爬取${crawlData.total_crawled}本, 新增${crawlData.total_saved}本, 去重${crawlData.total_duplicates}本)`;
+                        this.currentPage = 1;
                         
-                        if (dbResponse.data.success) {
-                            this.books = dbResponse.data.books;
-                            this.currentKeyword = this.keyword.trim();
-                            this.searched = true;
-                            this.dataSource = `爬取并保存 (爬取${crawlData.total_crawled}本, 新增${crawlData.total_saved}本, 去重${crawlData.total_duplicates}本)`;
-                            this.currentPage = 1;
-                            
-                            if (this.books.length === 0) {
-                                this.error = '没有找到相关图书，请尝试其他关键词';
-                            } else {
-                                console.log(`✅ 从数据库获取到 ${this.books.length} 本图书`);
-                            }
+                        if (this.books.length === 0) {
+                            this.error = '没有找到相关图书，请尝试其他关键词';
+                        } else {
+                            console.log(`✅ 从数据库获取到 ${this.books.length} 本图书`);
                         }
                     } catch (dbErr) {
                         console.error('从数据库获取数据失败:', dbErr);
@@ -341,30 +366,20 @@ createApp({
             this.dataSource = '';
             
             try {
-                // 构建请求 URL
-                let url = `${API_BASE_URL}/api/books`;
-                if (this.keyword.trim()) {
-                    url += `?keyword=${encodeURIComponent(this.keyword.trim())}`;
-                }
-                
-                // 调用后端展示 API
-                const response = await axios.get(url);
+                // 调用后端展示 API（逐页获取全部数据）
+                const result = await this.fetchAllBooks(this.keyword.trim());
                 
                 // 处理响应
-                if (response.data.success) {
-                    this.books = response.data.books;
-                    this.currentKeyword = response.data.keyword;
-                    this.searched = true;
-                    this.dataSource = '数据库';
-                    this.currentPage = 1; // 重置到第一页
-                    
-                    if (this.books.length === 0) {
-                        this.error = this.keyword.trim() 
-                            ? '数据库中没有该关键词的图书，请先爬取数据' 
-                            : '数据库中暂无数据，请先爬取图书';
-                    }
-                } else {
-                    this.error = '获取数据失败，请重试';
+                this.books = result.books;
+                this.currentKeyword = result.keyword;
+                this.searched = true;
+                this.dataSource = '数据库';
+                this.currentPage = 1; // 重置到第一页
+                
+                if (this.books.length === 0) {
+                    this.error = this.keyword.trim() 
+                        ? '数据库中没有该关键词的图书，请先爬取数据' 
+                        : '数据库中暂无数据，请先爬取图书';
                 }
                 
             } catch (err) {
@@ -0,0 +1,279 @@
+"""
+HTML 解析模块
+基于 lxml 的共享解析层：CSS 选择器编译一次后缓存复用，
+lxml（或 cssselect）不可用、或 lxml 无法解析文档时退回 BeautifulSoup；
+另提供声明式的 XPath 字段提取器（预编译 + 命中统计）
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    from lxml.html import HTMLParser
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+
+# 解析后端
+BACKEND_LXML = "lxml"
+BACKEND_BS4 = "bs4"
+
+if HAS_LXML:
+    _HTML_PARSER = HTMLParser(encoding='utf-8')
+    # 只有一段文本且包含指定文字的标签（对应 bs4 的 find_all(tag, string=re.compile(label))）
+    _LABEL_XPATH = etree.XPath("//*[local-name() = $tag and count(text()) = 1 and not(*) and contains(text(), $label)]")
+    _NEXT_SIBLING_XPATH = etree.XPath("following-sibling::*[local-name() = $tag][1]")
+
+
+@lru_cache(maxsize=256)
+def compile_css(selector: str):
+    """
+    编译 CSS 选择器（结果缓存，同一选择器只编译一次）
+    :param selector: CSS 选择器
+    :return: lxml CSSSelector
+    """
+    return CSSSelector(selector)
+
+
+class HtmlNode:
+    """解析结果节点（统一 lxml 与 bs4 两种后端的常用操作）"""
+
+    __slots__ = ('_node', 'backend')
+
+    def __init__(self, node, backend: str):
+        self._node = node
+        self.backend = backend
+
+    def select(self, selector: str) -> List['HtmlNode']:
+        """
+        按 CSS 选择器查找全部匹配的子孙节点
+        :param selector: CSS 选择器
+        :return: 节点列表
+        """
+        if self.backend == BACKEND_LXML:
+            nodes = compile_css(selector)(self._node)
+        else:
+            nodes = self._node.select(selector)
+        return [HtmlNode(node, self.backend) for node in nodes]
+
+    def select_one(self, selector: str) -> Optional['HtmlNode']:
+        """
+        按 CSS 选择器查找第一个匹配的子孙节点
+        :param selector: CSS 选择器
+        :return: 节点，未找到时返回 None
+        """
+        if self.backend == BACKEND_LXML:
+            nodes = compile_css(selector)(self._node)
+            return HtmlNode(nodes[0], self.backend) if nodes else None
+        node = self._node.select_one(selector)
+        return HtmlNode(node, self.backend) if node is not None else None
+
+    def first_text(self, *selectors: str) -> Optional[str]:
+        """
+        依次尝试多个选择器，返回第一个非空文本
+        :param selectors: CSS 选择器（按优先级排列）
+        :return: 文本，全部未命中时返回 None
+        """
+        for selector in selectors:
+            node = self.select_one(selector)
+            text = node.text() if node is not None else None
+            if text:
+                return text
+        return None
+
+    def first_attr(self, name: str, *selectors: str) -> Optional[str]:
+        """
+        依次尝试多个选择器，返回第一个非空属性值
+        :param name: 属性名
+        :param selectors: CSS 选择器（按优先级排列）
+        :return: 属性值，全部未命中时返回 None
+        """
+        for selector in selectors:
+            node = self.select_one(selector)
+            value = node.get(name) if node is not None else None
+            if value:
+                return value
+        return None
+
+    def text(self) -> str:
+        """
+        节点文本（各段文本去除首尾空白后拼接，与 bs4 的 get_text(strip=True) 一致）
+        :return: 文本
+        """
+        if self.backend == BACKEND_LXML:
+            return ''.join(part.strip() for part in self._node.itertext())
+        return self._node.get_text(strip=True)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        读取属性
+        :param name: 属性名
+        :param default: 默认值
+        :return: 属性值
+        """
+        return self._node.get(name, default)
+
+    def labeled_value(self, tag: str, label: str) -> Optional[str]:
+        """
+        查找"标签 + 值"结构中的值：找到第一个文本包含 label 的 tag 节点，
+        取其父节点之后的第一个同类兄弟节点的文本（如 <div><span>字数</span></div><span>120万</span>）
+        :param tag: 标签名
+        :param label: 标签文字
+        :return: 值文本，未找到时返回 None
+        """
+        if self.backend == BACKEND_LXML:
+            labels = _LABEL_XPATH(self._node, tag=tag, label=label)
+            if not labels:
+                return None
+            parent = labels[0].getparent()
+            siblings = _NEXT_SIBLING_XPATH(parent, tag=tag) if parent is not None else []
+            return HtmlNode(siblings[0], self.backend).text() if siblings else None
+
+        labels = self._node.find_all(tag, string=re.compile(re.escape(label)))
+        if not labels:
+            return None
+        sibling = labels[0].parent.find_next_sibling(tag)
+        return sibling.get_text(strip=True) if sibling else None
+
+
+def parse_html(html: str, backend: Optional[str] = None) -> HtmlNode:
+    """
+    解析 HTML 文档
+    :param html: HTML 文本
+    :param backend: 指定解析后端（lxml / bs4），为空时优先使用 lxml
+    :return: 文档根节点
+    """
+    if backend != BACKEND_BS4 and HAS_LXML and html:
+        try:
+            root = etree.fromstring(html.encode('utf-8'), _HTML_PARSER)
+            if root is not None:
+                return HtmlNode(root, BACKEND_LXML)
+        except (etree.LxmlError, ValueError):
+            pass
+    return HtmlNode(BeautifulSoup(html or '', 'html.parser'), BACKEND_BS4)
+
+
+def strip_text(value: str) -> str:
+    """默认的字段规整函数：去除首尾空白"""
+    return value.strip()
+
+
+class XPathExtractor:
+    """
+    声明式字段提取器
+    每个字段对应按优先级排列的若干 XPath（初始化时编译为 lxml.etree.XPath）和一个规整函数，
+    依次求值，取第一个非空结果；同时统计每个字段由哪一条 XPath 命中，用于清理从不命中的备选表达式
+    """
+
+    def __init__(self, spec: Dict[str, Tuple[Sequence[str], Optional[Callable[[str], str]]]]):
+        """
+        初始化
+        :param spec: 字段名 -> (XPath 表达式列表, 规整函数)；规整函数为空时使用 strip_text
+        """
+        self._fields = []
+        for name, (expressions, normalize) in spec.items():
+            compiled = [(expression, etree.XPath(expression)) for expression in expressions]
+            self._fields.append((name, compiled, normalize or strip_text))
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def field_names(self) -> List[str]:
+        """字段名（按声明顺序）"""
+        return [name for name, _, _ in self._fields]
+
+    def reset_stats(self):
+        """清空命中统计"""
+        with self._lock:
+            self._pages = 0
+            self._hits = {name: [0] * len(compiled) for name, compiled, _ in self._fields}
+            self._defaults = {name: 0 for name, _, _ in self._fields}
+
+    def extract(self, root, defaults: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+        """
+        提取全部字段
+        :param root: lxml 文档根节点
+        :param defaults: 所有 XPath 都未命中时使用的默认值（如搜索页带过来的标题）
+        :return: 字段字典（未命中且无默认值的字段为 None）
+        """
+        defaults = defaults or {}
+        result = {}
+        matched = []  # (字段名, 命中的 XPath 下标；-1 表示使用默认值)
+        for name, compiled, normalize in self._fields:
+            value = None
+            for index, (_, xpath) in enumerate(compiled):
+                value = self._first(xpath(root))
+                if value:
+                    matched.append((name, index))
+                    break
+            if not value:
+                value = defaults.get(name) or None
+                if value:
+                    matched.append((name, -1))
+            result[name] = normalize(value) if value else None
+
+        with self._lock:
+            self._pages += 1
+            for name, index in matched:
+                if index < 0:
+                    self._defaults[name] += 1
+                else:
+                    self._hits[name][index] += 1
+        return result
+
+    @staticmethod
+    def _first(values) -> Optional[str]:
+        """取 XPath 结果中的第一项（与 parsel 的 extract_first 一致：文本/属性取字符串，元素取其文本）"""
+        if isinstance(values, list):
+            if not values:
+                return None
+            values = values[0]
+        if isinstance(values, str):
+            return str(values)
+        if hasattr(values, 'itertext'):
+            return ''.join(values.itertext())
+        return None
+
+    def stats(self) -> Dict:
+        """
+        命中统计
+        :return: {'pages': 页数, 'fields': {字段名: {'hit_rate', 'default', 'miss', 'xpaths': [{'xpath', 'hits', 'rate'}]}}}
+        """
+        with self._lock:
+            pages = self._pages
+            fields = {}
+            for name, compiled, _ in self._fields:
+                hits = self._hits[name]
+                matched = sum(hits)
+                fields[name] = {
+                    'hit_rate': round(matched / pages, 4) if pages else 0.0,
+                    'default': self._defaults[name],
+                    'miss': pages - matched - self._defaults[name],
+                    'xpaths': [{
+                        'xpath': expression,
+                        'hits': count,
+                        'rate': round(count / pages, 4) if pages else 0.0
+                    } for (expression, _), count in zip(compiled, hits)]
+                }
+        return {'pages': pages, 'fields': fields}
+
+    def dead_xpaths(self) -> List[Tuple[str, str]]:
+        """
+        从未命中过的 XPath（至少解析过一页后才有意义）
+        :return: [(字段名, XPath 表达式)]
+        """
+        stats = self.stats()
+        if not stats['pages']:
+            return []
+        return [
+            (name, item['xpath'])
+            for name, field in stats['fields'].items()
+            for item in field['xpaths'] if item['hits'] == 0
+        ]
@@ -5,13 +5,177 @@ MySQL 连接池模块
 
 from dbutils.pooled_db import PooledDB
 import pymysql
+import base64
+import json
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from typing import Dict, List, Optional
 
+from crawl_metrics import (
+    POOL_CLOSED, POOL_CREATED, POOL_IDLE, POOL_IN_USE, POOL_MAX, POOL_WAIT_SECONDS, POOL_WAITING, track_db
+)
+
+
+# 从价格/评分/评论数文本中提取第一个数字（如 "¥1,089.50"、"4.5分"、"1.2万条评论"）
+_NUMBER_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+INT_MAX = 2147483647  # MySQL INT 列上限（严格模式下超出会使整批写入失败）
+
+
+def encode_cursor(values: List) -> str:
+    """
+    将分页位置（排序键 + 主键）编码为不透明游标
+    :param values: 最后一行的排序键值列表
+    :return: 游标字符串
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    """
+    解码游标
+    :param cursor: 游标字符串（为空表示第一页）
+    :param size: 排序键数量
+    :return: 排序键值列表；游标为空时返回 None
+    :raises ValueError: 游标格式不正确
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise ValueError("无效的分页游标")
+    return values
+
+
+class _PoolCounts:
+    """
+    连接池的连接数（由连接的创建/关闭和借出/归还维护，不读取 DBUtils 的内部属性）
+    空闲连接数 = 已建立的物理连接数 - 借出中的连接数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0  # 已建立、尚未关闭的物理连接
+        self.in_use = 0  # 已借出、尚未归还的连接
+
+    def add(self, open_delta: int = 0, in_use_delta: int = 0):
+        with self._lock:
+            self.open += open_delta
+            self.in_use += in_use_delta
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'in_use': self.in_use, 'idle': max(0, self.open - self.in_use)}
+
+
+_pool_counts = _PoolCounts()
+
+
+class _CountedConnection(pymysql.connections.Connection):
+    """关闭时计数的 pymysql 连接（每个连接只计一次，连接已断开时也计入）"""
+
+    _close_counted = False
+
+    def close(self):
+        if not self._close_counted:
+            self._close_counted = True
+            POOL_CLOSED.inc()
+            _pool_counts.add(open_delta=-1)
+        super().close()
+
+
+def _create_connection(*args, **kwargs):
+    """
+    连接池的 creator：新建连接并计数
+    :return: pymysql 连接
+    """
+    connection = _CountedConnection(*args, **kwargs)
+    POOL_CREATED.inc()
+    _pool_counts.add(open_delta=1)
+    return connection
+
+
+_create_connection.dbapi = pymysql  # 供 DBUtils 识别线程安全级别和异常类型
+
+
+class _CheckedOutConnection:
+    """从连接池借出的连接：close()（归还连接池）时借出计数减一（只减一次），其余属性转发给 DBUtils 的连接"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._returned = False
+        _pool_counts.add(in_use_delta=1)
+
+    def close(self):
+        if not self._returned:
+            self._returned = True
+            _pool_counts.add(in_use_delta=-1)
+        self._connection.close()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class MySQLSession:
+    """
+    工作单元：一个连接 + 一个游标 + 一个事务（由 MySQLPool.session() 创建）
+    execute / executemany / fetchone / fetchall / rowcount / lastrowid 与游标一致
+    """
+
+    def __init__(self, connection):
+        """
+        初始化
+        :param connection: 从连接池借出的连接
+        """
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.rollback_only = False  # 嵌套的 session 中抛出过异常时置位，外层退出时回滚
+        self.commit_required = True  # 退出时是否提交（任一层要求提交即提交）
+
+    def execute(self, sql: str, params=None) -> int:
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql: str, params) -> int:
+        return self.cursor.executemany(sql, params)
+
+    def fetchone(self) -> Optional[Dict]:
+        return self.cursor.fetchone()
+
+    def fetchall(self) -> List[Dict]:
+        return self.cursor.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self) -> int:
+        return self.cursor.lastrowid
+
+    def commit(self):
+        """提前提交（分批回填等长事务中使用，之后的语句开始新事务）"""
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
 
 class MySQLPool:
     """MySQL 连接池类"""
     
     _pool = None  # 连接池单例
+    _pool_limits = {'max_connections': 0, 'max_cached': 0}  # 连接池容量（initialize 时记录）
+    
+    MAX_PAGE_SIZE = 100  # 游标分页的单页数量上限
+    
+    _local = threading.local()  # 当前线程正在使用的 session
     
     @classmethod
     def close_pool(cls):
@@ -74,7 +238,7 @@ class MySQLPool:
                 # 创建连接池
                 # print(f"🔄 正在创建连接池...")
                 cls._pool = PooledDB(
-                    creator=pymysql,
+                    creator=_create_connection,
                     maxconnections=maxconnections,
                     mincached=mincached,
                     maxcached=maxcached,
@@ -88,6 +252,7 @@ class MySQLPool:
                     cursorclass=pymysql.cursors.DictCursor,
                     autocommit=False  # 显式设置为手动提交，确保事务控制
                 )
+                cls._pool_limits = {'max_connections': maxconnections, 'max_cached': maxcached}
                 
                 # print(f"✅ 连接池创建成功")
                 
@@ -138,14 +303,33 @@ class MySQLPool:
             cover_image VARCHAR(500) DEFAULT '' COMMENT '封面图',
             detail_url VARCHAR(500) DEFAULT '' COMMENT '详情页URL',
             search_keyword VARCHAR(100) DEFAULT '' COMMENT '搜索关键词',
+            price_cents INT NOT NULL DEFAULT 0 COMMENT '现价（分）',
+            original_price_cents INT NOT NULL DEFAULT 0 COMMENT '原价（分）',
+            rating_value DECIMAL(5,2) NOT NULL DEFAULT 0 COMMENT '评分（数值）',
+            comment_num INT NOT NULL DEFAULT 0 COMMENT '评论数（数值）',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
             UNIQUE KEY unique_title_author (title(255), author(100)) COMMENT '标题+作者唯一索引',
             INDEX idx_keyword (search_keyword),
-            INDEX idx_title (title(100))
+            INDEX idx_title (title(100)),
+            INDEX idx_keyword_price (search_keyword, price_cents) COMMENT '按关键词+价格排序分页',
+            INDEX idx_price (price_cents) COMMENT '按价格排序分页'
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='图书信息表'
         """
         
+        # 创建关键词-图书关联表（一本书可被多个关键词搜到；price_cents 冗余自 books，用于按关键词+价格分页）
+        create_book_keywords_table_sql = """
+        CREATE TABLE IF NOT EXISTS book_keywords (
+            keyword VARCHAR(100) NOT NULL COMMENT '搜索关键词',
+            book_id INT NOT NULL COMMENT '图书ID（books.id）',
+            price_cents INT NOT NULL DEFAULT 0 COMMENT '现价（分）',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+            PRIMARY KEY (keyword, book_id),
+            INDEX idx_keyword_price (keyword, price_cents, book_id) COMMENT '按关键词+价格排序分页',
+            INDEX idx_book_id (book_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='关键词图书关联表'
+        """
+        
         # 创建番茄小说数据表
         create_fanqie_table_sql = """
         CREATE TABLE IF NOT EXISTS fanqie_recommend (
@@ -210,11 +394,43 @@ class MySQLPool:
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='番茄小说作者书籍关联表'
         """
         
+        # 创建爬取任务表（后端多个 worker 进程共享任务状态和进度）
+        create_crawl_jobs_table_sql = """
+        CREATE TABLE IF NOT EXISTS crawl_jobs (
+            job_id CHAR(32) NOT NULL PRIMARY KEY COMMENT '任务ID',
+            kind VARCHAR(50) NOT NULL COMMENT '任务类型',
+            params TEXT COMMENT '任务参数（JSON）',
+            status VARCHAR(20) NOT NULL COMMENT '状态（queued / running / finished / failed）',
+            progress TEXT COMMENT '进度（JSON）',
+            result MEDIUMTEXT COMMENT '任务结果（JSON，任务结束后写入）',
+            error TEXT COMMENT '错误信息',
+            worker VARCHAR(100) NOT NULL DEFAULT '' COMMENT '执行任务的进程（主机名:进程号）',
+            created_at DOUBLE NOT NULL COMMENT '提交时间（Unix 时间戳）',
+            started_at DOUBLE NULL COMMENT '开始时间',
+            finished_at DOUBLE NULL COMMENT '结束时间',
+            heartbeat_at DOUBLE NOT NULL COMMENT '所在进程最近一次写入的时间（用于识别已退出进程遗留的任务）',
+            INDEX idx_created (created_at),
+            INDEX idx_status_heartbeat (status, heartbeat_at),
+            INDEX idx_finished (finished_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='爬取任务表'
+        """
+        
+        # 创建数据迁移进度表（分批回填中断后，下次启动从记录的位置继续）
+        create_migrations_table_sql = """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(100) NOT NULL PRIMARY KEY COMMENT '迁移名',
+            last_id BIGINT NOT NULL DEFAULT 0 COMMENT '已处理到的主键',
+            finished_at DATETIME NULL COMMENT '完成时间（未完成时为 NULL）'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据迁移进度表'
+        """
+        
         try:
-            conn = cls.get_connection()
-            with conn.cursor() as cursor:
+            with cls.session() as s:
+                conn, cursor = s.connection, s.cursor
                 # 创建图书表
                 cursor.execute(create_table_sql)
+                # 创建关键词-图书关联表
+                cursor.execute(create_book_keywords_table_sql)
                 # 创建番茄小说推荐表
                 cursor.execute(create_fanqie_table_sql)
                 # 创建番茄小说详情表
@@ -223,59 +439,431 @@ class MySQLPool:
                 cursor.execute(create_author_table_sql)
                 # 创建作者书籍关联表
                 cursor.execute(create_author_book_table_sql)
+                # 创建爬取任务表
+                cursor.execute(create_crawl_jobs_table_sql)
+                # 创建数据迁移进度表
+                cursor.execute(create_migrations_table_sql)
                 conn.commit()
                 # print("✅ 数据表创建/检查完成")
                 
-                # 检查并添加唯一索引（如果表已存在但没有索引）
-                check_index_sql = """
-                SELECT COUNT(*) as count 
-                FROM information_schema.statistics 
-                WHERE table_schema = DATABASE() 
-                AND table_name = 'books' 
-                AND index_name = 'unique_title_author'
-                """
-                cursor.execute(check_index_sql)
+                # 多个 worker 进程同时启动时，由持有迁移锁的进程执行迁移，其余进程等待其完成后只做检查
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (cls._MIGRATION_LOCK, cls._MIGRATION_LOCK_TIMEOUT))
                 result = cursor.fetchone()
-                
-                if result and result['count'] == 0:
-                    # print("⚠️ 检测到表中缺少唯一索引，正在添加...")
-                    pass
-                    add_index_sql = """
-                    ALTER TABLE books 
-                    ADD UNIQUE KEY unique_title_author (title(255), author(100))
-                    """
-                    try:
-                        cursor.execute(add_index_sql)
-                        conn.commit()
-                        # print("✅ 唯一索引添加成功")
-                    except Exception as e:
-                        if "Duplicate key name" in str(e):
-                            # print("✅ 唯一索引已存在")
-                            pass
-                        else:
-                            # print(f"⚠️ 添加唯一索引失败: {e}")
-                            pass
-                else:
-                    # print("✅ 唯一索引已存在")
-                    pass
-                    
-            conn.close()
+                if not result or result['locked'] != 1:
+                    # print("⚠️ 等待迁移锁超时，跳过迁移（其他进程仍在迁移）")
+                    cls._fulltext_ready = all(cls._has_index(cursor, table, cls._FULLTEXT_INDEX)
+                                              for table in cls._FULLTEXT_TABLES)
+                    return
+                try:
+                    cls._migrate(conn, cursor)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (cls._MIGRATION_LOCK,))
+                    cursor.fetchone()
         except Exception as e:
             # print(f"❌ 创建表失败: {e}")
             pass
             raise
     
+    _MIGRATION_LOCK = 'dangdang_migrate'  # 迁移锁名（GET_LOCK，连接断开时自动释放）
+    _MIGRATION_LOCK_TIMEOUT = 600  # 等待其他进程完成迁移的最长时间（秒）
+    
+    @classmethod
+    def _has_index(cls, cursor, table: str, index_name: str) -> bool:
+        """
+        表上是否已有指定索引
+        :param cursor: 游标
+        :param table: 表名
+        :param index_name: 索引名
+        :return: 是否存在
+        """
+        cursor.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.statistics 
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index_name))
+        result = cursor.fetchone()
+        return bool(result and result['count'] > 0)
+    
+    @classmethod
+    def _migrate(cls, conn, cursor):
+        """
+        旧表迁移（调用方持有迁移锁）：补充唯一索引、数值列、全文索引，回填关键词关联
+        :param conn: 数据库连接
+        :param cursor: 游标
+        """
+        # 检查并添加唯一索引（如果表已存在但没有索引）
+        check_index_sql = """
+        SELECT COUNT(*) as count 
+        FROM information_schema.statistics 
+        WHERE table_schema = DATABASE() 
+        AND table_name = 'books' 
+        AND index_name = 'unique_title_author'
+        """
+        cursor.execute(check_index_sql)
+        result = cursor.fetchone()
+        
+        if result and result['count'] == 0:
+            # print("⚠️ 检测到表中缺少唯一索引，正在添加...")
+            pass
+            add_index_sql = """
+            ALTER TABLE books 
+            ADD UNIQUE KEY unique_title_author (title(255), author(100))
+            """
+            try:
+                cursor.execute(add_index_sql)
+                conn.commit()
+                # print("✅ 唯一索引添加成功")
+            except Exception as e:
+                if "Duplicate key name" in str(e):
+                    # print("✅ 唯一索引已存在")
+                    pass
+                else:
+                    # print(f"⚠️ 添加唯一索引失败: {e}")
+                    pass
+        else:
+            # print("✅ 唯一索引已存在")
+            pass
+        
+        # 旧表迁移：补充数值列和排序索引
+        cls._migrate_numeric_columns(conn, cursor)
+        # 补充全文索引（用于站内搜索）
+        cls._migrate_fulltext_indexes(conn, cursor)
+        # 关联表为空时从 books.search_keyword 回填
+        cls._migrate_book_keywords(conn, cursor)
+    
+    # 数值列定义（旧表迁移时逐列补充）
+    _NUMERIC_COLUMNS = {
+        'price_cents': "INT NOT NULL DEFAULT 0 COMMENT '现价（分）'",
+        'original_price_cents': "INT NOT NULL DEFAULT 0 COMMENT '原价（分）'",
+        'rating_value': "DECIMAL(5,2) NOT NULL DEFAULT 0 COMMENT '评分（数值）'",
+        'comment_num': "INT NOT NULL DEFAULT 0 COMMENT '评论数（数值）'"
+    }
+    
+    # 排序索引定义
+    _NUMERIC_INDEXES = {
+        'idx_keyword_price': '(search_keyword, price_cents)',
+        'idx_price': '(price_cents)'
+    }
+    
+    _NUMERIC_BACKFILL = 'backfill_numeric_columns'  # schema_migrations 中的迁移名
+    
+    @classmethod
+    def _migrate_numeric_columns(cls, conn, cursor):
+        """
+        为旧的 books 表补充数值列（价格/评分/评论数）及排序索引，并回填已有数据
+        :param conn: 数据库连接
+        :param cursor: 游标
+        """
+        cursor.execute("""
+        SELECT COLUMN_NAME AS name FROM information_schema.columns 
+        WHERE table_schema = DATABASE() AND table_name = 'books'
+        """)
+        existing_columns = {row['name'] for row in cursor.fetchall()}
+        missing_columns = [name for name in cls._NUMERIC_COLUMNS if name not in existing_columns]
+        
+        if missing_columns:
+            # print(f"⚠️ 检测到 books 表缺少数值列 {missing_columns}，正在添加...")
+            cursor.execute("ALTER TABLE books " + ", ".join(
+                f"ADD COLUMN {name} {cls._NUMERIC_COLUMNS[name]}" for name in missing_columns
+            ))
+            conn.commit()
+        
+        cursor.execute("""
+        SELECT DISTINCT index_name AS name FROM information_schema.statistics 
+        WHERE table_schema = DATABASE() AND table_name = 'books'
+        """)
+        existing_indexes = {row['name'] for row in cursor.fetchall()}
+        missing_indexes = [name for name in cls._NUMERIC_INDEXES if name not in existing_indexes]
+        
+        if missing_indexes:
+            cursor.execute("ALTER TABLE books " + ", ".join(
+                f"ADD INDEX {name} {cls._NUMERIC_INDEXES[name]}" for name in missing_indexes
+            ))
+            conn.commit()
+        
+        # 回填进度单独记录：中途退出时列已存在，下次启动仍需从中断处继续
+        cursor.execute(
+            "SELECT last_id, finished_at FROM schema_migrations WHERE name = %s",
+            (cls._NUMERIC_BACKFILL,)
+        )
+        progress = cursor.fetchone()
+        if progress is None or progress['finished_at'] is None:
+            # print("⚠️ 数值列回填未完成，正在继续...")
+            cls.backfill_numeric_columns(start_id=progress['last_id'] if progress else 0)
+    
+    # 全文索引定义（ngram 分词，支持中文；新增数据由 InnoDB 在提交时自动维护索引）
+    _FULLTEXT_INDEX = 'ft_search'
+    _FULLTEXT_COLUMNS = 'title, author, description'
+    _FULLTEXT_TABLES = ('books', 'fanqie_books')
+    _fulltext_ready = False  # 全文索引是否可用（不可用时搜索退化为 LIKE 匹配）
+    
+    MAX_SEARCH_OFFSET = 1000  # 搜索结果最多翻到的位置（按相关度排序，越往后越没有意义）
+    
+    @classmethod
+    def _migrate_fulltext_indexes(cls, conn, cursor):
+        """
+        为 books / fanqie_books 表补充 ngram 全文索引（表中已有数据时会重建表，只在首次执行）
+        数据库不支持 ngram 分词器（如 MariaDB）时跳过，搜索退化为 LIKE 匹配
+        :param conn: 数据库连接
+        :param cursor: 游标
+        """
+        ready = True
+        for table in cls._FULLTEXT_TABLES:
+            if cls._has_index(cursor, table, cls._FULLTEXT_INDEX):
+                continue
+            
+            try:
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD FULLTEXT INDEX {cls._FULLTEXT_INDEX} "
+                    f"({cls._FULLTEXT_COLUMNS}) WITH PARSER ngram"
+                )
+                conn.commit()
+            except Exception as e:
+                # 失败也可能是其他进程已经添加了索引（如 Duplicate key name），重新检查，确实缺失时才退化为 LIKE
+                if not cls._has_index(cursor, table, cls._FULLTEXT_INDEX):
+                    # print(f"⚠️ 添加全文索引失败，搜索将使用 LIKE 匹配: {e}")
+                    ready = False
+        cls._fulltext_ready = ready
+    
+    @classmethod
+    def _migrate_book_keywords(cls, conn, cursor):
+        """
+        book_keywords 表为空而 books 表有数据时（旧库首次升级），用 books.search_keyword 回填关联
+        :param conn: 数据库连接
+        :param cursor: 游标
+        """
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM book_keywords) AS linked, EXISTS(SELECT 1 FROM books) AS has_books")
+        result = cursor.fetchone()
+        if result and result['has_books'] and not result['linked']:
+            # print("⚠️ 检测到 book_keywords 表为空，正在从 books.search_keyword 回填...")
+            cls.backfill_book_keywords()
+    
+    @classmethod
+    @track_db
+    def backfill_book_keywords(cls, batch_size: int = 5000) -> int:
+        """
+        用 books.search_keyword 回填关键词-图书关联（按主键区间分批，每批一条 INSERT ... SELECT + 一次 commit，可重复执行）
+        :param batch_size: 每批处理的主键区间大小
+        :return: 新增的关联数
+        """
+        sql = """
+        INSERT IGNORE INTO book_keywords (keyword, book_id, price_cents) 
+        SELECT search_keyword, id, price_cents FROM books 
+        WHERE id > %s AND id <= %s AND search_keyword != ''
+        """
+        
+        total = 0
+        with cls.session() as s:
+            s.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM books")
+            max_id = s.fetchone()['max_id']
+            
+            last_id = 0
+            while last_id < max_id:
+                s.execute(sql, (last_id, last_id + batch_size))
+                s.commit()
+                total += s.rowcount
+                last_id += batch_size
+        return total
+    
+    @classmethod
+    @track_db
+    def backfill_numeric_columns(cls, batch_size: int = 1000, start_id: int = 0) -> int:
+        """
+        根据文本列回填数值列（按主键分批，每批一次 executemany + 一次 commit）
+        每批提交时把进度写入 schema_migrations，全部完成后记录完成时间
+        :param batch_size: 每批处理行数
+        :param start_id: 从该主键之后开始（继续中断的回填）
+        :return: 回填的行数
+        """
+        select_sql = """
+        SELECT id, current_price, original_price, rating, comment_count 
+        FROM books 
+        WHERE id > %s 
+        ORDER BY id 
+        LIMIT %s
+        """
+        update_sql = """
+        UPDATE books 
+        SET price_cents = %s, original_price_cents = %s, rating_value = %s, comment_num = %s 
+        WHERE id = %s
+        """
+        
+        progress_sql = """
+        INSERT INTO schema_migrations (name, last_id, finished_at) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), finished_at = VALUES(finished_at)
+        """
+        
+        total = 0
+        last_id = start_id
+        with cls.session() as s:
+            while True:
+                s.execute(select_sql, (last_id, batch_size))
+                rows = s.fetchall()
+                if not rows:
+                    s.execute(progress_sql, (cls._NUMERIC_BACKFILL, last_id, datetime.now()))
+                    break
+                
+                s.executemany(update_sql, [(
+                    cls.parse_price_cents(row['current_price']),
+                    cls.parse_price_cents(row['original_price']),
+                    cls.parse_rating(row['rating']),
+                    cls.parse_count(row['comment_count']),
+                    row['id']
+                ) for row in rows])
+                total += len(rows)
+                last_id = rows[-1]['id']
+                s.execute(progress_sql, (cls._NUMERIC_BACKFILL, last_id, None))
+                s.commit()
+        return total
+    
+    @classmethod
+    def parse_decimal(cls, text: Optional[str]) -> Decimal:
+        """
+        提取文本中的第一个数字（与原 CAST(... AS DECIMAL) 排序一致，无法解析时为 0）
+        :param text: 原始文本，如 "¥1,089.50"
+        :return: 数值
+        """
+        match = _NUMBER_PATTERN.search(text or '')
+        if not match:
+            return Decimal(0)
+        try:
+            return Decimal(match.group(0).replace(',', ''))
+        except InvalidOperation:
+            return Decimal(0)
+    
+    @classmethod
+    def parse_price_cents(cls, text: Optional[str]) -> int:
+        """
+        价格文本转换为分
+        :param text: 价格文本，如 "¥89.00"
+        :return: 价格（分，限制在 INT 列的取值范围内）
+        """
+        return min(int((cls.parse_decimal(text) * 100).to_integral_value()), INT_MAX)
+    
+    @classmethod
+    def parse_rating(cls, text: Optional[str]) -> Decimal:
+        """
+        评分文本转换为数值（限制在 rating_value 列的取值范围内）
+        :param text: 评分文本，如 "4.5分"、"98.6%"
+        :return: 评分
+        """
+        return min(cls.parse_decimal(text), Decimal('999.99'))
+    
+    @classmethod
+    def parse_count(cls, text: Optional[str]) -> int:
+        """
+        评论数文本转换为整数（支持 "1.2万" 这样的写法）
+        :param text: 评论数文本
+        :return: 评论数（限制在 INT 列的取值范围内）
+        """
+        value = cls.parse_decimal(text)
+        if text and '万' in text:
+            value *= 10000
+        return min(int(value), INT_MAX)
+    
     @classmethod
     def get_connection(cls):
         """
         从连接池获取一个连接
-        :return: 数据库连接对象
+        :return: 数据库连接对象（close() 归还连接池）
         """
         if cls._pool is None:
             raise Exception("连接池未初始化，请先调用 MySQLPool.initialize()")
-        return cls._pool.connection()
+        POOL_WAITING.inc()
+        try:
+            with POOL_WAIT_SECONDS.time():
+                return _CheckedOutConnection(cls._pool.connection())
+        finally:
+            POOL_WAITING.dec()
+    
+    @classmethod
+    @contextmanager
+    def session(cls, commit: bool = True):
+        """
+        工作单元：块内所有语句使用同一个连接和事务，正常退出时提交，抛出异常时回滚，最后归还连接
+        块内再调用 MySQLPool 的方法（或嵌套 session）会复用这个 session，整体一起提交或回滚；
+        嵌套调用中出现的异常即使被方法内部捕获，外层退出时也会回滚并抛出异常
+        
+        用法:
+            with MySQLPool.session() as s:
+                MySQLPool.save_fanqie_book_detail(book_data)
+                MySQLPool.save_fanqie_author(author, book_id)
+        
+        :param commit: 正常退出时是否提交（只读查询传 False，省掉一次 COMMIT 往返）
+        :return: MySQLSession
+        """
+        current = getattr(cls._local, 'session', None)
+        if current is not None:
+            current.commit_required = current.commit_required or commit
+            try:
+                yield current
+            except BaseException:
+                current.rollback_only = True
+                raise
+            return
+        
+        conn = cls.get_connection()
+        session = MySQLSession(conn)
+        session.commit_required = commit
+        cls._local.session = session
+        try:
+            yield session
+            if session.rollback_only:
+                raise Exception("事务中有语句执行失败，已回滚")
+            if session.commit_required:
+                conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cls._local.session = None
+            try:
+                session.cursor.close()
+            except Exception:
+                pass
+            conn.close()
+    
+    @classmethod
+    def _pool_usage(cls) -> Dict:
+        """读取连接池当前的借出/空闲连接数和容量（连接池未初始化时均为 0）"""
+        if cls._pool is None:
+            return {'in_use': 0, 'idle': 0, 'max_connections': 0, 'max_cached': 0}
+        return {**_pool_counts.snapshot(), **cls._pool_limits}
+    
+    @classmethod
+    def pool_stats(cls) -> Dict:
+        """
+        连接池快照（用于按实际负载调整连接池大小）
+        in_use 接近 max_connections 且 waiting、取连接等待时间上升时说明连接池是瓶颈
+        :return: 统计字典
+        """
+        usage = cls._pool_usage()
+        in_use, max_connections = usage['in_use'], usage['max_connections']
+        counts, total = POOL_WAIT_SECONDS.labels().snapshot()
+        checkouts = sum(counts)
+        wait_buckets = {}
+        cumulative = 0
+        for bound, count in zip(POOL_WAIT_SECONDS.buckets, counts):
+            cumulative += count
+            wait_buckets[str(bound)] = cumulative
+        
+        return {
+            'initialized': cls._pool is not None,
+            **usage,
+            'waiting': int(POOL_WAITING.labels().value),
+            'utilization': round(in_use / max_connections, 4) if max_connections else None,
+            'connections_created': int(POOL_CREATED.labels().value),
+            'connections_closed': int(POOL_CLOSED.labels().value),
+            'checkouts': checkouts,
+            'wait_seconds_total': round(total, 6),
+            'wait_seconds_avg': round(total / checkouts, 6) if checkouts else 0.0,
+            'wait_buckets': wait_buckets  # 等待时间 <= 上界（秒）的累计次数
+        }
     
     @classmethod
+    @track_db
     def save_book(cls, book_data: Dict) -> Dict:
         """
         保存单本图书数据（带去重检查）
@@ -289,50 +877,30 @@ class MySQLPool:
             title, author, publisher, publish_date, 
             original_price, current_price, isbn, rating, 
             comment_count, description, cover_image, 
-            detail_url, search_keyword
+            detail_url, search_keyword,
+            price_cents, original_price_cents, rating_value, comment_num
         ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s
         )
         """
         
-        conn = None
-        cursor = None
+        title = book_data.get('标题', '未知')
         try:
-            title = book_data.get('标题', '未知')
-            author = book_data.get('作者', '').strip()
-            isbn = book_data.get('ISBN', '').strip()
-            
-            # 如果 ISBN 为空，设置为 None
-            if not isbn:
-                isbn = None
-            
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            # 执行插入
-            cursor.execute(sql, (
-                book_data.get('标题', ''),
-                author,
-                book_data.get('出版社', ''),
-                book_data.get('出版时间', ''),
-                book_data.get('原价', ''),
-                book_data.get('现价', ''),
-                isbn,
-                book_data.get('评分', ''),
-                book_data.get('评论数', ''),
-                book_data.get('简介', ''),
-                book_data.get('封面图', ''),
-                book_data.get('详情页URL', ''),
-                book_data.get('搜索关键词', '')
-            ))
-            
-            conn.commit()
-            
-            # 检查是否插入成功（affected_rows = 0 表示重复）
-            affected_rows = cursor.rowcount
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                # 执行插入
+                params = cls._book_params(book_data)
+                s.execute(sql, params)
+                
+                # 检查是否插入成功（affected_rows = 0 表示重复）
+                affected_rows = s.rowcount
+                
+                # 新增和重复的图书都登记关键词关联
+                if affected_rows > 0:
+                    book_rows = {cls.dedup_key(params[0], params[1]): {'id': s.lastrowid, 'price_cents': params[13]}}
+                else:
+                    book_rows = cls._select_book_rows(s.cursor, [(params[0], params[1])])
+                cls._link_keywords(s.cursor, [book_data], book_rows)
             
             if affected_rows > 0:
                 # 插入成功
@@ -353,13 +921,6 @@ class MySQLPool:
             
         except pymysql.err.IntegrityError as e:
             # 唯一索引冲突（虽然用了 INSERT IGNORE，但还是捕获一下）
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            
-            title = book_data.get('标题', '未知')
             # print(f"⚠️ 图书已存在（唯一索引冲突）: {title}")
             
             return {
@@ -369,13 +930,6 @@ class MySQLPool:
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            
-            title = book_data.get('标题', '未知')
             # print(f"❌ 保存图书失败 [{title}]: {e}")
             
             return {
@@ -383,20 +937,209 @@ class MySQLPool:
                 'is_duplicate': False,
                 'message': f'保存失败: {str(e)}'
             }
+    
+    @classmethod
+    @track_db
+    def save_books_batch(cls, books: List[Dict]) -> List[Dict]:
+        """
+        批量保存图书数据（一次 executemany + 一次 commit）
+        先在同一连接中查询已存在的 标题+作者，逐行判断新增/重复，
+        再用多行 INSERT IGNORE 写入新数据；实际插入行数与预期不一致时
+        （其他爬虫并发写入，或与唯一索引的前缀/排序规则比较结果不同），回滚到保存点后逐行插入，按每行的 rowcount 判断
+        :param books: 图书数据字典列表
+        :return: 与 books 一一对应的保存结果列表 {'success': bool, 'is_duplicate': bool, 'message': str}
+        """
+        if not books:
+            return []
+        
+        sql = """
+        INSERT IGNORE INTO books (
+            title, author, publisher, publish_date, 
+            original_price, current_price, isbn, rating, 
+            comment_count, description, cover_image, 
+            detail_url, search_keyword,
+            price_cents, original_price_cents, rating_value, comment_num
+        ) VALUES (
+            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s
+        )
+        """
+        
+        try:
+            with cls.session() as s:
+                # 查询本批次中已存在的 标题+作者
+                pairs = [(book.get('标题', ''), book.get('作者', '').strip()) for book in books]
+                book_rows = cls._select_book_rows(s.cursor, pairs)
+                existing = set(book_rows)
+                
+                # 逐行判断：数据库中已存在或本批次内重复的都算重复
+                results = []
+                new_rows = []
+                new_pairs = []
+                new_results = []
+                for book, (title, author) in zip(books, pairs):
+                    key = cls.dedup_key(title, author)
+                    if key in existing:
+                        results.append({
+                            'success': False,
+                            'is_duplicate': True,
+                            'message': f'图书已存在: {title}'
+                        })
+                        continue
+                    existing.add(key)
+                    new_rows.append(cls._book_params(book))
+                    new_pairs.append((title, author))
+                    new_results.append({
+                        'success': True,
+                        'is_duplicate': False,
+                        'message': f'成功保存: {title}'
+                    })
+                    results.append(new_results[-1])
+                
+                if new_rows:
+                    s.execute("SAVEPOINT save_books_batch")
+                    s.executemany(sql, new_rows)
+                    if s.rowcount != len(new_rows):
+                        # 有行被 INSERT IGNORE 忽略，但无法从批量结果中区分是哪几行
+                        s.execute("ROLLBACK TO SAVEPOINT save_books_batch")
+                        for params, result in zip(new_rows, new_results):
+                            s.execute(sql, params)
+                            if s.rowcount == 0:
+                                result.update({
+                                    'success': False,
+                                    'is_duplicate': True,
+                                    'message': f'图书已存在: {params[0]}'
+                                })
+                    book_rows.update(cls._select_book_rows(s.cursor, new_pairs))
+                
+                # 新增和重复的图书都登记关键词关联
+                cls._link_keywords(s.cursor, books, book_rows)
             
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+            return results
+            
+        except Exception as e:
+            return [{
+                'success': False,
+                'is_duplicate': False,
+                'message': f'保存失败: {str(e)}'
+            } for _ in books]
+    
+    @classmethod
+    def _select_book_rows(cls, cursor, pairs: List[tuple]) -> Dict[tuple, Dict]:
+        """
+        按 标题+作者 查询已入库图书的主键和价格
+        :param cursor: 游标
+        :param pairs: (标题, 作者) 列表
+        :return: 去重键（见 dedup_key） -> {'id', 'title', 'author', 'price_cents'}
+        """
+        if not pairs:
+            return {}
+        placeholders = ', '.join(['(%s, %s)'] * len(pairs))
+        cursor.execute(
+            f"SELECT id, title, author, price_cents FROM books WHERE (title, author) IN ({placeholders})",
+            [value for pair in pairs for value in pair]
+        )
+        return {cls.dedup_key(row['title'], row['author']): row for row in cursor.fetchall()}
+    
+    @classmethod
+    def _book_keywords(cls, book_data: Dict) -> List[str]:
+        """
+        图书的全部关键词（搜索关键词 + 关键词列表，去重后保持顺序）
+        :param book_data: 图书数据字典
+        :return: 关键词列表
+        """
+        keywords = [book_data.get('搜索关键词', '')] + list(book_data.get('关键词列表') or [])
+        return list(dict.fromkeys(kw.strip()[:100] for kw in keywords if kw and kw.strip()))
+    
+    @classmethod
+    def _link_keywords(cls, cursor, books: List[Dict], book_rows: Dict[tuple, Dict]):
+        """
+        登记关键词-图书关联（已存在的关联忽略）
+        :param cursor: 游标
+        :param books: 图书数据字典列表
+        :param book_rows: 去重键 -> 图书行（需含 id、price_cents）
+        """
+        params = []
+        for book in books:
+            row = book_rows.get(cls.dedup_key(book.get('标题', ''), book.get('作者', '').strip()))
+            if row:
+                params.extend((keyword, row['id'], row['price_cents']) for keyword in cls._book_keywords(book))
+        if params:
+            cursor.executemany(
+                "INSERT IGNORE INTO book_keywords (keyword, book_id, price_cents) VALUES (%s, %s, %s)",
+                params
+            )
+    
+    @classmethod
+    @track_db
+    def link_book_keywords(cls, links: List[tuple]) -> int:
+        """
+        按 标题+作者 为已入库图书登记关键词（搜索页跳过已入库图书的详情页时调用，不新增图书）
+        :param links: (关键词, 标题, 作者) 列表
+        :return: 新增的关联数
+        """
+        if not links:
+            return 0
+        
+        with cls.session() as s:
+            book_rows = cls._select_book_rows(s.cursor, list({(title, author) for _, title, author in links}))
+            params = []
+            for keyword, title, author in links:
+                row = book_rows.get(cls.dedup_key(title, author))
+                if row and keyword:
+                    params.append((keyword[:100], row['id'], row['price_cents']))
+            if not params:
+                return 0
+            s.executemany(
+                "INSERT IGNORE INTO book_keywords (keyword, book_id, price_cents) VALUES (%s, %s, %s)",
+                params
+            )
+            return s.rowcount
+    
+    @classmethod
+    def _book_params(cls, book_data: Dict) -> tuple:
+        """
+        将图书数据字典转换为 INSERT 参数
+        :param book_data: 图书数据字典
+        :return: 参数元组（字段顺序与 books 插入语句一致）
+        """
+        isbn = book_data.get('ISBN', '').strip()
+        
+        return (
+            book_data.get('标题', ''),
+            book_data.get('作者', '').strip(),
+            book_data.get('出版社', ''),
+            book_data.get('出版时间', ''),
+            book_data.get('原价', ''),
+            book_data.get('现价', ''),
+            isbn if isbn else None,  # 如果 ISBN 为空，设置为 None
+            book_data.get('评分', ''),
+            book_data.get('评论数', ''),
+            book_data.get('简介', ''),
+            book_data.get('封面图', ''),
+            book_data.get('详情页URL', ''),
+            book_data.get('搜索关键词', ''),
+            cls.parse_price_cents(book_data.get('现价', '')),
+            cls.parse_price_cents(book_data.get('原价', '')),
+            cls.parse_rating(book_data.get('评分', '')),
+            cls.parse_count(book_data.get('评论数', ''))
+        )
+    
+    @classmethod
+    def dedup_key(cls, title: str, author: str) -> tuple:
+        """
+        与 unique_title_author 索引一致的去重键（前缀长度 + 不区分大小写 + 忽略尾部空格）
+        :param title: 标题
+        :param author: 作者
+        :return: 去重键
+        """
+        return (
+            (title or '')[:255].lower().rstrip(),
+            (author or '')[:100].lower().rstrip()
+        )
     
     @classmethod
+    @track_db
     def save_fanqie_recommend(cls, book_data: Dict) -> Dict:
         """
         保存番茄小说推荐列表（书名+ID）
@@ -409,23 +1152,14 @@ class MySQLPool:
         ) VALUES (%s, %s, %s)
         """
         
-        conn = None
-        cursor = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(sql, (
-                book_data.get('书名', ''),
-                book_data.get('书籍ID', ''),
-                book_data.get('详情页URL', '')
-            ))
-            
-            conn.commit()
-            affected_rows = cursor.rowcount
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                s.execute(sql, (
+                    book_data.get('书名', ''),
+                    book_data.get('书籍ID', ''),
+                    book_data.get('详情页URL', '')
+                ))
+                affected_rows = s.rowcount
             
             return {
                 'success': affected_rows > 0,
@@ -433,28 +1167,13 @@ class MySQLPool:
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
             return {
                 'success': False,
                 'is_duplicate': False
             }
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def save_fanqie_book_detail(cls, book_data: Dict) -> Dict:
         """
         保存番茄小说详情
@@ -481,31 +1200,22 @@ class MySQLPool:
             detail_url = VALUES(detail_url)
         """
         
-        conn = None
-        cursor = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(sql, (
-                book_data.get('书籍ID', ''),
-                book_data.get('标题', ''),
-                book_data.get('作者', ''),
-                book_data.get('分类', ''),
-                book_data.get('状态', ''),
-                book_data.get('简介', ''),
-                book_data.get('字数', ''),
-                book_data.get('章节数', ''),
-                book_data.get('封面图', ''),
-                book_data.get('最新章节', ''),
-                book_data.get('更新时间', ''),
-                book_data.get('详情页URL', '')
-            ))
-            
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                s.execute(sql, (
+                    book_data.get('书籍ID', ''),
+                    book_data.get('标题', ''),
+                    book_data.get('作者', ''),
+                    book_data.get('分类', ''),
+                    book_data.get('状态', ''),
+                    book_data.get('简介', ''),
+                    book_data.get('字数', ''),
+                    book_data.get('章节数', ''),
+                    book_data.get('封面图', ''),
+                    book_data.get('最新章节', ''),
+                    book_data.get('更新时间', ''),
+                    book_data.get('详情页URL', '')
+                ))
             
             return {
                 'success': True,
@@ -513,28 +1223,13 @@ class MySQLPool:
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
             return {
                 'success': False,
                 'message': f'保存失败: {str(e)}'
             }
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def save_fanqie_author(cls, author_name: str, book_id: str) -> Dict:
         """
         保存作者信息
@@ -549,47 +1244,24 @@ class MySQLPool:
             book_count = book_count + 1
         """
         
-        conn = None
-        cursor = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(sql, (author_name,))
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                s.execute(sql, (author_name,))
             
             return {
                 'success': True
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
             return {
                 'success': False
             }
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def save_fanqie_author_book(cls, author_name: str, book_id: str, book_name: str) -> Dict:
         """
-        保存作者书籍关联
+        保存作者书籍关联（与作者表的更新在同一事务中提交）
         :param author_name: 作者名
         :param book_id: 书籍ID
         :param book_name: 书名
@@ -601,47 +1273,24 @@ class MySQLPool:
         ) VALUES (%s, %s, %s)
         """
         
-        conn = None
-        cursor = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(sql, (author_name, book_id, book_name))
-            conn.commit()
-            
-            # 同时更新作者表
-            cls.save_fanqie_author(author_name, book_id)
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                s.execute(sql, (author_name, book_id, book_name))
+                
+                # 同时更新作者表
+                cls.save_fanqie_author(author_name, book_id)
             
             return {
                 'success': True
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
             return {
                 'success': False
             }
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def get_fanqie_recommend_list(cls, limit: int = 100) -> List[Dict]:
         """
         获取推荐书籍列表
@@ -654,119 +1303,110 @@ class MySQLPool:
         LIMIT %s
         """
         
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (limit,))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(sql, (limit,))
+                results = s.fetchall()
             
-            return [{
-                'id': row.get('id'),
-                '书名': row.get('book_name', ''),
-                '书籍ID': row.get('book_id', ''),
-                '详情页URL': row.get('detail_url', ''),
-                '创建时间': row.get('created_at')
-            } for row in results]
+            return [cls._format_fanqie_recommend(row) for row in results]
         except Exception as e:
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+    
+    # 只读查询语句（同步连接池和异步数据层共用）
+    _FANQIE_DETAIL_SQL = """
+    SELECT * FROM fanqie_books 
+    WHERE book_id = %s
+    """
+    _AUTHOR_BOOKS_SQL = """
+    SELECT * FROM fanqie_author_books 
+    WHERE author_name = %s
+    ORDER BY created_at DESC
+    """
+    _BOOK_COUNT_SQL = "SELECT COUNT(*) as count FROM books"
+    # 按关联表统计（一本书被多个关键词搜到时计入每个关键词）
+    _KEYWORD_STATS_SQL = """
+    SELECT keyword AS search_keyword, COUNT(*) as count 
+    FROM book_keywords 
+    GROUP BY keyword 
+    ORDER BY count DESC
+    """
     
     @classmethod
+    @track_db
     def get_fanqie_book_detail(cls, book_id: str) -> Optional[Dict]:
         """
         根据书籍ID获取详情
         :param book_id: 书籍ID
         :return: 书籍详情
         """
-        sql = """
-        SELECT * FROM fanqie_books 
-        WHERE book_id = %s
-        """
-        
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (book_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(cls._FANQIE_DETAIL_SQL, (book_id,))
+                result = s.fetchone()
             
-            if result:
-                return {
-                    'id': result.get('id'),
-                    '书籍ID': result.get('book_id', ''),
-                    '标题': result.get('title', ''),
-                    '作者': result.get('author', ''),
-                    '分类': result.get('category', ''),
-                    '状态': result.get('status', ''),
-                    '简介': result.get('description', ''),
-                    '字数': result.get('word_count', ''),
-                    '章节数': result.get('chapter_count', ''),
-                    '封面图': result.get('cover_image', ''),
-                    '最新章节': result.get('latest_chapter', ''),
-                    '更新时间': result.get('update_time', ''),
-                    '详情页URL': result.get('detail_url', ''),
-                    '创建时间': result.get('created_at'),
-                    '更新时间': result.get('updated_at')
-                }
-            return None
+            return cls._format_fanqie_detail(result) if result else None
         except Exception as e:
             return None
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    def _format_fanqie_detail(cls, result: Dict) -> Dict:
+        """
+        格式化番茄小说详情
+        :param result: 数据库行
+        :return: 书籍详情
+        """
+        return {
+            'id': result.get('id'),
+            '书籍ID': result.get('book_id', ''),
+            '标题': result.get('title', ''),
+            '作者': result.get('author', ''),
+            '分类': result.get('category', ''),
+            '状态': result.get('status', ''),
+            '简介': result.get('description', ''),
+            '字数': result.get('word_count', ''),
+            '章节数': result.get('chapter_count', ''),
+            '封面图': result.get('cover_image', ''),
+            '最新章节': result.get('latest_chapter', ''),
+            '更新时间': result.get('update_time', ''),
+            '详情页URL': result.get('detail_url', ''),
+            '创建时间': result.get('created_at'),
+            '更新时间': result.get('updated_at')
+        }
+    
+    @classmethod
+    @track_db
     def get_fanqie_author_books(cls, author_name: str) -> List[Dict]:
         """
         获取作者的所有书籍
         :param author_name: 作者名
         :return: 书籍列表
         """
-        sql = """
-        SELECT * FROM fanqie_author_books 
-        WHERE author_name = %s
-        ORDER BY created_at DESC
-        """
-        
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (author_name,))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(cls._AUTHOR_BOOKS_SQL, (author_name,))
+                results = s.fetchall()
             
-            return [{
-                'id': row.get('id'),
-                '作者': row.get('author_name', ''),
-                '书籍ID': row.get('book_id', ''),
-                '书名': row.get('book_name', ''),
-                '创建时间': row.get('created_at')
-            } for row in results]
+            return [cls._format_author_book(row) for row in results]
         except Exception as e:
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    def _format_author_book(cls, row: Dict) -> Dict:
+        """
+        格式化作者书籍关联
+        :param row: 数据库行
+        :return: 书籍数据
+        """
+        return {
+            'id': row.get('id'),
+            '作者': row.get('author_name', ''),
+            '书籍ID': row.get('book_id', ''),
+            '书名': row.get('book_name', ''),
+            '创建时间': row.get('created_at')
+        }
+    
+    @classmethod
+    @track_db
     def save_fanqie_book(cls, book_data: Dict) -> Dict:
         """
         保存单本番茄小说数据（带去重检查）
@@ -786,39 +1426,30 @@ class MySQLPool:
         )
         """
         
-        conn = None
-        cursor = None
+        title = book_data.get('标题', '未知')
         try:
-            title = book_data.get('标题', '未知')
             author = book_data.get('作者', '').strip()
             
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            # 执行插入
-            cursor.execute(sql, (
-                book_data.get('标题', ''),
-                author,
-                book_data.get('分类', ''),
-                book_data.get('状态', ''),
-                book_data.get('简介', ''),
-                book_data.get('字数', ''),
-                book_data.get('章节数', ''),
-                book_data.get('封面图', ''),
-                book_data.get('最新章节', ''),
-                book_data.get('更新时间', ''),
-                book_data.get('详情页URL', ''),
-                book_data.get('搜索关键词', ''),
-                book_data.get('来源', '番茄小说')
-            ))
-            
-            conn.commit()
-            
-            # 检查是否插入成功（affected_rows = 0 表示重复）
-            affected_rows = cursor.rowcount
-            
-            cursor.close()
-            conn.close()
+            with cls.session() as s:
+                # 执行插入
+                s.execute(sql, (
+                    book_data.get('标题', ''),
+                    author,
+                    book_data.get('分类', ''),
+                    book_data.get('状态', ''),
+                    book_data.get('简介', ''),
+                    book_data.get('字数', ''),
+                    book_data.get('章节数', ''),
+                    book_data.get('封面图', ''),
+                    book_data.get('最新章节', ''),
+                    book_data.get('更新时间', ''),
+                    book_data.get('详情页URL', ''),
+                    book_data.get('搜索关键词', ''),
+                    book_data.get('来源', '番茄小说')
+                ))
+                
+                # 检查是否插入成功（affected_rows = 0 表示重复）
+                affected_rows = s.rowcount
             
             if affected_rows > 0:
                 # 插入成功
@@ -837,14 +1468,6 @@ class MySQLPool:
             
         except pymysql.err.IntegrityError as e:
             # 唯一索引冲突
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            
-            title = book_data.get('标题', '未知')
-            
             return {
                 'success': False,
                 'is_duplicate': True,
@@ -852,33 +1475,14 @@ class MySQLPool:
             }
             
         except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            
-            title = book_data.get('标题', '未知')
-            
             return {
                 'success': False,
                 'is_duplicate': False,
                 'message': f'保存失败: {str(e)}'
             }
-            
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def get_all_fanqie_books(cls, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         获取所有番茄小说（分页）
@@ -892,25 +1496,16 @@ class MySQLPool:
         LIMIT %s OFFSET %s
         """
         
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (limit, offset))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(sql, (limit, offset))
+                results = s.fetchall()
             return [cls._format_fanqie_book(row) for row in results]
         except Exception as e:
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def get_fanqie_books_by_keyword(cls, keyword: str) -> List[Dict]:
         """
         根据搜索关键词获取番茄小说
@@ -923,23 +1518,28 @@ class MySQLPool:
         ORDER BY created_at DESC
         """
         
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (keyword,))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(sql, (keyword,))
+                results = s.fetchall()
             return [cls._format_fanqie_book(row) for row in results]
         except Exception as e:
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+    
+    @classmethod
+    def _format_fanqie_recommend(cls, row: Dict) -> Dict:
+        """
+        格式化数据库行为推荐书籍数据字典
+        :param row: 数据库行
+        :return: 格式化后的推荐书籍数据
+        """
+        return {
+            'id': row.get('id'),
+            '书名': row.get('book_name', ''),
+            '书籍ID': row.get('book_id', ''),
+            '详情页URL': row.get('detail_url', ''),
+            '创建时间': row.get('created_at')
+        }
     
     @classmethod
     def _format_fanqie_book(cls, row: Dict) -> Dict:
@@ -971,6 +1571,7 @@ class MySQLPool:
         }
     
     @classmethod
+    @track_db
     def get_all_books(cls, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         获取所有图书（分页，按价格排序）
@@ -980,123 +1581,397 @@ class MySQLPool:
         """
         sql = """
         SELECT * FROM books 
-        ORDER BY 
-            CAST(REPLACE(REPLACE(current_price, '¥', ''), ',', '') AS DECIMAL(10,2)) ASC,
-            created_at DESC 
+        ORDER BY price_cents ASC, id ASC 
         LIMIT %s OFFSET %s
         """
         
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (limit, offset))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(sql, (limit, offset))
+                results = s.fetchall()
             return [cls._format_book(row) for row in results]
         except Exception as e:
             # print(f"❌ 获取所有图书失败: {e}")
             pass
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def get_books_by_keyword(cls, keyword: str) -> List[Dict]:
         """
-        根据搜索关键词获取图书（按价格排序）
+        根据搜索关键词获取图书（按价格排序，包含被该关键词搜到过的全部图书，走 book_keywords.idx_keyword_price 索引）
         :param keyword: 搜索关键词
         :return: 图书数据列表
         """
         sql = """
-        SELECT * FROM books 
-        WHERE search_keyword = %s 
-        ORDER BY 
-            CAST(REPLACE(REPLACE(current_price, '¥', ''), ',', '') AS DECIMAL(10,2)) ASC,
-            created_at DESC
+        SELECT b.* FROM book_keywords k 
+        JOIN books b ON b.id = k.book_id 
+        WHERE k.keyword = %s 
+        ORDER BY k.price_cents ASC, k.book_id ASC
         """
         
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, (keyword,))
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(sql, (keyword,))
+                results = s.fetchall()
             return [cls._format_book(row) for row in results]
         except Exception as e:
             # print(f"❌ 获取图书失败: {e}")
             pass
             return []
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    def _fetch_page(cls, sql: str, params: tuple, limit: int, cursor_of, formatter) -> Dict:
+        """
+        执行游标分页查询（多取一行判断是否还有下一页）
+        :param sql: 查询语句（末尾为 LIMIT %s）
+        :param params: 查询参数（不含 LIMIT）
+        :param limit: 单页数量
+        :param cursor_of: 由最后一行生成游标值列表的函数
+        :param formatter: 行格式化函数
+        :return: {'books': 数据列表, 'next_cursor': 下一页游标（没有下一页时为 None）}
+        """
+        with cls.session(commit=False) as s:
+            s.execute(sql, params + (limit + 1,))
+            rows = s.fetchall()
+        return cls._build_page(rows, limit, cursor_of, formatter)
+    
+    @classmethod
+    def _build_page(cls, rows: List[Dict], limit: int, cursor_of, formatter) -> Dict:
+        """
+        由多取一行的查询结果生成分页结果
+        :param rows: 查询结果（最多 limit + 1 行）
+        :param limit: 单页数量
+        :param cursor_of: 由最后一行生成游标值列表的函数
+        :param formatter: 行格式化函数
+        :return: {'books': 数据列表, 'next_cursor': 下一页游标（没有下一页时为 None）}
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'books': [formatter(row) for row in rows],
+            'next_cursor': encode_cursor(cursor_of(rows[-1])) if has_more else None
+        }
+    
+    @classmethod
+    def _page_size(cls, limit: int) -> int:
+        """
+        限制单页数量在 1 ~ MAX_PAGE_SIZE 之间
+        :param limit: 请求的单页数量
+        :return: 实际单页数量
+        """
+        return max(1, min(limit, cls.MAX_PAGE_SIZE))
+    
+    @classmethod
+    @track_db
+    def get_books_page(cls, keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取图书（按价格、主键升序；全部图书走 books.idx_price 索引，
+        按关键词时走 book_keywords.idx_keyword_price 索引再按主键关联 books）
+        :param keyword: 搜索关键词（为空则查询全部）
+        :param limit: 单页数量（不超过 MAX_PAGE_SIZE）
+        :param cursor: 上一页返回的游标（为空表示第一页）
+        :return: {'books': 图书列表, 'next_cursor': 下一页游标}
+        :raises ValueError: 游标格式不正确
+        """
+        return cls._fetch_page(*cls._books_page_query(keyword, limit, cursor))
+    
+    @classmethod
+    def _books_page_query(cls, keyword: Optional[str], limit: int, cursor: Optional[str]) -> tuple:
+        """
+        构造 get_books_page 的查询（同步连接池和异步数据层共用）
+        :return: (sql, params, 单页数量, cursor_of, formatter)，含义见 _fetch_page
+        :raises ValueError: 游标格式不正确
+        """
+        position = decode_cursor(cursor, 2)
+        conditions = []
+        params = ()
+        
+        if keyword:
+            # 关联表冗余了 price_cents，排序和游标条件都在 (keyword, price_cents, book_id) 索引上完成
+            conditions.append("k.keyword = %s")
+            params += (keyword,)
+            if position:
+                conditions.append("(k.price_cents > %s OR (k.price_cents = %s AND k.book_id > %s))")
+                params += (position[0], position[0], position[1])
+            sql = f"""
+            SELECT b.* FROM book_keywords k 
+            JOIN books b ON b.id = k.book_id 
+            WHERE {" AND ".join(conditions)} 
+            ORDER BY k.price_cents ASC, k.book_id ASC 
+            LIMIT %s
+            """
+        else:
+            if position:
+                conditions.append("(price_cents > %s OR (price_cents = %s AND id > %s))")
+                params += (position[0], position[0], position[1])
+            
+            where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+            sql = f"""
+            SELECT * FROM books 
+            {where} 
+            ORDER BY price_cents ASC, id ASC 
+            LIMIT %s
+            """
+        
+        return (
+            sql, params, cls._page_size(limit),
+            lambda row: [row['price_cents'], row['id']],
+            cls._format_book
+        )
+    
+    @classmethod
+    @track_db
+    def get_fanqie_books_page(cls, keyword: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取番茄小说（按主键倒序，即最新的在前）
+        :param keyword: 搜索关键词（为空则查询全部）
+        :param limit: 单页数量（不超过 MAX_PAGE_SIZE）
+        :param cursor: 上一页返回的游标（为空表示第一页）
+        :return: {'books': 小说列表, 'next_cursor': 下一页游标}
+        :raises ValueError: 游标格式不正确
+        """
+        return cls._fetch_page(*cls._fanqie_books_page_query(keyword, limit, cursor))
+    
+    @classmethod
+    def _fanqie_books_page_query(cls, keyword: Optional[str], limit: int, cursor: Optional[str]) -> tuple:
+        """
+        构造 get_fanqie_books_page 的查询（同步连接池和异步数据层共用）
+        :return: (sql, params, 单页数量, cursor_of, formatter)，含义见 _fetch_page
+        :raises ValueError: 游标格式不正确
+        """
+        position = decode_cursor(cursor, 1)
+        conditions = []
+        params = ()
+        
+        if keyword:
+            conditions.append("search_keyword = %s")
+            params += (keyword,)
+        if position:
+            conditions.append("id < %s")
+            params += (position[0],)
+        
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        sql = f"""
+        SELECT * FROM fanqie_books 
+        {where} 
+        ORDER BY id DESC 
+        LIMIT %s
+        """
+        
+        return (
+            sql, params, cls._page_size(limit),
+            lambda row: [row['id']],
+            cls._format_fanqie_book
+        )
+    
+    @classmethod
+    @track_db
+    def get_fanqie_recommend_page(cls, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """
+        游标分页获取推荐书籍列表（按主键倒序，即最新的在前）
+        :param limit: 单页数量（不超过 MAX_PAGE_SIZE）
+        :param cursor: 上一页返回的游标（为空表示第一页）
+        :return: {'books': 书籍列表, 'next_cursor': 下一页游标}
+        :raises ValueError: 游标格式不正确
+        """
+        return cls._fetch_page(*cls._fanqie_recommend_page_query(limit, cursor))
+    
+    @classmethod
+    def _fanqie_recommend_page_query(cls, limit: int, cursor: Optional[str]) -> tuple:
+        """
+        构造 get_fanqie_recommend_page 的查询（同步连接池和异步数据层共用）
+        :return: (sql, params, 单页数量, cursor_of, formatter)，含义见 _fetch_page
+        :raises ValueError: 游标格式不正确
+        """
+        position = decode_cursor(cursor, 1)
+        where = "WHERE id < %s" if position else ""
+        params = (position[0],) if position else ()
+        sql = f"""
+        SELECT * FROM fanqie_recommend 
+        {where} 
+        ORDER BY id DESC 
+        LIMIT %s
+        """
+        
+        return (
+            sql, params, cls._page_size(limit),
+            lambda row: [row['id']],
+            cls._format_fanqie_recommend
+        )
+    
+    @classmethod
+    @track_db
+    def search_books(cls, query: str, source: str = 'all', limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        在已入库的当当图书和番茄小说中搜索标题、作者、简介（按相关度排序）
+        :param query: 搜索词
+        :param source: 数据来源（all / dangdang / fanqie）
+        :param limit: 单页数量（不超过 MAX_PAGE_SIZE）
+        :param cursor: 上一页返回的游标（为空表示第一页）
+        :return: {'books': 结果列表（带 来源、相关度 字段）, 'next_cursor': 下一页游标}
+        :raises ValueError: 游标格式不正确
+        """
+        offset, size, queries = cls._search_plan(query, source, limit, cursor)
+        results = []
+        with cls.session(commit=False) as s:
+            for sql, params, formatter, label in queries:
+                s.execute(sql, params)
+                results.append((s.fetchall(), formatter, label))
+        return cls._merge_search(results, offset, size)
+    
+    @classmethod
+    def _search_plan(cls, query: str, source: str, limit: int, cursor: Optional[str]) -> tuple:
+        """
+        构造 search_books 的各表查询（同步连接池和异步数据层共用）
+        :return: (offset, 单页数量, [(sql, params, formatter, 来源名), ...])
+        :raises ValueError: 游标格式不正确
+        """
+        position = decode_cursor(cursor, 1)
+        offset = position[0] if position else 0
+        if offset < 0 or offset > cls.MAX_SEARCH_OFFSET:
+            raise ValueError("无效的分页游标")
+        
+        size = cls._page_size(limit)
+        fetch = offset + size + 1  # 各表各取前 fetch 条，合并后再按相关度截取当前页
+        
+        sources = {
+            'dangdang': ('books', cls._format_book, '当当'),
+            'fanqie': ('fanqie_books', cls._format_fanqie_book, '番茄小说')
+        }
+        if source != 'all':
+            sources = {source: sources[source]}
+        
+        queries = [
+            cls._search_query(table, query, fetch) + (formatter, label)
+            for table, formatter, label in sources.values()
+        ]
+        return offset, size, queries
+    
+    @classmethod
+    def _merge_search(cls, results: List[tuple], offset: int, size: int) -> Dict:
+        """
+        合并各表的搜索结果，按相关度截取当前页
+        :param results: [(结果行列表, formatter, 来源名), ...]（顺序与 _search_plan 的查询一致）
+        :param offset: 当前页起始位置
+        :param size: 单页数量
+        :return: {'books': 结果列表（带 来源、相关度 字段）, 'next_cursor': 下一页游标}
+        """
+        matches = []
+        for order, (rows, formatter, label) in enumerate(results):
+            for row in rows:
+                matches.append((float(row['score']), order, row['id'], formatter, label, row))
+        
+        matches.sort(key=lambda item: (-item[0], item[1], -item[2]))
+        books = []
+        for score, _, _, formatter, label, row in matches[offset:offset + size]:
+            book = formatter(row)
+            book['来源'] = label
+            book['相关度'] = round(score, 4)
+            books.append(book)
+        
+        has_more = len(matches) > offset + size and offset + size <= cls.MAX_SEARCH_OFFSET
+        return {
+            'books': books,
+            'next_cursor': encode_cursor([offset + size]) if has_more else None
+        }
+    
+    @classmethod
+    def _search_query(cls, table: str, query: str, limit: int) -> tuple:
+        """
+        构造单表搜索语句（结果带 score 列，按相关度降序）
+        全文索引可用且搜索词不短于 ngram 长度（2 个字）时使用 MATCH ... AGAINST，否则使用 LIKE
+        :param table: 表名
+        :param query: 搜索词
+        :param limit: 最多返回行数
+        :return: (sql, params)
+        """
+        if cls._fulltext_ready and len(query) >= 2:
+            sql = f"""
+            SELECT *, MATCH({cls._FULLTEXT_COLUMNS}) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score 
+            FROM {table} 
+            WHERE MATCH({cls._FULLTEXT_COLUMNS}) AGAINST (%s IN NATURAL LANGUAGE MODE) 
+            ORDER BY score DESC, id DESC 
+            LIMIT %s
+            """
+            return sql, (query, query, limit)
+        
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        sql = f"""
+        SELECT *, (title LIKE %s) * 2 + (author LIKE %s) AS score 
+        FROM {table} 
+        WHERE title LIKE %s OR author LIKE %s OR description LIKE %s 
+        ORDER BY score DESC, id DESC 
+        LIMIT %s
+        """
+        return sql, (pattern, pattern, pattern, pattern, pattern, limit)
+    
+    @classmethod
+    def iter_book_keys(cls, batch_size: int = 5000):
+        """
+        按主键分批遍历已入库图书的去重信息（用于构建已知图书索引）
+        :param batch_size: 每批读取行数
+        :return: 生成器，逐行产出 {'id', 'title', 'author', 'detail_url'}
+        """
+        sql = """
+        SELECT id, title, author, detail_url FROM books 
+        WHERE id > %s 
+        ORDER BY id 
+        LIMIT %s
+        """
+        
+        last_id = 0
+        while True:
+            # 每批单独借还连接，调用方逐行处理时不占用连接
+            with cls.session(commit=False) as s:
+                s.execute(sql, (last_id, batch_size))
+                rows = s.fetchall()
+            
+            if not rows:
+                return
+            
+            for row in rows:
+                yield row
+            
+            last_id = rows[-1]['id']
+            if len(rows) < batch_size:
+                return
+    
+    @classmethod
+    @track_db
     def get_book_count(cls) -> int:
         """
         获取图书总数
         :return: 图书数量
         """
-        sql = "SELECT COUNT(*) as count FROM books"
-        
-        conn = None
         try:
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with cls.session(commit=False) as s:
+                s.execute(cls._BOOK_COUNT_SQL)
+                result = s.fetchone()
             return result['count'] if result else 0
         except Exception as e:
             # print(f"❌ 获取图书数量失败: {e}")
             pass
             return 0
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     @classmethod
+    @track_db
     def get_statistics(cls) -> Dict:
         """
-        获取统计信息
+        获取统计信息（两条查询使用同一个连接）
         :return: 统计数据字典
         """
         try:
-            stats = {
-                'total_books': cls.get_book_count(),
-                'keywords': []
-            }
+            with cls.session(commit=False) as s:
+                s.execute(cls._BOOK_COUNT_SQL)
+                result = s.fetchone()
+                s.execute(cls._KEYWORD_STATS_SQL)
+                keywords = s.fetchall()
             
-            sql = """
-            SELECT search_keyword, COUNT(*) as count 
-            FROM books 
-            WHERE search_keyword != ''
-            GROUP BY search_keyword 
-            ORDER BY count DESC
-            """
-            
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            stats['keywords'] = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return stats
+            return {
+                'total_books': result['count'] if result else 0,
+                'keywords': keywords
+            }
         except Exception as e:
             # print(f"❌ 获取统计信息失败: {e}")
             pass
@@ -1130,3 +2005,8 @@ class MySQLPool:
             '创建时间': row.get('created_at'),
             '更新时间': row.get('updated_at')
         }
+
+
+POOL_IN_USE.set_function(lambda: MySQLPool._pool_usage()['in_use'])
+POOL_IDLE.set_function(lambda: MySQLPool._pool_usage()['idle'])
+POOL_MAX.set_function(lambda: MySQLPool._pool_usage()['max_connections'])
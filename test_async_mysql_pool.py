@@ -0,0 +1,168 @@
+"""
+测试异步数据层（async_mysql_pool.py，使用假连接池，不需要 MySQL 服务）
+"""
+
+import asyncio
+
+import pytest
+
+from async_mysql_pool import AsyncMySQLPool
+from mysql_pool import MySQLPool
+
+
+ROWS = [
+    {'id': i, 'title': f'书{i}', 'author': '作者', 'price_cents': 1000 + i, 'current_price': f'¥{10 + i / 100:.2f}'}
+    for i in range(1, 5)
+]
+
+
+class RecordingCursor:
+    """同步假游标：记录语句，SELECT 返回固定的行"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.executed.append((' '.join(sql.split()), params))
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class SyncConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SyncPool:
+    def __init__(self, rows):
+        self.cursor = RecordingCursor(rows)
+
+    def connection(self):
+        return SyncConnection(self.cursor)
+
+
+class AsyncCursor:
+    """aiomysql 风格的假游标"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        self.pool.executed.append((' '.join(sql.split()), params))
+
+    async def fetchall(self):
+        return tuple(self.pool.rows)
+
+    async def fetchone(self):
+        return self.pool.rows[0] if self.pool.rows else None
+
+
+class AsyncConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.freesize -= 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.freesize += 1
+        return False
+
+    def cursor(self):
+        return AsyncCursor(self.pool)
+
+
+class AsyncPool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.size = 2
+        self.freesize = 2
+        self.minsize = 1
+        self.maxsize = 10
+
+    def acquire(self):
+        return AsyncConnection(self)
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    sync_pool, async_pool = SyncPool(ROWS), AsyncPool(ROWS)
+    monkeypatch.setattr(MySQLPool, '_pool', sync_pool)
+    monkeypatch.setattr(AsyncMySQLPool, '_pool', async_pool)
+    return sync_pool, async_pool
+
+
+@pytest.mark.parametrize('keyword', [None, 'Python'])
+def test_books_page_matches_sync_pool(pools, keyword):
+    """异步查询与同步连接池执行相同的语句，返回值一致（包括下一页游标）"""
+    sync_pool, async_pool = pools
+    expected = MySQLPool.get_books_page(keyword, limit=3)
+    result = asyncio.run(AsyncMySQLPool.get_books_page(keyword, limit=3))
+
+    assert result == expected
+    assert result['next_cursor'] is not None and len(result['books']) == 3
+    assert async_pool.executed == sync_pool.cursor.executed
+    assert async_pool.freesize == async_pool.size
+
+
+def test_statistics_runs_both_queries(monkeypatch):
+    rows = [{'count': 7, 'keyword': 'Python', 'book_count': 7}]
+    pool = AsyncPool(rows)
+    monkeypatch.setattr(AsyncMySQLPool, '_pool', pool)
+
+    assert asyncio.run(AsyncMySQLPool.get_statistics()) == {'total_books': 7, 'keywords': rows}
+    assert [sql for sql, _ in pool.executed] == [
+        ' '.join(MySQLPool._BOOK_COUNT_SQL.split()), ' '.join(MySQLPool._KEYWORD_STATS_SQL.split())
+    ]
+
+
+def test_falls_back_to_sync_pool_without_async_pool(pools, monkeypatch):
+    """异步连接池未初始化时在线程池中调用同步的 MySQLPool"""
+    sync_pool, async_pool = pools
+    monkeypatch.setattr(AsyncMySQLPool, '_pool', None)
+
+    result = asyncio.run(AsyncMySQLPool.get_books_page(None, limit=10))
+    assert [book['标题'] for book in result['books']] == [row['title'] for row in ROWS]
+    assert result['next_cursor'] is None
+    assert sync_pool.cursor.executed and not async_pool.executed
+    assert AsyncMySQLPool.pool_stats()['enabled'] is False
+
+
+def test_pool_stats(pools):
+    assert AsyncMySQLPool.pool_stats() == {
+        'enabled': True, 'size': 2, 'in_use': 0, 'idle': 2, 'minsize': 1, 'maxsize': 10
+    }
+
+
+def test_invalid_cursor_raises(pools):
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncMySQLPool.get_books_page(None, cursor='not-a-cursor'))
@@ -0,0 +1,118 @@
+"""
+测试详情页请求登记表（book_index.SeenProductRegistry）
+"""
+
+from book_index import SeenProductRegistry
+
+URL = "https://product.dangdang.com/12345.html"
+
+
+class Waiter:
+    """记录回调参数；accept 为放弃解析时是否接手"""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.records = []
+        self.take_overs = 0
+
+    def __call__(self, record):
+        if record is None:
+            self.take_overs += 1
+            return self.accept
+        self.records.append(record)
+        return True
+
+
+def test_waiter_receives_record_when_attached():
+    """请求中的商品被其他关键词搜到时，解析完成后等待方收到图书数据，关键词列表包含双方"""
+    registry = SeenProductRegistry()
+    waiter = Waiter()
+    assert registry.claim(URL, "Python")
+    assert not registry.claim(URL, "Java", waiter)
+    assert registry.has_waiters(URL)
+
+    book = {"标题": "流畅的Python", "作者": "Luciano", "简介": "很长的简介", "搜索关键词": "Python"}
+    registry.attach(URL, book)
+    assert waiter.records == [book]
+    assert book["关键词列表"] == ["Python", "Java"]
+    assert not registry.has_waiters(URL)
+
+    # 图书数据和等待方收到的都是副本，之后追加的关键词不会修改它们
+    registry.claim(URL, "Go")
+    assert book["关键词列表"] == ["Python", "Java"]
+    assert waiter.records[0] is not book
+    assert waiter.records[0]["关键词列表"] is not book["关键词列表"]
+
+
+def test_claim_after_attach_gets_compact_record():
+    """已解析的商品立即回调，登记表只保留标题和作者"""
+    registry = SeenProductRegistry()
+    registry.claim(URL, "Python")
+    registry.attach(URL, {"标题": "流畅的Python", "作者": "Luciano", "简介": "很长的简介", "搜索关键词": "Python"})
+
+    waiter = Waiter()
+    assert not registry.claim(URL, "Java", waiter)
+    assert waiter.records == [{"标题": "流畅的Python", "作者": "Luciano", "关键词列表": ["Python", "Java"]}]
+
+
+def test_release_hands_claim_to_next_waiter():
+    """放弃解析时交给下一个接手的等待方，关键词和其余等待方保留"""
+    registry = SeenProductRegistry()
+    finished = Waiter(accept=False)
+    taker = Waiter()
+    later = Waiter()
+    registry.claim(URL, "Python")
+    registry.claim(URL, "Java", finished)
+    registry.claim(URL, "Go", taker)
+    registry.claim(URL, "Rust", later)
+
+    registry.release(URL)
+    assert (finished.take_overs, taker.take_overs, later.take_overs) == (1, 1, 0)
+    assert registry.has_waiters(URL)
+
+    book = {"标题": "书", "作者": "甲", "搜索关键词": "Go"}
+    registry.attach(URL, book)
+    assert book["关键词列表"] == ["Python", "Java", "Go", "Rust"]
+    assert later.records == [book]
+    assert taker.records == []  # 接手方自己解析，不再收到副本
+
+
+def test_release_without_taker_removes_entry():
+    """没有等待方接手时撤销登记，之后可以重新请求"""
+    registry = SeenProductRegistry()
+    registry.claim(URL, "Python")
+    registry.claim(URL, "Java", Waiter(accept=False))
+    registry.release(URL)
+    assert registry.claim(URL, "Go")
+
+
+def test_release_after_attach_keeps_entry():
+    """已关联图书数据的登记不撤销"""
+    registry = SeenProductRegistry()
+    registry.claim(URL, "Python")
+    registry.attach(URL, {"标题": "书", "作者": "甲", "搜索关键词": "Python"})
+    registry.release(URL)
+    assert not registry.claim(URL, "Java")
+
+
+def test_expired_and_evicted_entries():
+    """过期或超出容量的登记被淘汰"""
+    registry = SeenProductRegistry(ttl=0)
+    registry.claim(URL, "Python")
+    assert registry.claim(URL, "Java")
+
+    registry = SeenProductRegistry(max_entries=1)
+    registry.claim("https://product.dangdang.com/1.html")
+    registry.claim("https://product.dangdang.com/2.html")
+    assert registry.claim("https://product.dangdang.com/1.html")
+    assert registry.stats()['size'] == 1
+
+
+def test_evicted_entry_notifies_waiters():
+    """登记被淘汰时等待方收到 None，不会一直等待"""
+    registry = SeenProductRegistry(max_entries=1)
+    waiter = Waiter()
+    registry.claim(URL, "Python")
+    registry.claim(URL, "Java", waiter)
+    registry.claim("https://product.dangdang.com/2.html", "Go")
+    assert waiter.take_overs == 1
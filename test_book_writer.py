@@ -0,0 +1,80 @@
+"""
+测试图书批量写缓冲（book_writer.BookWriteBuffer，不需要 MySQL 服务）
+"""
+
+import threading
+
+import pytest
+
+from book_writer import BookWriteBuffer
+from mysql_pool import MySQLPool
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """替换 save_books_batch：记录每个批次，全部报告为新增"""
+    written = []
+
+    def save_books_batch(batch):
+        written.append([book['标题'] for book in batch])
+        return [{'success': True, 'is_duplicate': False, 'message': '保存成功'} for _ in batch]
+
+    monkeypatch.setattr(MySQLPool, 'save_books_batch', save_books_batch)
+    return written
+
+
+def test_full_batch_wakes_flush_thread(batches):
+    """攒够 batch_size 行时后台线程立即写出（不等 max_delay）"""
+    done = threading.Event()
+    results = []
+
+    def on_result(book, result):
+        results.append(book['标题'])
+        if len(results) == 3:
+            done.set()
+
+    writer = BookWriteBuffer(on_result=on_result, batch_size=3, max_delay=60)
+    writer.start()
+    for i in range(3):
+        writer.put({'标题': f'书{i}'})
+    assert done.wait(5)
+    assert batches == [['书0', '书1', '书2']]
+    writer.close()
+
+
+def test_close_writes_remaining_and_put_after_close_is_synchronous(batches):
+    """close 返回时剩余数据已写出并回调；关闭后 put 直接同步写入"""
+    results = []
+    writer = BookWriteBuffer(on_result=lambda book, result: results.append(book['标题']), batch_size=10, max_delay=60)
+    writer.start()
+    writer.put({'标题': '书1'})
+    writer.put({'标题': '书2'})
+    assert writer.pending == 2
+
+    writer.close()
+    assert results == ['书1', '书2'] and writer.pending == 0
+    assert not writer._thread.is_alive()
+
+    writer.put({'标题': '书3'})
+    assert results == ['书1', '书2', '书3']
+    assert batches == [['书1', '书2'], ['书3']]
+
+
+def test_flush_splits_batches_and_reports_failures(monkeypatch):
+    """flush 按 batch_size 分批；写入异常时该批每行都回调失败结果"""
+    calls = []
+
+    def save_books_batch(batch):
+        calls.append(len(batch))
+        raise RuntimeError("连接断开")
+
+    monkeypatch.setattr(MySQLPool, 'save_books_batch', save_books_batch)
+    results = []
+    writer = BookWriteBuffer(on_result=lambda book, result: results.append(result), batch_size=2)
+    for i in range(5):
+        writer.put({'标题': f'书{i}'})
+    writer.flush()
+
+    assert calls == [2, 2, 1]
+    assert len(results) == 5 and not any(result['success'] for result in results)
+    assert '连接断开' in results[0]['message']
@@ -0,0 +1,99 @@
+"""
+测试爬虫指标（crawl_metrics.py）的 Prometheus 文本输出
+"""
+
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from crawl_metrics import (
+    DB_ERRORS, DB_SECONDS, ERRORS, FETCH_SECONDS, PAGES, PARSE_SECONDS, MetricsRegistry, track_callback, track_db
+)
+
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    pages = registry.counter('pages_total', '页面数', ('spider',))
+    pages.labels('dangdang').inc()
+    pages.labels('dangdang').inc(2)
+    pages.labels('fan"qie').inc()
+    idle = registry.gauge('idle', '空闲连接数')
+    idle.set_function(lambda: 3)
+
+    assert registry.render() == (
+        '# HELP pages_total 页面数\n'
+        '# TYPE pages_total counter\n'
+        'pages_total{spider="dangdang"} 3\n'
+        'pages_total{spider="fan\\"qie"} 1\n'
+        '# HELP idle 空闲连接数\n'
+        '# TYPE idle gauge\n'
+        'idle 3\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    seconds = registry.histogram('seconds', '耗时', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        seconds.observe(value)
+
+    lines = registry.render().splitlines()[2:]
+    assert lines == [
+        'seconds_bucket{le="0.1"} 2',
+        'seconds_bucket{le="1"} 3',
+        'seconds_bucket{le="+Inf"} 4',
+        'seconds_sum 2.65',
+        'seconds_count 4',
+    ]
+
+
+def test_register_same_name_returns_existing_metric():
+    registry = MetricsRegistry()
+    first = registry.counter('pages_total', '页面数')
+    assert registry.counter('pages_total', '页面数') is first
+    with pytest.raises(ValueError):
+        first.labels('extra')
+
+
+def test_track_callback_records_generator_callbacks():
+    """生成器回调：记录下载耗时、页面数和遍历耗时，未捕获的异常计入错误数"""
+
+    class Spider:
+        @track_callback('test_spider')
+        def parse_page(self, request, response):
+            yield 1
+            if response.fail:
+                raise RuntimeError("bad page")
+            yield 2
+
+    spider = Spider()
+    fetch = FETCH_SECONDS.labels('test_spider', 'parse_page')
+    fetch_before = fetch.snapshot()[1]
+
+    assert list(spider.parse_page(None, SimpleNamespace(elapsed=timedelta(seconds=0.5), fail=False))) == [1, 2]
+    with pytest.raises(RuntimeError):
+        list(spider.parse_page(None, SimpleNamespace(elapsed=None, fail=True)))
+
+    assert PAGES.labels('test_spider', 'parse_page').value == 2
+    assert ERRORS.labels('test_spider', 'parse_page').value == 1
+    assert sum(PARSE_SECONDS.labels('test_spider', 'parse_page').snapshot()[0]) == 2
+    assert fetch.snapshot()[1] - fetch_before == pytest.approx(0.5)
+
+
+def test_track_db_labels_async_methods():
+    """同步方法的异常计入错误数；协程方法的标签为 方法名_async"""
+    @track_db
+    def lookup_test():
+        raise KeyError
+
+    @track_db
+    async def lookup_test_async_only():
+        return 1
+
+    with pytest.raises(KeyError):
+        lookup_test()
+    assert asyncio.run(lookup_test_async_only()) == 1
+    assert DB_ERRORS.labels('lookup_test').value == 1
+    assert sum(DB_SECONDS.labels('lookup_test_async_only_async').snapshot()[0]) == 1
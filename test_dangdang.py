@@ -0,0 +1,131 @@
+"""
+测试当当爬虫（共享登记表的用例不发起网络请求；端到端用例使用本地模拟站点 benchmarks/mock_server.py）
+"""
+
+import threading
+import time
+
+import pytest
+
+import dangdang
+from benchmarks.mock_server import MockServer
+from book_index import SeenProductRegistry
+from dangdang import DangDangSpider, run_spider, run_spider_batch
+from mysql_pool import MySQLPool
+
+URL = "https://product.dangdang.com/12345.html"
+
+
+def make_spider(keyword, registry, max_books=5):
+    return DangDangSpider(keyword=keyword, use_mysql=False, max_books=max_books, seen_registry=registry)
+
+
+def test_shared_result_is_handled_in_owning_spider():
+    """其他爬虫解析出的图书只放入共享队列，由等待的爬虫在自己的线程中计入结果"""
+    registry = SeenProductRegistry()
+    owner = make_spider("Python", registry)
+    waiting = make_spider("Java", registry)
+    assert owner._claim(URL, "Python")
+    waiter = waiting._share_waiter(waiting.progress["Java"], URL, "流畅的Python", "¥89.00", "Luciano", {})
+    assert not waiting._claim(URL, "Java", waiter)
+    assert waiting._awaiting == 1
+
+    book = {"标题": "流畅的Python", "作者": "Luciano", "简介": "简介", "搜索关键词": "Python", "详情页URL": URL}
+    thread = threading.Thread(target=registry.attach, args=(URL, book))
+    thread.start()
+    thread.join()
+    assert waiting.results == [] and waiting._awaiting == 0
+
+    assert list(waiting._drain_shared()) == []
+    [shared] = waiting.results
+    assert shared["搜索关键词"] == "Java" and shared["简介"] == "简介"
+    assert shared["关键词列表"] == ["Python", "Java"]
+    assert shared["关键词列表"] is not book["关键词列表"]
+
+
+def test_take_over_is_yielded_by_owning_spider():
+    """对方放弃解析时，接手的请求由等待的爬虫自己生成，不直接写入 feapder 的请求队列"""
+    registry = SeenProductRegistry()
+    owner = make_spider("Python", registry)
+    waiting = make_spider("Java", registry)
+    owner._claim(URL, "Python")
+    waiter = waiting._share_waiter(waiting.progress["Java"], URL, "书", "¥1.00", "甲", {})
+    waiting._claim(URL, "Java", waiter)
+
+    owner._release(URL)
+    assert waiting._memory_db.empty()
+    [request] = list(waiting._drain_shared())
+    assert request.url == URL and request.meta["keyword"] == "Java"
+    assert not owner._claim(URL, "Go")  # 登记已转给等待的爬虫
+
+
+def test_closed_spider_declines_take_over():
+    """已结束的爬虫不接手，登记交给下一个等待方或撤销"""
+    registry = SeenProductRegistry()
+    owner = make_spider("Python", registry)
+    waiting = make_spider("Java", registry)
+    owner._claim(URL, "Python")
+    waiting._claim(URL, "Java", waiting._share_waiter(waiting.progress["Java"], URL, "书", "", "甲", {}))
+    waiting.release_claims()
+
+    owner._release(URL)
+    assert waiting._shared.empty()
+    assert registry.claim(URL, "Go")
+
+
+@pytest.fixture(scope="module")
+def mock_site():
+    """本地模拟站点（每个关键词 10 页，每页 10 个商品）"""
+    server = MockServer(pages=10, items_per_page=10, latency_ms=10).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def spider_site(mock_site, monkeypatch):
+    monkeypatch.setattr(DangDangSpider, "SEARCH_URL", mock_site.dangdang_search_url)
+    return mock_site
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """不连接 MySQL：写库较慢（每批 50ms），全部报告为新增；记录写入的标题"""
+    written = []
+
+    def save_books_batch(batch):
+        time.sleep(0.05)
+        written.extend(book["标题"] for book in batch)
+        return [{"success": True, "is_duplicate": False, "message": "保存成功"} for _ in batch]
+
+    monkeypatch.setattr(dangdang, "_init_mysql_pool", lambda mysql_config=None: True)
+    monkeypatch.setattr(MySQLPool, "save_books_batch", save_books_batch)
+    monkeypatch.setattr(MySQLPool, "link_book_keywords", lambda links: len(links))
+    return written
+
+
+def test_run_spider_returns_when_target_reached(spider_site, fake_db):
+    """达到目标后由事件通知立即返回（不等到超时），返回前写缓冲已写完，统计与实际写入一致"""
+    start = time.monotonic()
+    result = run_spider("完成通知", max_books=5, use_mysql=True)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 20  # 超时时间为 60 秒
+    assert result["total_saved"] >= 5
+    assert result["total_saved"] == len(fake_db) == result["total_crawled"]
+
+
+def test_run_spider_batch_counts_each_keyword(spider_site):
+    """关键词去重、去空白后共用一个爬虫，每个关键词各自计数并各自达到目标"""
+    result = run_spider_batch([" 批量甲 ", "批量乙", "批量甲", ""], max_books=4, use_mysql=False)
+
+    assert list(result["keywords"]) == ["批量甲", "批量乙"]
+    for stats in result["keywords"].values():
+        assert stats["crawled"] == 4
+        assert stats["target_reached"]
+    assert result["total_crawled"] == len(result["books"]) == 8
+    assert {book["搜索关键词"] for book in result["books"]} == {"批量甲", "批量乙"}
+
+
+def test_run_spider_batch_rejects_empty_keywords():
+    with pytest.raises(ValueError):
+        run_spider_batch(["", "  "], use_mysql=False)
@@ -0,0 +1,63 @@
+"""
+测试番茄小说整本下载的断点续传（不访问网络）
+"""
+
+from fanqie_web_detail import ChapterCheckpoint, FanQieWebDetail
+
+BOOK_URL = "https://fanqienovel.com/page/1"
+
+
+class FakeDetail(FanQieWebDetail):
+    """章节内容来自字典；值为 None 的章节模拟下载失败"""
+
+    def __init__(self, contents):
+        super().__init__()
+        self.contents = contents
+        self.fetched = []
+
+    def get_book_info(self, url):
+        return {
+            'name': '测试书',
+            'author': '作者',
+            'labels': ['标签'],
+            'chapters': [{'title': f'第{i}章', 'url': f'{self.BASE_URL}/reader/{i}'} for i in range(1, len(self.contents) + 1)]
+        }
+
+    def get_chapter_content(self, chapter_url):
+        index = int(chapter_url.rsplit('/', 1)[1])
+        self.fetched.append(index)
+        return self.contents[index - 1]
+
+
+def test_missing_chapters_return_false(tmp_path):
+    """有章节下载失败时返回 False 并保留断点，补齐后返回 True"""
+    save_path = str(tmp_path / 'book.txt')
+    with FakeDetail(['一', None, '三']) as detail:
+        assert detail.download_book(BOOK_URL, save_path) is False
+    assert (tmp_path / 'book.txt.parts').exists()
+
+    with FakeDetail(['一', '二', '三']) as detail:
+        assert detail.download_book(BOOK_URL, save_path) is True
+        assert detail.fetched == [2]
+    assert not (tmp_path / 'book.txt.parts').exists()
+    text = (tmp_path / 'book.txt').read_text(encoding='utf-8')
+    assert text.index('一') < text.index('二') < text.index('三')
+
+
+def test_empty_chapter_is_not_missing(tmp_path):
+    """内容为空的章节记为已下载（长度为 0），续传时不重新下载，也不算缺失"""
+    save_path = str(tmp_path / 'book.txt')
+    progress = []
+    with FakeDetail(['一', '', '三']) as detail:
+        ok = detail.download_book(BOOK_URL, save_path, keep_parts=True,
+                                  on_progress=lambda done, total, chapter, success: progress.append(success))
+        assert ok is True
+    assert progress == [True, True, True]
+
+    checkpoint = ChapterCheckpoint(save_path + '.parts')
+    assert checkpoint.chapters[2]['length'] == 0
+    assert checkpoint.read(2) == ''
+
+    with FakeDetail(['一', '', '三']) as detail:
+        assert detail.download_book(BOOK_URL, save_path) is True
+        assert detail.fetched == []
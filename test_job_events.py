@@ -0,0 +1,71 @@
+"""
+测试任务事件流（backend/api.py 中的 Server-Sent Events）
+"""
+
+import asyncio
+import json
+import threading
+
+from backend.api import job_event_stream
+from backend.jobs import JOB_FINISHED, CrawlJob
+
+
+def parse_sse(message):
+    """SSE 文本 -> (事件名, 数据)"""
+    lines = message.strip().split("\n")
+    assert lines[0].startswith("event: ") and lines[1].startswith("data: ")
+    return lines[0][len("event: "):], json.loads(lines[1][len("data: "):])
+
+
+async def collect(job, on_event=None, progress_interval=60):
+    events = []
+    async for message in job_event_stream(job, progress_interval=progress_interval):
+        events.append(parse_sse(message))
+        if on_event:
+            on_event(events[-1])
+    return events
+
+
+def test_stream_replays_history_then_pushes_live_books():
+    """先回放订阅前的数据，之后逐条推送爬虫线程发布的数据，结束时推送 done 并取消订阅"""
+    job = CrawlJob("dangdang", {'keyword': 'Python'})
+    job.publish_book({'标题': 'A'})
+
+    def on_event(event):
+        if event == ('book', {'标题': 'A'}):
+            def crawl():
+                job.publish_book({'标题': 'B'})
+                job.finish(JOB_FINISHED, result={'total_saved': 2})
+            threading.Thread(target=crawl).start()
+
+    events = asyncio.run(collect(job, on_event))
+    names = [name for name, _ in events]
+    assert names[0] == 'job' and events[0][1]['job_id'] == job.id
+    assert [data['标题'] for name, data in events if name == 'book'] == ['A', 'B']
+    assert names[-1] == 'done' and events[-1][1]['status'] == JOB_FINISHED
+    assert 'result' not in events[-1][1]
+    assert job._listeners == []
+
+
+def test_stream_of_finished_job_ends_immediately():
+    job = CrawlJob("dangdang")
+    job.publish_book({'标题': 'A'})
+    job.finish(JOB_FINISHED, result=[])
+
+    events = asyncio.run(collect(job))
+    assert [name for name, _ in events] == ['job', 'book', 'done']
+
+
+def test_stream_pushes_progress_while_running():
+    """运行中定期推送 progress 事件"""
+    job = CrawlJob("dangdang")
+    job.start()
+
+    def on_event(event):
+        if event[0] == 'progress':
+            threading.Thread(target=job.finish, args=(JOB_FINISHED,)).start()
+
+    events = asyncio.run(collect(job, on_event, progress_interval=0.05))
+    progress = [data for name, data in events if name == 'progress']
+    assert progress and progress[0]['status'] == 'running' and progress[0]['crawled_count'] == 0
+    assert events[-1][0] == 'done'
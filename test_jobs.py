@@ -0,0 +1,255 @@
+"""
+测试爬取任务管理器（backend/jobs.py）
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.job_store import MySQLJobStore
+from backend.jobs import JOB_FAILED, JOB_FINISHED, JOB_QUEUED, JOB_RUNNING, JobManager, JobQueueFull, JobSnapshot
+from mysql_pool import MySQLPool
+
+
+class MemoryStore:
+    """内存任务存储（接口与 MySQLJobStore 一致），记录每次写入的状态"""
+
+    def __init__(self):
+        self.rows = {}
+        self.saved = []
+
+    def save(self, jobs):
+        for data in jobs:
+            self.rows[data['job_id']] = data
+            self.saved.append((data['job_id'], data['status']))
+
+    def load(self, job_id):
+        return self.rows.get(job_id)
+
+    def list(self, limit):
+        return sorted(self.rows.values(), key=lambda data: data['created_at'], reverse=True)[:limit]
+
+    def counts(self):
+        counts = {}
+        for data in self.rows.values():
+            counts[data['status']] = counts.get(data['status'], 0) + 1
+        return counts
+
+    def fail_stale(self, stale_after):
+        return 0
+
+    def prune(self, keep):
+        return 0
+
+
+def test_submit_runs_job_and_reports_progress():
+    """提交后立即返回；运行中读取爬虫的实时进度，结束后保留最终进度和结果"""
+    manager = JobManager(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    spider = SimpleNamespace(results=[{}, {}], saved_count=1, duplicate_count=1)
+
+    def run(job):
+        job.attach_spider(spider)
+        started.set()
+        release.wait(5)
+        return {'total_saved': 1}
+
+    job = manager.submit("dangdang", run, params={'keyword': 'Python'})
+    assert started.wait(5)
+    assert manager.get(job.id) is job and job.status == JOB_RUNNING
+    assert job.progress() == {'crawled_count': 2, 'saved_count': 1, 'duplicate_count': 1}
+    assert 'result' not in job.to_dict()
+
+    release.set()
+    job.future.result(5)
+    spider.saved_count = 99
+    data = job.to_dict()
+    assert data['status'] == JOB_FINISHED and data['result'] == {'total_saved': 1}
+    assert data['progress']['saved_count'] == 1
+    assert manager.get("missing") is None
+    manager.shutdown()
+
+
+def test_failed_job_records_error():
+    manager = JobManager(max_workers=1)
+
+    def run(job):
+        raise RuntimeError("boom")
+
+    job = manager.submit("fanqie_detail", run)
+    job.future.result(5)
+    assert (job.status, job.error, job.result) == (JOB_FAILED, "boom", None)
+    manager.shutdown()
+
+
+def test_queue_full_and_stats():
+    """排队 + 执行中的任务达到上限时拒绝提交；统计按状态计数"""
+    manager = JobManager(max_workers=1, max_pending=2)
+    release = threading.Event()
+    first = manager.submit("dangdang", lambda job: release.wait(5))
+    second = manager.submit("dangdang", lambda job: 'ok')
+    with pytest.raises(JobQueueFull):
+        manager.submit("dangdang", lambda job: 'ok')
+
+    stats = manager.stats()
+    assert stats[JOB_RUNNING] + stats[JOB_QUEUED] == 2 and stats['max_workers'] == 1
+    assert [job.id for job in manager.list()] == [second.id, first.id]
+
+    release.set()
+    second.future.result(5)
+    assert manager.stats()[JOB_FINISHED] == 2
+    manager.shutdown()
+
+
+def test_finished_jobs_pruned():
+    """只保留最近 max_finished 个已结束任务"""
+    manager = JobManager(max_workers=1, max_finished=2)
+    jobs = []
+    for i in range(4):
+        job = manager.submit("dangdang", lambda job, i=i: i)
+        job.future.result(5)
+        jobs.append(job)
+
+    manager.submit("dangdang", lambda job: None).future.result(5)
+    remaining = {job.id for job in manager.list()}
+    assert jobs[0].id not in remaining and jobs[1].id not in remaining
+    assert jobs[3].id in remaining
+    manager.shutdown()
+
+
+def test_shutdown_failure_not_overwritten_by_running_job():
+    """服务停止时运行中的任务标记为失败；任务线程随后返回时不覆盖状态，也不再写入存储"""
+    manager = JobManager(max_workers=1, sync_interval=60)
+    store = MemoryStore()
+    manager.attach_store(store)
+    started, release = threading.Event(), threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(5)
+        return {'total_saved': 1}
+
+    job = manager.submit("dangdang", run)
+    assert started.wait(5)
+    manager.shutdown()
+    assert job.status == JOB_FAILED and store.rows[job.id]['status'] == JOB_FAILED
+
+    release.set()
+    job.future.result(5)
+    assert job.status == JOB_FAILED and job.result is None
+    assert store.rows[job.id]['status'] == JOB_FAILED
+    assert (job.id, JOB_FINISHED) not in store.saved
+
+
+def test_finish_only_once():
+    """任务只结束一次，重复结束不再通知订阅方"""
+    manager = JobManager(max_workers=1)
+    job = manager.submit("dangdang", lambda job: 'ok')
+    job.future.result(5)
+    events = []
+    job.subscribe(lambda event, data: events.append(event))
+
+    assert not job.finish(JOB_FAILED, error="late")
+    assert (job.status, job.result, job.error) == (JOB_FINISHED, 'ok', None)
+    assert events == []
+    manager.shutdown()
+
+
+def test_snapshots_from_other_workers():
+    """本进程中没有的任务从存储读取为只读快照，列表合并本进程和其他进程的任务"""
+    manager = JobManager(max_workers=1, sync_interval=60)
+    store = MemoryStore()
+    manager.attach_store(store)
+    local = manager.submit("dangdang", lambda job: 'ok')
+    local.future.result(5)
+    store.rows['remote'] = {
+        'job_id': 'remote', 'kind': 'fanqie_detail', 'params': {}, 'status': JOB_FINISHED,
+        'progress': {'crawled_count': 3}, 'created_at': local.created_at + 1, 'result': {'chapters': 3}
+    }
+
+    remote = manager.get('remote')
+    assert isinstance(remote, JobSnapshot) and remote.done
+    assert remote.to_dict()['result'] == {'chapters': 3}
+    assert 'result' not in remote.to_dict(include_result=False)
+    assert manager.get(local.id) is local
+    assert [job.id for job in manager.list()] == ['remote', local.id]
+    manager.shutdown()
+
+
+class JobTableCursor:
+    """假游标：按 job_id 保存 crawl_jobs 的行（INSERT ... ON DUPLICATE KEY UPDATE）"""
+
+    COLUMNS = ('job_id', 'kind', 'params', 'status', 'progress', 'result', 'error',
+               'worker', 'created_at', 'started_at', 'finished_at', 'heartbeat_at')
+
+    def __init__(self):
+        self.rows = {}
+        self.rowcount = 0
+        self._result = []
+
+    def executemany(self, sql, seq):
+        for params in seq:
+            self.rows[params[0]] = dict(zip(self.COLUMNS, params))
+        self.rowcount = len(seq)
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        if 'WHERE job_id = %s' in sql:
+            self._result = [dict(self.rows[params[0]])] if params[0] in self.rows else []
+        elif 'GROUP BY status' in sql:
+            counts = {}
+            for row in self.rows.values():
+                counts[row['status']] = counts.get(row['status'], 0) + 1
+            self._result = [{'status': status, 'count': count} for status, count in counts.items()]
+        elif 'ORDER BY created_at DESC' in sql:
+            rows = sorted(self.rows.values(), key=lambda row: row['created_at'], reverse=True)
+            self._result = [{k: v for k, v in row.items() if k != 'result'} for row in rows[:params[0]]]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class JobTableConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_mysql_job_store_round_trip(monkeypatch):
+    """写入的任务字典按原格式读回；列表不含结果；统计按状态计数"""
+    cursor = JobTableCursor()
+    monkeypatch.setattr(MySQLPool, '_pool', SimpleNamespace(connection=lambda: JobTableConnection(cursor)))
+    store = MySQLJobStore(worker="host:1")
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit("dangdang", lambda job: {'total_saved': 1, '关键词': 'Python'}, params={'keyword': 'Python'})
+    job.future.result(5)
+    queued = {**job.to_dict(), 'job_id': 'queued', 'status': JOB_QUEUED, 'created_at': job.created_at + 1}
+    del queued['result']
+    store.save([job.to_dict(), queued])
+    manager.shutdown()
+
+    loaded = store.load(job.id)
+    assert loaded == {**job.to_dict(), 'worker': 'host:1'}
+    assert store.load('missing') is None
+    assert [data['job_id'] for data in store.list(10)] == ['queued', job.id]
+    assert all('result' not in data for data in store.list(10))
+    assert store.counts() == {JOB_FINISHED: 1, JOB_QUEUED: 1}
@@ -0,0 +1,366 @@
+"""
+测试 MySQLPool（使用假连接，不需要 MySQL 服务）
+"""
+
+import pytest
+from dbutils.pooled_db import PooledDB
+
+from mysql_pool import MySQLPool, _create_connection, decode_cursor, encode_cursor
+
+
+class FakeCursor:
+    """假游标：books 表按 dedup_key 判断唯一（与唯一索引一致），SELECT 按完整字符串比较"""
+
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else []
+        self.statements = []
+        self.links = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self._result = []
+        self._savepoint = None
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if sql.startswith('SAVEPOINT'):
+            self._savepoint = [dict(row) for row in self.rows]
+        elif sql.startswith('ROLLBACK TO SAVEPOINT'):
+            self.rows[:] = self._savepoint
+        elif sql.startswith('SELECT id, title, author'):
+            pairs = set(zip(params[::2], params[1::2]))
+            self._result = [row for row in self.rows if (row['title'], row['author']) in pairs]
+        elif sql.startswith('INSERT IGNORE INTO books'):
+            self.rowcount = self._insert(params)
+        elif sql.startswith('RAISE'):
+            raise RuntimeError(sql)
+        return self.rowcount
+
+    def executemany(self, sql, seq):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if 'book_keywords' in sql:
+            self.links.extend(seq)
+            self.rowcount = len(seq)
+        else:
+            self.rowcount = sum(self._insert(params) for params in seq)
+        return self.rowcount
+
+    def _insert(self, params):
+        key = MySQLPool.dedup_key(params[0], params[1])
+        if any(MySQLPool.dedup_key(row['title'], row['author']) == key for row in self.rows):
+            return 0
+        self.lastrowid = len(self.rows) + 1
+        self.rows.append({'id': self.lastrowid, 'title': params[0], 'author': params[1], 'price_cents': params[13]})
+        return 1
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, cursor=None):
+        self.cursor = cursor or FakeCursor()
+        self.connections = []
+
+    def connection(self):
+        self.connections.append(FakeConnection(self.cursor))
+        return self.connections[-1]
+
+
+def use_fake_pool(monkeypatch, cursor=None) -> FakePool:
+    pool = FakePool(cursor)
+    monkeypatch.setattr(MySQLPool, '_pool', pool)
+    return pool
+
+
+def test_save_books_batch_detects_ignored_rows(monkeypatch):
+    """索引前缀相同、完整标题不同的行被 INSERT IGNORE 忽略时，应报告为重复而不是保存成功"""
+    existing_title = 'A' * 255 + 'x'
+    cursor = FakeCursor([{'id': 1, 'title': existing_title, 'author': '甲', 'price_cents': 100}])
+    pool = use_fake_pool(monkeypatch, cursor)
+
+    results = MySQLPool.save_books_batch([
+        {'标题': 'A' * 255 + 'y', '作者': '甲', '搜索关键词': 'Python'},
+        {'标题': '新书', '作者': '乙', '搜索关键词': 'Python'}
+    ])
+
+    assert [r['success'] for r in results] == [False, True]
+    assert results[0]['is_duplicate']
+    assert [row['title'] for row in cursor.rows] == [existing_title, '新书']
+    assert 'ROLLBACK TO SAVEPOINT save_books_batch' in cursor.statements
+    assert pool.connections[0].commits == 1
+
+
+def test_save_books_batch_single_executemany(monkeypatch):
+    """没有行被忽略时只执行一次批量插入"""
+    cursor = FakeCursor()
+    use_fake_pool(monkeypatch, cursor)
+
+    results = MySQLPool.save_books_batch([
+        {'标题': '书1', '作者': '甲', '搜索关键词': 'Python'},
+        {'标题': '书1', '作者': '甲 ', '搜索关键词': 'Java'},
+        {'标题': '书2', '作者': '乙', '搜索关键词': 'Python'}
+    ])
+
+    assert [r['success'] for r in results] == [True, False, True]
+    assert not any(sql.startswith('ROLLBACK') for sql in cursor.statements)
+    assert sorted((kw, book_id) for kw, book_id, _ in cursor.links) == [('Java', 1), ('Python', 1), ('Python', 2)]
+
+
+def test_parse_numbers_clamped_to_int_range():
+    """超出 INT 列范围的价格/评论数被截断，避免整批写入失败"""
+    assert MySQLPool.parse_price_cents('¥99,999,999,999.00') == 2147483647
+    assert MySQLPool.parse_count('99999999万') == 2147483647
+    assert MySQLPool.parse_price_cents('¥89.50') == 8950
+    assert MySQLPool.parse_count('1.2万') == 12000
+
+
+class BackfillCursor(FakeCursor):
+    """假游标：数值列和索引已存在，books 表只有文本列数据，记录 schema_migrations 进度"""
+
+    def __init__(self, books, progress=None):
+        super().__init__()
+        self.books = books
+        self.progress = progress
+        self.updated = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if 'information_schema.columns' in sql:
+            self._result = [{'name': name} for name in MySQLPool._NUMERIC_COLUMNS]
+        elif 'information_schema.statistics' in sql:
+            self._result = [{'name': name} for name in MySQLPool._NUMERIC_INDEXES]
+        elif sql.startswith('SELECT last_id, finished_at FROM schema_migrations'):
+            self._result = [dict(self.progress)] if self.progress else []
+        elif sql.startswith('INSERT INTO schema_migrations'):
+            self.progress = {'last_id': params[1], 'finished_at': params[2]}
+        elif sql.startswith('SELECT id, current_price'):
+            last_id, limit = params
+            self._result = [book for book in self.books if book['id'] > last_id][:limit]
+        return self.rowcount
+
+    def executemany(self, sql, seq):
+        self.updated.extend(params[-1] for params in seq)
+
+
+def test_numeric_backfill_resumes_after_interruption(monkeypatch):
+    """数值列已存在但回填未完成时，从记录的位置继续，完成后不再重复回填"""
+    books = [{'id': i, 'current_price': '¥1.00', 'original_price': '', 'rating': '', 'comment_count': ''}
+             for i in range(1, 6)]
+    cursor = BackfillCursor(books, progress={'last_id': 2, 'finished_at': None})
+    use_fake_pool(monkeypatch, cursor)
+
+    with MySQLPool.session() as s:
+        MySQLPool._migrate_numeric_columns(s.connection, s.cursor)
+    assert cursor.updated == [3, 4, 5]
+    assert cursor.progress['last_id'] == 5 and cursor.progress['finished_at'] is not None
+
+    cursor.updated.clear()
+    with MySQLPool.session() as s:
+        MySQLPool._migrate_numeric_columns(s.connection, s.cursor)
+    assert cursor.updated == []
+
+
+def test_nested_session_reuses_connection(monkeypatch):
+    """块内调用的 MySQLPool 方法复用外层 session：只借出一个连接、只提交一次"""
+    pool = use_fake_pool(monkeypatch)
+
+    with MySQLPool.session() as outer:
+        with MySQLPool.session() as inner:
+            assert inner is outer
+        MySQLPool.save_book({'标题': '书1', '作者': '甲', '搜索关键词': 'Python'})
+        assert pool.connections[0].commits == 0
+
+    assert len(pool.connections) == 1
+    assert pool.connections[0].commits == 1
+    assert pool.connections[0].closed and pool.cursor.closed
+    assert getattr(MySQLPool._local, 'session', None) is None
+
+
+def test_swallowed_nested_error_marks_rollback_only(monkeypatch):
+    """嵌套调用中的异常即使被方法内部捕获，外层退出时也回滚并抛出异常"""
+    class FailingCursor(FakeCursor):
+        def _insert(self, params):
+            raise RuntimeError("写入失败")
+
+    pool = use_fake_pool(monkeypatch, FailingCursor())
+
+    with pytest.raises(Exception, match="已回滚"):
+        with MySQLPool.session():
+            result = MySQLPool.save_book({'标题': '书1', '作者': '甲'})
+            assert not result['success']  # save_book 捕获了异常
+
+    connection = pool.connections[0]
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+    assert connection.closed
+    assert getattr(MySQLPool._local, 'session', None) is None
+
+
+def test_read_only_session_with_nested_write_commits(monkeypatch):
+    """外层 commit=False，块内有写入（commit=True）时仍然提交"""
+    pool = use_fake_pool(monkeypatch)
+
+    with MySQLPool.session(commit=False):
+        with MySQLPool.session() as s:
+            s.execute("UPDATE books SET rating = '' WHERE id = 1")
+
+    assert pool.connections[0].commits == 1
+
+
+def test_read_only_session_does_not_commit(monkeypatch):
+    """只读 session 不提交，出错时回滚并归还连接"""
+    pool = use_fake_pool(monkeypatch)
+
+    with MySQLPool.session(commit=False) as s:
+        s.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        with MySQLPool.session(commit=False) as s:
+            s.execute("RAISE")
+
+    first, second = pool.connections
+    assert (first.commits, first.rollbacks) == (0, 0)
+    assert (second.commits, second.rollbacks) == (0, 1)
+    assert first.closed and second.closed
+
+
+def test_cursor_round_trip():
+    """游标编码后可解码回原值，且不含 URL 需要转义的字符"""
+    cursor = encode_cursor([8950, 123456])
+    assert decode_cursor(cursor, 2) == [8950, 123456]
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_cursor(None, 2) is None
+    assert decode_cursor('', 2) is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!',
+    encode_cursor([1]),  # 排序键数量不符
+    encode_cursor([1, 'x']),  # 非整数
+    encode_cursor({'a': 1}),  # 不是列表
+])
+def test_invalid_cursor(cursor):
+    """格式不正确的游标抛出 ValueError（接口返回 400）"""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+class MigrationCursor(FakeCursor):
+    """假游标：模拟 _create_table 的迁移检查；race 为 True 时 ADD FULLTEXT 因其他进程已添加而报 Duplicate key name"""
+
+    def __init__(self, locked=1, fulltext=(), race=False):
+        super().__init__()
+        self.locked = locked
+        self.fulltext = set(fulltext)
+        self.race = race
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if sql.startswith('SELECT GET_LOCK'):
+            self._result = [{'locked': self.locked}]
+        elif sql.startswith('SELECT RELEASE_LOCK'):
+            self._result = [{'released': 1}]
+        elif 'information_schema.statistics' in sql and params:
+            self._result = [{'count': int(params[0] in self.fulltext)}]
+        elif 'information_schema.statistics' in sql and 'unique_title_author' in sql:
+            self._result = [{'count': 1}]
+        elif 'information_schema.statistics' in sql:
+            self._result = [{'name': name} for name in MySQLPool._NUMERIC_INDEXES]
+        elif 'information_schema.columns' in sql:
+            self._result = [{'name': name} for name in MySQLPool._NUMERIC_COLUMNS]
+        elif sql.startswith('SELECT last_id, finished_at FROM schema_migrations'):
+            self._result = [{'last_id': 0, 'finished_at': '2026-01-01 00:00:00'}]
+        elif sql.startswith('SELECT EXISTS'):
+            self._result = [{'linked': 1, 'has_books': 1}]
+        elif 'ADD FULLTEXT' in sql:
+            table = sql.split()[2]
+            if self.race:
+                self.fulltext.add(table)
+                raise RuntimeError(f"(1061, \"Duplicate key name '{MySQLPool._FULLTEXT_INDEX}'\")")
+            self.fulltext.add(table)
+        return self.rowcount
+
+
+def test_migrations_run_under_lock(monkeypatch):
+    """迁移在 GET_LOCK/RELEASE_LOCK 之间执行"""
+    monkeypatch.setattr(MySQLPool, '_fulltext_ready', False)
+    cursor = MigrationCursor()
+    use_fake_pool(monkeypatch, cursor)
+    MySQLPool._create_table()
+
+    statements = cursor.statements
+    lock = next(i for i, sql in enumerate(statements) if sql.startswith('SELECT GET_LOCK'))
+    alters = [i for i, sql in enumerate(statements) if sql.startswith('ALTER TABLE')]
+    assert alters and lock < min(alters)
+    assert statements[-1].startswith('SELECT RELEASE_LOCK')
+    assert MySQLPool._fulltext_ready
+
+
+def test_lost_fulltext_race_keeps_index_ready(monkeypatch):
+    """添加全文索引失败但索引已被其他进程添加时，仍使用全文索引"""
+    monkeypatch.setattr(MySQLPool, '_fulltext_ready', False)
+    cursor = MigrationCursor(race=True)
+    use_fake_pool(monkeypatch, cursor)
+    MySQLPool._create_table()
+    assert MySQLPool._fulltext_ready
+
+
+def test_migration_lock_timeout_skips_migrations(monkeypatch):
+    """等不到迁移锁时不执行迁移，只按已有索引判断全文搜索是否可用"""
+    monkeypatch.setattr(MySQLPool, '_fulltext_ready', True)
+    cursor = MigrationCursor(locked=0, fulltext=['books'])
+    use_fake_pool(monkeypatch, cursor)
+    MySQLPool._create_table()
+    assert not any(sql.startswith('ALTER TABLE') for sql in cursor.statements)
+    assert not MySQLPool._fulltext_ready
+
+
+def test_pool_usage_counts_checkouts_and_idle(monkeypatch):
+    """借出/空闲连接数由连接的创建、关闭和借出、归还维护（使用真实的 PooledDB，连接延迟到首次查询才建立）"""
+    pool = PooledDB(creator=_create_connection, maxconnections=3, mincached=2, maxcached=2,
+                    blocking=True, reset=False, defer_connect=True)
+    monkeypatch.setattr(MySQLPool, '_pool', pool)
+    monkeypatch.setattr(MySQLPool, '_pool_limits', {'max_connections': 3, 'max_cached': 2})
+    try:
+        assert MySQLPool._pool_usage() == {'in_use': 0, 'idle': 2, 'max_connections': 3, 'max_cached': 2}
+
+        connections = [MySQLPool.get_connection() for _ in range(3)]
+        assert (MySQLPool._pool_usage()['in_use'], MySQLPool._pool_usage()['idle']) == (3, 0)
+
+        for connection in connections:
+            connection.close()
+        connections[0].close()  # 重复归还不重复计数
+        # 超出 maxcached 的连接归还时被关闭
+        assert (MySQLPool._pool_usage()['in_use'], MySQLPool._pool_usage()['idle']) == (0, 2)
+        assert MySQLPool.pool_stats()['utilization'] == 0
+    finally:
+        pool.close()
@@ -0,0 +1,65 @@
+"""
+测试查询结果缓存（backend/cache.py）
+"""
+
+import asyncio
+
+from backend.cache import ResultCache
+
+
+def test_invalidate_during_load_drops_result():
+    """加载期间发生失效时，加载结果不写回缓存"""
+    cache = ResultCache()
+    key = ('books', 'Python', 20, None)
+
+    def loader():
+        cache.invalidate('books', 'Python')
+        return 'stale'
+
+    assert cache.get_or_load(key, loader) == 'stale'
+    assert cache.get(key) == (False, None)
+    assert cache.get_or_load(key, lambda: 'fresh') == 'fresh'
+    assert cache.get(key) == (True, 'fresh')
+
+
+def test_invalidate_other_keyword_keeps_result():
+    """其他关键词的失效不影响正在加载的结果"""
+    cache = ResultCache()
+    key = ('books', 'Python', 20, None)
+
+    def loader():
+        cache.invalidate('books', 'Java')
+        return 'page'
+
+    cache.get_or_load(key, loader)
+    assert cache.get(key) == (True, 'page')
+
+
+def test_invalidate_endpoint_during_async_load():
+    """不带关键词的失效（整个接口）同样丢弃加载中的结果"""
+    cache = ResultCache()
+    key = ('search', 'Python', 20, None)
+
+    async def loader():
+        cache.invalidate('search')
+        return 'stale'
+
+    assert asyncio.run(cache.get_or_load_async(key, loader)) == 'stale'
+    assert cache.get(key) == (False, None)
+
+
+def test_disabled_cache_always_loads():
+    """禁用时（多进程部署）每次都调用 loader，不保存结果"""
+    cache = ResultCache(enabled=False)
+    key = ('books', 'Python', 20, None)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return 'page'
+
+    assert cache.get_or_load(key, loader) == 'page'
+    assert cache.get_or_load(key, loader) == 'page'
+    assert len(calls) == 2
+    assert cache.get(key) == (False, None)
+    assert cache.stats()['enabled'] is False and cache.stats()['size'] == 0